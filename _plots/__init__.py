@@ -1 +1,2 @@
-from .corr_heatmap import *
\ No newline at end of file
+from .corr_heatmap import *
+from .histogram import *
\ No newline at end of file
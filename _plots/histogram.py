@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+'''
+Author: Yuankai He
+Correspondence: yh464@cam.ac.uk
+Version 1: 2026-10-16
+
+Diagnostic histograms for wide phenotype files (index = subjects, columns = phenotypes)
+
+Bin counts of all columns are computed at once with numpy from the wide array,
+and only the precomputed counts are drawn, so there is no long-format data frame
+and no per-facet binning by seaborn. Files are rendered by a pool of worker
+processes with the non-interactive Agg backend, see render_all().
+'''
+
+def bin_counts(values, bins = 50):
+    '''
+    Histogram of each column with its own equal-width bins, NaN excluded
+    values: array (n x p)
+    Output: edges (p x bins+1), counts (p x bins)
+    '''
+    import numpy as np
+    values = np.asarray(values, dtype = np.float64)
+    valid = ~np.isnan(values)
+    lo = np.where(valid, values, np.inf).min(axis = 0)
+    hi = np.where(valid, values, -np.inf).max(axis = 0)
+    empty = ~np.isfinite(lo)
+    lo[empty] = 0; hi[empty] = 1
+    # constant columns get a unit-width range around the value, as in seaborn
+    const = hi == lo
+    lo[const] -= .5; hi[const] += .5
+    edges = lo[:, None] + (hi - lo)[:, None] * np.linspace(0, 1, bins + 1)[None, :]
+    edges[:, -1] = hi
+
+    idx = np.floor((values - lo) / (hi - lo) * bins)
+    idx = np.clip(np.nan_to_num(idx), 0, bins - 1).astype(np.int64)
+    # values within rounding error of a bin edge are assigned as in np.histogram
+    col = np.broadcast_to(np.arange(values.shape[1])[None, :], values.shape)
+    with np.errstate(invalid = 'ignore'):
+        idx -= (values < edges[col, idx]) & (idx > 0)
+        idx += (values >= edges[col, idx + 1]) & (idx < bins - 1)
+    idx += np.arange(values.shape[1])[None, :] * bins
+    counts = np.bincount(idx[valid], minlength = values.shape[1] * bins).reshape(values.shape[1], bins)
+    return edges, counts
+
+def facet_histograms(edges, counts, names, out, col_wrap = 8, height = 2.5):
+    '''
+    One panel per phenotype
+    '''
+    import matplotlib.pyplot as plt
+    import numpy as np
+    n = len(names)
+    ncol = min(col_wrap, n); nrow = int(np.ceil(n / ncol))
+    fig, axes = plt.subplots(nrow, ncol, figsize = (ncol * height, nrow * height), squeeze = False)
+    for ax, e, c, name in zip(axes.flat, edges, counts, names):
+        ax.stairs(c, e, fill = True, alpha = .6)
+        ax.set_title(name, fontsize = 8)
+        ax.tick_params(labelsize = 6)
+    for ax in axes.flat[n:]: ax.set_visible(False)
+    fig.tight_layout()
+    fig.savefig(out)
+    plt.close(fig)
+
+def overlay_histograms(edges, counts, out, figsize = (15,10), palette = 'pastel6'):
+    '''
+    All phenotypes in one panel, each with its own bins
+    '''
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    colours = sns.color_palette(palette, len(counts))
+    fig, ax = plt.subplots(figsize = figsize)
+    for e, c, colour in zip(edges, counts, colours):
+        ax.stairs(c, e, fill = True, alpha = .5, color = colour)
+    ax.set_xlabel('value'); ax.set_ylabel('Count')
+    fig.savefig(out)
+    plt.close(fig)
+
+def render(job):
+    '''
+    job: dict(file, out, sep, style = 'facet' or 'overlay', bins), reads the
+        phenotype file, drops FID/IID and draws its histograms
+    '''
+    import matplotlib
+    matplotlib.use('Agg')
+    import pandas as pd
+    df = pd.read_csv(job['file'], sep = job.get('sep', r'\s+'))
+    df = df.drop(columns = [c for c in ['FID','IID'] if c in df.columns])
+    edges, counts = bin_counts(df.values, bins = job.get('bins', 50))
+    if job.get('style', 'facet') == 'facet':
+        facet_histograms(edges, counts, df.columns.tolist(), job['out'])
+    else: overlay_histograms(edges, counts, job['out'])
+    return job['out']
+
+def render_all(jobs, n_cpu = 1):
+    '''
+    Renders a list of jobs (see render) in parallel, yields output files as they finish
+    '''
+    from multiprocessing import get_context
+    if n_cpu <= 1:
+        for job in jobs: yield render(job)
+        return
+    # spawned workers do not inherit an interactive backend from the parent
+    with get_context('spawn').Pool(n_cpu) as pool:
+        for out in pool.imap_unordered(render, jobs): yield out
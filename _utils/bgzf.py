@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+'''
+Author: Yuankai He
+Correspondence: yh464@cam.ac.uk
+2026-10-16
+
+Block-compressed (BGZF) summary statistics
+
+BGZF files are a series of independent gzip members of <= 64 KB, each recording
+its own compressed size, so they are valid .gz files for gzip, zcat, pandas,
+METAL and PLINK, and are byte-compatible with htslib bgzip/tabix. Because the
+blocks are independent, they are compressed and decompressed by a thread pool
+(zlib releases the GIL), and single lines can be read by seeking to one block.
+'''
+
+import io
+import os
+import zlib
+import struct
+from multiprocessing.pool import ThreadPool
+
+_block_size = 0xff00 # uncompressed bytes per block, as in htslib
+_eof = bytes.fromhex('1f8b08040000000000ff0600424302001b0003000000000000000000')
+
+def default_threads():
+    # respects SLURM/cgroup CPU affinity
+    try: return max(1, min(8, len(os.sched_getaffinity(0))))
+    except AttributeError: return max(1, min(8, os.cpu_count()))
+
+def is_bgzf(file):
+    with open(file, 'rb') as f: head = f.read(18)
+    return len(head) == 18 and head[:4] == b'\x1f\x8b\x08\x04' and head[12:14] == b'BC'
+
+def _compress_block(data, level = 6):
+    c = zlib.compressobj(level, zlib.DEFLATED, -15)
+    cdata = c.compress(data) + c.flush()
+    header = b'\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00' + \
+        struct.pack('<H', len(cdata) + 25)
+    return header + cdata + struct.pack('<II', zlib.crc32(data), len(data))
+
+def _blocks(buf):
+    # (offset, size) of each gzip member, read from the BSIZE field of the BC subfield
+    out = []
+    off = 0
+    while off < len(buf):
+        if buf[off:off+4] != b'\x1f\x8b\x08\x04':
+            raise ValueError(f'Not a BGZF block at offset {off}')
+        xlen = struct.unpack_from('<H', buf, off + 10)[0]
+        x = off + 12; size = None
+        while x < off + 12 + xlen:
+            si1, si2, slen = struct.unpack_from('<BBH', buf, x)
+            if si1 == 66 and si2 == 67: size = struct.unpack_from('<H', buf, x + 4)[0] + 1
+            x += 4 + slen
+        if size is None: raise ValueError(f'BGZF block at offset {off} has no BC field')
+        out.append((off, size, xlen))
+        off += size
+    return out
+
+def _decompress_block(buf, off, size, xlen):
+    data = zlib.decompress(buf[off + 12 + xlen: off + size - 8], -15)
+    if zlib.crc32(data) != struct.unpack_from('<I', buf, off + size - 8)[0]:
+        raise ValueError(f'CRC mismatch in BGZF block at offset {off}')
+    return data
+
+def decompress(file, threads = None):
+    '''
+    Returns the uncompressed content of a .gz file as bytes,
+    BGZF blocks are decompressed in parallel, plain gzip falls back to one thread
+    '''
+    if not is_bgzf(file):
+        import gzip
+        with gzip.open(file, 'rb') as f: return f.read()
+    if threads is None: threads = default_threads()
+    with open(file, 'rb') as f: buf = f.read()
+    blocks = _blocks(buf)
+    with ThreadPool(threads) as pool:
+        data = pool.starmap(_decompress_block, [(buf, *b) for b in blocks], chunksize = 16)
+    return b''.join(data)
+
+class writer():
+    '''
+    Binary file-like BGZF writer, compresses one batch of blocks per thread at a time
+    Output is written to a temporary file and moved into place on close(),
+    so that readers never see a partial file
+    '''
+    def __init__(self, file, threads = None, level = 6):
+        self.file = file
+        self.threads = default_threads() if threads is None else threads
+        self.level = level
+        self._tmp = f'{file}.tmp{os.getpid()}'
+        self._f = open(self._tmp, 'wb')
+        self._buf = bytearray()
+        self._pool = ThreadPool(self.threads) if self.threads > 1 else None
+        self.closed = False
+
+    def writable(self): return True
+    def readable(self): return False
+    def seekable(self): return False
+
+    def write(self, data):
+        self._buf += data
+        if len(self._buf) >= _block_size * self.threads * 4: self._flush(final = False)
+        return len(data)
+
+    def _flush(self, final):
+        n = len(self._buf) if final else len(self._buf) // _block_size * _block_size
+        chunks = [bytes(self._buf[i:i+_block_size]) for i in range(0, n, _block_size)]
+        del self._buf[:n]
+        if self._pool is None: blocks = [_compress_block(c, self.level) for c in chunks]
+        else: blocks = self._pool.starmap(_compress_block, [(c, self.level) for c in chunks])
+        for b in blocks: self._f.write(b)
+
+    def flush(self): pass # blocks are only emitted when full, to keep block boundaries stable
+
+    def close(self):
+        if self.closed: return
+        self._flush(final = True)
+        self._f.write(_eof)
+        self._f.close()
+        if self._pool is not None: self._pool.close()
+        os.replace(self._tmp, self.file)
+        self.closed = True
+
+    def abort(self):
+        # discards the output, the previous file (if any) is left in place
+        if self.closed: return
+        self._f.close()
+        if self._pool is not None: self._pool.close()
+        if os.path.isfile(self._tmp): os.remove(self._tmp)
+        self.closed = True
+
+    def __enter__(self): return self
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None: self.close()
+        else: self.abort()
+
+class _text_writer(io.TextIOWrapper):
+    # TextIOWrapper.__exit__ would close, and so publish, the output after an error
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None: return super().__exit__(exc_type, exc, tb)
+        raw = self.buffer
+        try: self.detach()
+        finally: raw.abort()
+
+def open_text(file, threads = None):
+    # text-mode BGZF writer, e.g. for df.to_csv; the output is discarded if the block raises
+    return _text_writer(writer(file, threads = threads), encoding = 'utf-8', newline = '')
+
+def compress_file(src, dst = None, threads = None, remove = True):
+    '''
+    Compresses an existing text file into BGZF, by default to {src}.gz
+    remove: delete the uncompressed source afterwards
+    '''
+    if dst is None: dst = f'{src}.gz'
+    with open(src, 'rb') as f, writer(dst, threads = threads) as w:
+        while True:
+            data = f.read(1 << 24)
+            if len(data) == 0: break
+            w.write(data)
+    if remove: os.remove(src)
+    return dst
+
+def block_index(file):
+    '''
+    Compressed and uncompressed start offsets of every block (as a .gzi index),
+    computed from the block headers and footers without decompression
+    '''
+    with open(file, 'rb') as f: buf = f.read()
+    coff = []; uoff = []; u = 0
+    for off, size, _ in _blocks(buf):
+        coff.append(off); uoff.append(u)
+        u += struct.unpack_from('<I', buf, off + size - 4)[0]
+    return coff, uoff
+
+def read_lines(file, offsets, index = None):
+    '''
+    Reads the lines starting at the given uncompressed offsets, decompressing
+    only the blocks that contain them
+    index: output of block_index(), computed if not given
+    '''
+    from bisect import bisect_right
+    coff, uoff = block_index(file) if index is None else index
+    cache = {}
+    with open(file, 'rb') as f:
+        def block(i):
+            if i not in cache:
+                f.seek(coff[i])
+                head = f.read(18)
+                xlen = struct.unpack_from('<H', head, 10)[0]
+                size = (coff[i+1] if i + 1 < len(coff) else os.fstat(f.fileno()).st_size) - coff[i]
+                f.seek(coff[i])
+                cache[i] = _decompress_block(f.read(size), 0, size, xlen)
+            return cache[i]
+        lines = []
+        for off in offsets:
+            i = bisect_right(uoff, off) - 1
+            data = block(i)[off - uoff[i]:]
+            while not b'\n' in data and i + 1 < len(coff): # line spans several blocks
+                i += 1
+                data += block(i)
+            lines.append(data[:data.find(b'\n') + 1] if b'\n' in data else data)
+    return lines
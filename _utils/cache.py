@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+'''
+Author: Yuankai He
+Correspondence: yh464@cam.ac.uk
+2026-10-16
+
+Result cache for sumstats transformations, replacing os.path.isfile checks
+
+Every output directory keeps a manifest {dirname}/.cache.json of the form
+    {output basename: {inputs: {file: fingerprint}, params: {...}, outputs: [...], time: ...}}
+An output is valid only if all of its files exist and the recorded fingerprints
+of its inputs and its transformation parameters equal the current ones, so a
+rerun upstream GWAS invalidates exactly the outputs derived from it.
+Fingerprints are size + mtime, or a SHA-1 of the content if hash = True.
+Outputs produced before the cache existed are adopted if they are newer than
+all of their inputs (not for in-place transformations, see valid()).
+'''
+
+import os
+import json
+import time
+
+manifest_name = '.cache.json'
+max_age = 90            # days, for evict()
+max_size = 50 * 2**30   # bytes, for evict()
+
+def fingerprint(file, hash = False):
+    st = os.stat(file)
+    fp = dict(size = st.st_size, mtime = st.st_mtime)
+    if hash:
+        import hashlib
+        h = hashlib.sha1()
+        with open(file, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 24), b''): h.update(block)
+        fp = dict(sha1 = h.hexdigest())
+    return fp
+
+def _outputs(output):
+    return [output] if isinstance(output, str) else list(output)
+
+def _signature(inputs, params, hash):
+    return dict(inputs = {os.path.realpath(x): fingerprint(x, hash) for x in inputs},
+                params = json.loads(json.dumps(params if params is not None else {})))
+
+def _manifest(output):
+    return f'{os.path.dirname(os.path.realpath(output))}/{manifest_name}'
+
+def _load(manifest):
+    if not os.path.isfile(manifest): return {}
+    try: return json.load(open(manifest))
+    except json.JSONDecodeError: return {} # truncated by a killed job, rebuilt on next store
+
+def _update(manifest, fn):
+    # read-modify-write under an exclusive lock, array jobs share output directories
+    import fcntl
+    with open(f'{manifest}.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        entries = _load(manifest)
+        fn(entries)
+        tmp = f'{manifest}.tmp{os.getpid()}'
+        json.dump(entries, open(tmp, 'w'), indent = 1)
+        os.replace(tmp, manifest)
+        fcntl.flock(lock, fcntl.LOCK_UN)
+
+def store(output, inputs, params = None, hash = False):
+    '''
+    Records the inputs and parameters an output was produced from,
+    call after the output has been written
+    output: output file or list of output files, keyed by the first one
+    inputs: list of input files
+    params: JSON-serialisable dict of transformation parameters
+    '''
+    outputs = [os.path.realpath(o) for o in _outputs(output)]
+    entry = _signature(inputs, params, hash) | dict(
+        outputs = outputs, hash = hash, time = time.time())
+    def _set(entries): entries[os.path.basename(outputs[0])] = entry
+    _update(_manifest(outputs[0]), _set)
+
+def valid(output, inputs, params = None, hash = False, adopt = True):
+    '''
+    True if all output files exist and were produced from the current inputs
+    with the same parameters; arguments as in store(); False if an input is missing
+    adopt: accept unrecorded outputs newer than their inputs, set False for
+        in-place transformations where the output is also an input
+    '''
+    outputs = _outputs(output)
+    if not all(os.path.isfile(o) for o in outputs): return False
+    if not all(os.path.isfile(x) for x in inputs): return False
+    entry = _load(_manifest(outputs[0])).get(os.path.basename(os.path.realpath(outputs[0])))
+    if entry is None:
+        if not adopt: return False
+        # adopt outputs that predate the cache, if no input was modified since
+        if min(os.stat(o).st_mtime for o in outputs) < max([os.stat(x).st_mtime for x in inputs] + [0]):
+            return False
+        store(output, inputs, params, hash)
+        return True
+    sig = _signature(inputs, params, entry.get('hash', hash))
+    return entry['inputs'] == sig['inputs'] and entry['params'] == sig['params']
+
+def newer(output, inputs):
+    '''
+    True if output exists and is newer than all inputs, for results of
+    submitted jobs that cannot record themselves in the manifest
+    '''
+    if not os.path.isfile(output): return False
+    return os.stat(output).st_mtime >= max([os.stat(x).st_mtime for x in inputs if os.path.isfile(x)] + [0])
+
+def evict(dirname, max_age = max_age, max_size = max_size, keep = ()):
+    '''
+    Deletes cached outputs in a directory older than max_age days, then the
+    oldest outputs until the total size is below max_size bytes;
+    only use on directories that are pure caches (e.g. temp), and judge whether
+    results derived from them are stale from their sources (see newer()),
+    as an evicted output gets a new mtime when it is rebuilt
+    keep: output files that must not be deleted, e.g. inputs of submitted jobs
+        that may still be queued
+    '''
+    manifest = f'{dirname}/{manifest_name}'
+    if not os.path.isfile(manifest): return
+    keep = set(os.path.realpath(o) for o in keep)
+    def _evict(entries):
+        now = time.time()
+        busy = lambda key: any(o in keep for o in entries[key]['outputs'])
+        for key in sorted(entries, key = lambda k: entries[k]['time']):
+            outputs = entries[key]['outputs']
+            if busy(key): continue
+            if not all(os.path.isfile(o) for o in outputs) or now - entries[key]['time'] > max_age * 86400:
+                for o in outputs:
+                    if os.path.isfile(o): os.remove(o)
+                del entries[key]
+        size = sum(os.path.getsize(o) for e in entries.values() for o in e['outputs'] if os.path.isfile(o))
+        for key in sorted(entries, key = lambda k: entries[k]['time']):
+            if size <= max_size: break
+            if busy(key): continue
+            for o in entries[key]['outputs']:
+                size -= os.path.getsize(o)
+                os.remove(o)
+            del entries[key]
+    _update(manifest, _evict)
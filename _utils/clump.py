@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+'''
+Author: Yuankai He
+Correspondence: yh464@cam.ac.uk
+2026-10-16
+
+LD clumping of summary statistics in-process, reading PLINK 1 binary genotypes directly
+
+Implements the greedy algorithm of PLINK 1.9 --clump: SNPs are visited in order
+of increasing p-value; each SNP with p <= p1 that is not yet part of a clump
+becomes an index SNP and claims all unclaimed SNPs within kb kilobases with
+p <= p2 and r2 >= r2 with the index SNP. SNPs absent from the genotypes are ignored.
+r is computed on the fly from the memory-mapped .bed file, genotypes are mean-imputed
+and standardised in a vectorised way. The output has the columns of a PLINK .clumped file.
+'''
+
+import os
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from _utils.sumstats import parse_chrom
+
+clumped_cols = ['CHR','F','SNP','BP','P','TOTAL','NSIG','S05','S01','S001','S0001','SP2']
+
+# genotype of each 2-bit code in SNP-major .bed files: hom A1, missing, het, hom A2
+_codes = np.array([2, np.nan, 1, 0], dtype = np.float32)
+_decode = _codes[(np.arange(256)[:, None] >> np.array([0, 2, 4, 6])[None, :]) & 3]
+
+class bed():
+    '''
+    PLINK 1 binary fileset (prefix.bed/.bim/.fam), SNP-major, memory-mapped
+    cache_size: bytes of standardised genotypes kept in an LRU cache, as
+        the windows of consecutive index SNPs overlap
+    '''
+    def __init__(self, prefix, cache_size = 2**30):
+        if prefix.endswith('.bed'): prefix = prefix[:-4]
+        self.prefix = prefix
+        self.bim = pd.read_table(f'{prefix}.bim', sep = r'\s+', header = None,
+                                 usecols = [0, 1, 3, 4, 5], names = ['CHR','SNP','BP','A1','A2'],
+                                 dtype = {'CHR': str, 'SNP': str, 'BP': np.int64, 'A1': str, 'A2': str})
+        with open(f'{prefix}.fam', 'rb') as f: self.nsamp = sum(1 for _ in f)
+        mm = np.memmap(f'{prefix}.bed', dtype = np.uint8, mode = 'r')
+        if mm.size < 3 or tuple(mm[:3]) != (0x6c, 0x1b, 0x01):
+            raise ValueError(f'{prefix}.bed is not a SNP-major PLINK 1 binary file')
+        nbytes = (self.nsamp + 3) // 4
+        if mm.size - 3 != nbytes * self.bim.shape[0]:
+            raise ValueError(f'{prefix}.bed does not match {prefix}.bim and {prefix}.fam')
+        self._geno = mm[3:].reshape(self.bim.shape[0], nbytes)
+        self.chrom = parse_chrom(self.bim.CHR).values
+        dup = self.bim.SNP.duplicated().values # the first of duplicated IDs is used
+        self._index = pd.Index(self.bim.SNP.values[~dup])
+        self._rows = np.flatnonzero(~dup)
+        self._cache = OrderedDict()
+        self._cache_max = max(1, cache_size // (4 * self.nsamp))
+
+    def lookup(self, snps):
+        '''
+        Output: row of each SNP in the .bim file, -1 if absent
+        '''
+        idx = self._index.get_indexer(pd.Index(snps))
+        return np.where(idx >= 0, self._rows[np.maximum(idx, 0)], -1)
+
+    def _standardise(self, rows):
+        x = _decode[self._geno[rows]].reshape(len(rows), -1)[:, :self.nsamp]
+        miss = np.isnan(x)
+        n = np.maximum((~miss).sum(axis = 1, keepdims = True), 1)
+        x = np.where(miss, 0, x - np.where(miss, 0, x).sum(axis = 1, keepdims = True) / n)
+        norm = np.sqrt((x**2).sum(axis = 1, keepdims = True))
+        return np.divide(x, norm, out = np.zeros_like(x), where = norm > 0) # monomorphic SNPs have r = 0
+
+    def standardised(self, rows):
+        '''
+        Mean-imputed genotypes with zero mean and unit norm, so that r is a dot product
+        Output: array (len(rows) x samples), float32
+        '''
+        rows = np.asarray(rows, dtype = np.int64)
+        new = np.array([r for r in dict.fromkeys(rows.tolist()) if not r in self._cache], dtype = np.int64)
+        for start in range(0, new.size, 1024):
+            block = new[start:start+1024]
+            for r, x in zip(block, self._standardise(block)):
+                self._cache[int(r)] = x
+        out = np.empty((rows.size, self.nsamp), dtype = np.float32)
+        for k, r in enumerate(rows.tolist()):
+            out[k] = self._cache[r]; self._cache.move_to_end(r)
+        while len(self._cache) > self._cache_max: self._cache.popitem(last = False)
+        return out
+
+    def r(self, row, rows):
+        '''
+        Correlation of one SNP with a set of SNPs, float32
+        '''
+        x = self.standardised([row])[0]
+        # blocks bound the memory use for dense windows
+        out = [self.standardised(rows[k:k+1024]) @ x for k in range(0, len(rows), 1024)]
+        return np.concatenate(out) if len(out) > 0 else np.zeros(0, dtype = np.float32)
+
+    def r2(self, row, rows):
+        '''
+        Squared correlation of one SNP with a set of SNPs
+        '''
+        return self.r(row, rows).astype(np.float64)**2
+
+def clump(df, geno, p1 = 5e-8, p2 = 1, r2 = 0.1, kb = 1000, ld = None):
+    '''
+    Clumps the SNPs of one chromosome
+    df: summary statistics with SNP and P columns
+    geno: bed object of the same chromosome
+    ld: optional _utils.ldcache.ldcache, the LD of each index SNP with its window
+        is then read from (or added to) the cache instead of computed in place
+    Output: data frame with the columns of a PLINK .clumped file, ordered by p-value
+    '''
+    rows = geno.lookup(df.SNP.values)
+    keep = (rows >= 0) & ~np.isnan(df.P.values.astype(np.float64))
+    snp = df.SNP.values[keep]; p = df.P.values[keep].astype(np.float64); rows = rows[keep]
+    pos = geno.bim.BP.values[rows]; chrom = geno.bim.CHR.values[rows]
+
+    # SNPs sorted by position for window queries, visited in order of p-value
+    by_pos = np.lexsort((p, pos))
+    snp, p, rows, pos, chrom = snp[by_pos], p[by_pos], rows[by_pos], pos[by_pos], chrom[by_pos]
+    claimed = np.zeros(p.size, dtype = bool)
+    secondary = p <= p2
+    out = []
+    for i in np.lexsort((pos, p)):
+        if p[i] > p1: break
+        if claimed[i]: continue
+        claimed[i] = True
+        lo = np.searchsorted(pos, pos[i] - kb * 1000, side = 'left')
+        hi = np.searchsorted(pos, pos[i] + kb * 1000, side = 'right')
+        cand = lo + np.flatnonzero(~claimed[lo:hi] & secondary[lo:hi])
+        if ld is None: members = cand[geno.r2(rows[i], rows[cand]) >= r2]
+        else:
+            cols, r = ld.window(geno, rows[i], kb)
+            idx = pd.Index(cols).get_indexer(rows[cand])
+            if (idx < 0).any():
+                raise ValueError(f'{(idx < 0).sum()} SNPs near {snp[i]} are not in its cached LD window, '+
+                                 'check that the summary statistics match the chromosome of the bed file')
+            members = cand[r[idx].astype(np.float64)**2 >= r2]
+        claimed[members] = True
+        # members are listed by position, as by PLINK
+        mp = p[members]
+        out.append([chrom[i], 1, snp[i], pos[i], p[i], members.size,
+                    int((mp > .05).sum()), int(((mp > .01) & (mp <= .05)).sum()),
+                    int(((mp > .001) & (mp <= .01)).sum()), int(((mp > 1e-4) & (mp <= .001)).sum()),
+                    int((mp <= 1e-4).sum()),
+                    ','.join(f'{s}(1)' for s in snp[members]) if members.size > 0 else 'NONE'])
+    if ld is not None: ld.flush()
+    out = pd.DataFrame(out, columns = clumped_cols)
+    if out.shape[0] > 0: out['CHR'] = parse_chrom(out.CHR)
+    return out
+
+def write(df, file):
+    '''
+    Writes a .clumped table atomically, so an interrupted job leaves no partial output
+    '''
+    tmp = f'{file}.tmp{os.getpid()}'
+    df.to_csv(tmp, sep = '\t', index = False)
+    os.replace(tmp, file)
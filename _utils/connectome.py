@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+'''
+Author: Yuankai He
+Correspondence: yh464@cam.ac.uk
+2026-10-16
+
+Binary cache of parsed connectomes (e.g. Connectivity_sc2345.txt, comma-separated)
+
+Each connectome is parsed from text once and saved as a float32 .npy file in a
+cache directory, {cache}/{subject}.npy, which is reused as long as it is newer
+than the text file. float32 keeps 7 significant digits, more than needed for
+QC screens and phenotype rebuilds, and halves the size of a float64 cache.
+'''
+
+import os
+import numpy as np
+
+def cache_path(cache, subj):
+    return f'{cache}/{subj}.npy'
+
+def is_current(file, cached):
+    return os.path.isfile(cached) and os.stat(cached).st_mtime >= os.stat(file).st_mtime
+
+def save(rsc, cached):
+    tmp = f'{cached}.tmp{os.getpid()}.npy'
+    np.save(tmp, np.asarray(rsc, dtype = np.float32))
+    os.replace(tmp, cached)
+
+def load(file, subj = None, cache = None, mmap = False):
+    '''
+    Loads a connectome from the cache if current, otherwise parses the text file
+    and writes it to the cache
+    cache: cache directory, None to always parse the text file
+    mmap: memory-map the cached array instead of reading it
+    Output: float32 array, whether parsed or cached, so results do not depend on the cache state
+    '''
+    if cache is None: return np.loadtxt(file, delimiter = ',').astype(np.float32)
+    cached = cache_path(cache, subj)
+    if is_current(file, cached): return np.load(cached, mmap_mode = 'r' if mmap else None)
+    rsc = np.loadtxt(file, delimiter = ',').astype(np.float32)
+    save(rsc, cached)
+    return rsc
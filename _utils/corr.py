@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+'''
+Author: Yuankai He
+Correspondence: yh464@cam.ac.uk
+2026-10-16
+
+Pairwise-complete Pearson correlations of all columns of a matrix with missing values
+
+For every pair of columns, r is computed over the rows where both are observed,
+as in pd.DataFrame.corr(), but through a few masked matrix products instead of a
+loop over pairs, so thousands of columns (e.g. local ROI phenotypes) are cheap.
+Also returns the number of complete observations and two-sided p-values.
+'''
+
+import numpy as np
+
+def pairwise(X):
+    '''
+    X: array (n x p), NaN for missing values
+    Output: r, N, p (each p x p)
+    '''
+    from scipy.stats import t as tdist
+    X = np.asarray(X, dtype = np.float64)
+    M = (~np.isnan(X)).astype(np.float64)
+    # centring by the column means reduces cancellation in the sums of squares
+    mean = np.where(M > 0, X, 0).sum(axis = 0) / np.maximum(M.sum(axis = 0), 1)
+    Z = np.where(M > 0, X - mean, 0)
+    n = M.T @ M
+    sx = Z.T @ M               # sum of x_i over rows where x_j is also observed
+    sxx = (Z**2).T @ M
+    sxy = Z.T @ Z
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        cov = sxy - sx * sx.T / n
+        var = sxx - sx**2 / n  # var[i, j]: variance of x_i over rows shared with x_j
+        r = cov / np.sqrt(var * var.T)
+        r = np.clip(r, -1, 1)
+        r[n < 2] = np.nan
+        df = n - 2
+        t = r * np.sqrt(df / (1 - r**2))
+        p = 2 * tdist.sf(np.abs(t), df)
+    p[df < 1] = np.nan
+    np.fill_diagonal(p, np.where(np.diag(n) > 2, 0, np.nan))
+    return r, n.astype(np.int64), p
+
+def long_format(r, n, p, names, triangle = True):
+    '''
+    Output: data frame of pheno1, pheno2, r, N, p; upper triangle only if triangle
+    '''
+    import pandas as pd
+    i, j = np.triu_indices(len(names), k = 1) if triangle else np.indices(r.shape).reshape(2, -1)
+    names = np.asarray(names, dtype = object)
+    return pd.DataFrame(dict(pheno1 = names[i], pheno2 = names[j], r = r[i, j], N = n[i, j], p = p[i, j]))
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+'''
+Author: Yuankai He
+Correspondence: yh464@cam.ac.uk
+2026-10-16
+
+Subject discovery over the imaging tree with few metadata round-trips
+
+Subject directories are listed with os.scandir (no stat per entry), and the
+templated target files (e.g. %subj/func/.../Connectivity_sc2345.txt) of all
+subjects and templates are checked concurrently by a thread pool, as each check
+is a network round-trip on the cluster file system. Results are kept in a JSON
+snapshot {template: {found: [...], not_found: [...]}}, so a later scan only
+checks subjects that were added since, and those not found before once their
+last check is older than max_age (images arrive after the subject directory).
+'''
+
+import os
+import json
+import time
+
+def base(template):
+    return template.split('%subj')[0]
+
+def list_subjects(dirname):
+    # directory entries carry their type, so no stat call is needed
+    with os.scandir(dirname) as it:
+        return sorted(x.name for x in it if x.is_dir())
+
+def load_snapshot(file):
+    if file is None or not os.path.isfile(file): return {}
+    try: return json.load(open(file))
+    except json.JSONDecodeError: return {}
+
+def save_snapshot(file, snapshot):
+    tmp = f'{file}.tmp{os.getpid()}'
+    json.dump(snapshot, open(tmp, 'w'))
+    os.replace(tmp, file)
+
+def scan(templates, snapshot = None, recheck = False, rescan = False, threads = 32, max_age = 7 * 86400):
+    '''
+    templates: list of target paths containing %subj
+    snapshot: JSON file of a previous scan, updated in place; None to check all subjects
+    recheck: also check all subjects that were not found in the previous scan
+    max_age: seconds after which a subject not found is checked again, None for never
+    rescan: check all subjects and overwrite the snapshot
+    Output: sorted list of subject directories, dict of found subjects by template
+    '''
+    from multiprocessing.pool import ThreadPool
+    if isinstance(templates, str): templates = [templates]
+    listing = {b: list_subjects(b) for b in dict.fromkeys(base(t) for t in templates)}
+    subjs = sorted(set(s for l in listing.values() for s in l))
+    prev = {} if rescan else load_snapshot(snapshot)
+
+    now = time.time()
+    found = {}; checked = {}; tasks = []
+    for t in templates:
+        entry = prev.get(t, dict(found = [], not_found = {}))
+        present = set(listing[base(t)])
+        # not_found maps subjects to the time of their last check (a list in older snapshots)
+        checked[t] = entry['not_found'] if isinstance(entry['not_found'], dict) else dict.fromkeys(entry['not_found'], 0)
+        known = set(entry['found'])
+        if not recheck: known |= set(s for s, tc in checked[t].items() if max_age is None or now - tc < max_age)
+        found[t] = set(s for s in entry['found'] if s in present)
+        tasks += [(t, s) for s in listing[base(t)] if not s in known]
+
+    with ThreadPool(threads) as pool:
+        res = pool.map(lambda x: os.path.isfile(x[0].replace('%subj', x[1])), tasks, chunksize = 64)
+    for (t, s), r in zip(tasks, res):
+        if r: found[t].add(s)
+        else: checked[t][s] = now
+
+    if snapshot is not None:
+        for t in templates:
+            present = listing[base(t)]
+            prev[t] = dict(found = [s for s in present if s in found[t]],
+                           not_found = {s: checked[t].get(s, now) for s in present if not s in found[t]})
+        save_snapshot(snapshot, prev)
+    return subjs, found
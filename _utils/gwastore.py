@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+'''
+Author: Yuankai He
+Correspondence: yh464@cam.ac.uk
+2026-10-16
+
+Chromosome-partitioned columnar store for GWAS summary statistics
+
+Each sumstats file gets a sidecar directory {file}.store/ with the layout:
+    meta.json               source fingerprint, columns, dtypes and row counts
+    chr{c}/{column}.npy     one typed array per column per chromosome, sorted by POS
+Arrays are memory-mappable, so readers only touch the columns and chromosomes
+they request. The store is invalidated when the source file size or mtime changes.
+'''
+
+import os
+import json
+import numpy as np
+import pandas as pd
+from _utils.sumstats import parse_chrom as _parse_chrom
+from _utils import sumstats
+
+_fixed_dtypes = {'CHR': np.int8, 'POS': np.int32, 'BP': np.int32}
+
+def store_path(file):
+    return f'{file}.store'
+
+def _fingerprint(file):
+    st = os.stat(file)
+    return dict(size = st.st_size, mtime = st.st_mtime)
+
+def load_meta(file):
+    meta = f'{store_path(file)}/meta.json'
+    if not os.path.isfile(meta): return None
+    return json.load(open(meta))
+
+def is_current(file):
+    '''
+    True if the store exists and was built from the current version of the file
+    '''
+    meta = load_meta(file)
+    if meta is None: return False
+    fp = _fingerprint(file)
+    return meta['size'] == fp['size'] and meta['mtime'] == fp['mtime']
+
+def convert(file, force = False, chunksize = 1000000):
+    '''
+    Converts a tab/space-delimited sumstats file into a chromosome-partitioned store
+    file: sumstats file, requires CHR and POS (or BP) columns
+    force: rebuild even if the store is up to date
+    chunksize: number of text rows parsed at a time
+    '''
+    import shutil
+    file = sumstats.resolve(file)
+    if is_current(file) and not force: return store_path(file)
+
+    # parse text in chunks and partition by chromosome
+    parts = {}
+    src = file
+    if file.endswith('.gz'): # BGZF blocks are decompressed in parallel
+        from io import BytesIO
+        from _utils import bgzf
+        src = BytesIO(bgzf.decompress(file))
+    for chunk in pd.read_table(src, sep = '\\s+', chunksize = chunksize):
+        if 'CHR' not in chunk.columns or not ('POS' in chunk.columns or 'BP' in chunk.columns):
+            raise ValueError(f'{file} requires CHR and POS columns to be partitioned')
+        chunk['CHR'] = _parse_chrom(chunk['CHR'])
+        for c, tmp in chunk.groupby('CHR', sort = False):
+            parts.setdefault(int(c), []).append(tmp)
+    columns = chunk.columns.tolist()
+    pos_col = 'POS' if 'POS' in columns else 'BP'
+
+    # write to a temporary directory so that readers never see a partial store
+    # the pid suffix stops concurrent array jobs from writing into the same directory
+    out = store_path(file)
+    tmpdir = f'{out}.tmp{os.getpid()}'
+    if os.path.isdir(tmpdir): shutil.rmtree(tmpdir)
+    os.mkdir(tmpdir)
+    dtypes = {}; chroms = {}
+    for c in sorted(parts.keys()):
+        df = pd.concat(parts.pop(c)).sort_values(by = pos_col, kind = 'stable')
+        os.mkdir(f'{tmpdir}/chr{c}')
+        for col in columns:
+            if col in _fixed_dtypes: arr = df[col].values.astype(_fixed_dtypes[col])
+            elif not pd.api.types.is_numeric_dtype(df[col]): arr = df[col].to_numpy().astype('S')
+            else: arr = df[col].values
+            np.save(f'{tmpdir}/chr{c}/{col}.npy', arr)
+            dtypes[col] = arr.dtype.kind if arr.dtype.kind == 'S' else arr.dtype.str
+        chroms[c] = df.shape[0]
+
+    meta = dict(source = os.path.realpath(file), columns = columns, pos = pos_col,
+                dtypes = dtypes, chroms = chroms) | _fingerprint(file)
+    json.dump(meta, open(f'{tmpdir}/meta.json','w'), indent = 1)
+    if os.path.isdir(out): shutil.rmtree(out, ignore_errors = True)
+    try: os.rename(tmpdir, out)
+    except OSError: shutil.rmtree(tmpdir) # another job has just finished the same store
+    return out
+
+def read_store(file, columns = None, chrom = None, mmap = False, compact = False):
+    '''
+    Reads summary statistics from the columnar store
+    columns: list of columns to read (projection), defaults to all
+    chrom: chromosome or list of chromosomes to read (pruning), defaults to all
+    mmap: return memory-mapped arrays, only sensible for numeric columns
+    compact: categorical alleles and float32 statistics, see _utils.sumstats
+    '''
+    meta = load_meta(file)
+    if meta is None: raise FileNotFoundError(f'No columnar store found for {file}')
+    if columns is None: columns = meta['columns']
+    missing = [col for col in columns if col not in meta['columns']]
+    if len(missing) > 0: raise KeyError(f'{missing} not found in {file}')
+
+    if chrom is None: chroms = sorted(int(c) for c in meta['chroms'])
+    elif np.ndim(chrom) == 0: chroms = [int(chrom)]
+    else: chroms = [int(c) for c in chrom]
+    chroms = [c for c in chroms if str(c) in meta['chroms']]
+    if len(chroms) == 0: return pd.DataFrame(columns = columns)
+
+    mode = 'r' if mmap else None
+    data = {}
+    for col in columns:
+        arrs = [np.load(f'{store_path(file)}/chr{c}/{col}.npy', mmap_mode = mode) for c in chroms]
+        arr = np.concatenate(arrs) if len(arrs) > 1 else arrs[0]
+        if meta['dtypes'][col] == 'S': arr = arr.astype('U')
+        data[col] = arr
+    df = pd.DataFrame(data, columns = columns)
+    return sumstats.compact(df) if compact else df
+
+def read_sumstats(file, columns = None, chrom = None, compact = False):
+    '''
+    Reader API for all downstream scripts:
+    uses the columnar store when it is up to date, otherwise parses the text file
+    columns: list of columns to read
+    chrom: chromosome or list of chromosomes to keep
+    compact: categorical alleles and float32 statistics, for read-only analyses;
+        leave False when the table is written back to text
+    '''
+    file = sumstats.resolve(file)
+    if is_current(file): return read_store(file, columns = columns, chrom = chrom, compact = compact)
+
+    usecols = columns
+    if chrom is not None and columns is not None and 'CHR' not in columns:
+        usecols = list(columns) + ['CHR']
+    df = sumstats.read(file, usecols = usecols, float32 = compact)
+    if chrom is not None:
+        chroms = [chrom] if np.ndim(chrom) == 0 else list(chrom)
+        df = df.loc[_parse_chrom(df['CHR']).isin(chroms),:]
+        if columns is not None: df = df[list(columns)]
+    return df.reset_index(drop = True)
+
+def query_region(file, chrom, start, end, columns = None):
+    '''
+    Extracts all variants with start <= POS <= end on a chromosome
+    Uses binary search over the sorted, memory-mapped POS array of the store,
+    so only the requested window is read from disk
+    The store is built on first use if it is missing or out of date
+    '''
+    file = sumstats.resolve(file)
+    if not is_current(file): convert(file)
+    meta = load_meta(file)
+    if columns is None: columns = meta['columns']
+    if str(int(chrom)) not in meta['chroms']: return pd.DataFrame(columns = columns)
+
+    prefix = f'{store_path(file)}/chr{int(chrom)}'
+    pos = np.load(f'{prefix}/{meta["pos"]}.npy', mmap_mode = 'r')
+    lo = np.searchsorted(pos, start, side = 'left')
+    hi = np.searchsorted(pos, end, side = 'right')
+    data = {}
+    for col in columns:
+        arr = np.array(np.load(f'{prefix}/{col}.npy', mmap_mode = 'r')[lo:hi])
+        if meta['dtypes'][col] == 'S': arr = arr.astype('U')
+        data[col] = arr
+    return pd.DataFrame(data, columns = columns)
+
+def locate_snp(file, snp):
+    '''
+    Returns (CHR, POS) of a SNP from the store, raises ValueError if it is not found
+    '''
+    file = sumstats.resolve(file)
+    if not is_current(file): convert(file)
+    meta = load_meta(file)
+    key = np.array(snp).astype('S')
+    for c in sorted(int(c) for c in meta['chroms']):
+        idx = np.flatnonzero(np.load(f'{store_path(file)}/chr{c}/SNP.npy', mmap_mode = 'r') == key)
+        if idx.size == 0: continue
+        pos = np.load(f'{store_path(file)}/chr{c}/{meta["pos"]}.npy', mmap_mode = 'r')
+        return c, int(pos[idx[0]])
+    raise ValueError(f'SNP {snp} not found in {file}')
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+'''
+Author: Yuankai He
+Correspondence: yh464@cam.ac.uk
+2026-10-16
+
+Single-pass, vectorised allele alignment of summary statistics to a reference
+
+One hash join on SNP, then each variant is classified as:
+    match           A1/A2 identical to the reference
+    swap            A1/A2 swapped, signed statistics and AF1 are flipped
+    flip            strand flip (complementary alleles)
+    flip_swap       strand flip and swap, signed statistics and AF1 are flipped
+    palindromic     A/T or C/G variant, strand cannot be inferred from alleles
+    mismatch        alleles do not correspond to the reference
+    no_ref          SNP not found in the reference
+'''
+
+import numpy as np
+import pandas as pd
+
+_complement = {'A':'T', 'T':'A', 'C':'G', 'G':'C'}
+# columns whose sign depends on the effect allele, and ratio columns inverted on swap
+signed_cols = ['BETA','Z','LOGOR','B','T','ZSCORE']
+ratio_cols = ['OR']
+
+def complement(alleles):
+    # single-base alleles only, indels have no strand complement (returns NaN)
+    return pd.Series(alleles).map(_complement).values
+
+def align(df, ref, palindromic = 'keep', signed = None, ratio = None, freq = 'AF1'):
+    '''
+    Aligns summary statistics to reference alleles
+    df: sumstats, requires SNP, A1, A2 columns
+    ref: reference, requires SNP, A1, A2 columns; other reference columns are
+        added to the output (columns also present in df are taken from df)
+    palindromic: 'keep' aligns A/T and C/G SNPs by direct match/swap only,
+        'drop' removes them
+    signed: columns multiplied by -1 on swap, defaults to signed_cols present in df
+    ratio: columns inverted on swap, defaults to ratio_cols present in df
+    freq: allele frequency column replaced by 1 - freq on swap
+    Output: aligned pd.DataFrame (reference columns first, then df columns),
+        dict of variant counts by category
+    '''
+    if signed is None: signed = [c for c in signed_cols if c in df.columns]
+    if ratio is None: ratio = [c for c in ratio_cols if c in df.columns]
+    n_in = df.shape[0]
+
+    # one join on SNP, reference alleles kept alongside
+    ref_cols = [c for c in ref.columns if c not in ['A1','A2'] and (c == 'SNP' or c not in df.columns)]
+    ref = ref[ref_cols + ['A1','A2']].rename(columns = {'A1':'_refA1','A2':'_refA2'})
+    out = pd.merge(ref, df, on = 'SNP', how = 'inner', sort = False)
+    a1 = out['A1'].astype(str).str.upper().values; a2 = out['A2'].astype(str).str.upper().values
+    r1 = out['_refA1'].astype(str).str.upper().values; r2 = out['_refA2'].astype(str).str.upper().values
+    c1 = complement(a1); c2 = complement(a2)
+
+    match = (a1 == r1) & (a2 == r2)
+    swap = (a1 == r2) & (a2 == r1) & ~match
+    pal = (c1 == a2)
+    flip = ~pal & ~match & ~swap & (c1 == r1) & (c2 == r2)
+    flip_swap = ~pal & ~match & ~swap & (c1 == r2) & (c2 == r1)
+    if palindromic == 'drop': keep = ~pal & (match | swap | flip | flip_swap)
+    else: keep = match | swap | flip | flip_swap
+
+    # a multi-allelic SNP ID may join several reference rows, only aligned rows are kept
+    found = int(df['SNP'].isin(ref['SNP']).sum())
+    report = dict(
+        input = n_in,
+        no_ref = n_in - found,
+        match = int((keep & match & ~pal).sum()),
+        swap = int((keep & swap & ~pal).sum()),
+        flip = int((keep & flip).sum()),
+        flip_swap = int((keep & flip_swap).sum()),
+        palindromic = int((keep & pal).sum()),
+        palindromic_dropped = int(((match | swap) & pal).sum()) if palindromic == 'drop' else 0,
+        )
+    report['mismatch'] = max(found - int(keep.sum()) - report['palindromic_dropped'], 0)
+    out = out.loc[keep,:].copy()
+    sign = np.where((swap | flip_swap)[keep], -1, 1)
+
+    # in-place sign flips
+    for col in signed: out[col] = out[col].values * sign
+    for col in ratio: out[col] = np.where(sign < 0, 1 / out[col].values, out[col].values)
+    if freq in out.columns and freq in df.columns:
+        out[freq] = np.where(sign < 0, 1 - out[freq].values, out[freq].values)
+
+    # report alleles on the reference strand and orientation
+    out['A1'] = out['_refA1'].values; out['A2'] = out['_refA2'].values
+    out = out.drop(['_refA1','_refA2'], axis = 1)
+    cols = ref_cols + ['A1','A2'] + [c for c in df.columns if c not in ref_cols + ['A1','A2']]
+    return out[cols], report
+
+def format_report(report, name = ''):
+    return f'{name}: ' + ', '.join([f'{k} = {v}' for k, v in report.items()])
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+'''
+Author: Yuankai He
+Correspondence: yh464@cam.ac.uk
+2026-10-16
+
+Persistent cache of LD (r) computed from PLINK 1 binary genotypes, shared by
+clumping (gwa_clump.py --engine native --ld) and fine-mapping (finemap_by_trait.py --ld)
+
+Two kinds of entries are kept, both keyed by the bed fileset (path and fingerprint):
+    LD rows     r of single SNPs with all SNPs within kb kilobases, as needed by
+                clumping. Rows are grouped in files by fixed blocks of block_size bp
+                of the SNP position, so any index SNP of any trait or threshold in
+                a block reads or extends the same file, and only the rows that are
+                requested are computed.
+    regions     full r matrices of a region, as needed by fine-mapping, keyed by the
+                region and SNP set, and exported in the polyfun --ld format.
+Values are stored in float32, the precision r is computed in, so cached and
+uncached clumping assign the same SNPs. The index {dirname}/index.json records
+the size and last access of every entry; entries are evicted in least-recently-used
+order once the total size exceeds max_size. Files and the index are updated under
+exclusive locks, as array jobs share the cache.
+'''
+
+import os
+import json
+import time
+import hashlib
+import numpy as np
+import pandas as pd
+
+index_name = 'index.json'
+max_size = 100 * 2**30 # bytes
+block_size = 10**6     # bp
+
+def _fingerprint(file):
+    st = os.stat(file)
+    return dict(size = st.st_size, mtime = st.st_mtime)
+
+def _chrom(chrom):
+    from _utils.sumstats import parse_chrom
+    return int(parse_chrom(pd.Series([str(chrom)])).iloc[0])
+
+def _prefix(bfile):
+    # bed fileset given as a path (with or without .bed) or an opened _utils.clump.bed
+    if not isinstance(bfile, str): bfile = bfile.prefix
+    return os.path.realpath(bfile[:-4] if bfile.endswith('.bed') else bfile)
+
+class _lock():
+    # exclusive lock on {file}.lock, for read-modify-write of shared files
+    def __init__(self, file): self.file = f'{file}.lock'
+    def __enter__(self):
+        import fcntl
+        self.f = open(self.file, 'w'); fcntl.flock(self.f, fcntl.LOCK_EX)
+    def __exit__(self, *exc):
+        import fcntl
+        fcntl.flock(self.f, fcntl.LOCK_UN); self.f.close()
+
+class ldcache():
+    '''
+    dirname: cache directory, created if missing
+    dtype: storage type of region matrices
+    '''
+    def __init__(self, dirname, max_size = max_size, dtype = np.float32, block_size = block_size):
+        self.dirname = os.path.realpath(dirname)
+        if not os.path.isdir(self.dirname): os.makedirs(self.dirname, exist_ok = True)
+        self.max_size = max_size
+        self.dtype = np.dtype(dtype)
+        self.block_size = block_size
+        self._beds = {}
+        self._blocks = {} # LD row blocks read or computed by this process, see window()
+
+    def _index(self):
+        return f'{self.dirname}/{index_name}'
+
+    def _update(self, fn):
+        # read-modify-write of the index under an exclusive lock
+        with _lock(self._index()):
+            try: entries = json.load(open(self._index())) if os.path.isfile(self._index()) else {}
+            except json.JSONDecodeError: entries = {}
+            out = fn(entries)
+            tmp = f'{self._index()}.tmp{os.getpid()}'
+            json.dump(entries, open(tmp, 'w'))
+            os.replace(tmp, self._index())
+        return out
+
+    def _touch(self, key, entry = None):
+        def _set(entries):
+            if entry is not None: entries[key] = entry
+            if key in entries: entries[key]['atime'] = time.time()
+        self._update(_set)
+
+    def bed(self, bfile):
+        # opened genotypes are kept for repeated queries on the same fileset
+        from _utils.clump import bed
+        prefix = _prefix(bfile)
+        if not prefix in self._beds: self._beds[prefix] = bfile if not isinstance(bfile, str) else bed(prefix)
+        return self._beds[prefix]
+
+    def key(self, bfile, chrom, start, end, snps = None):
+        bfile = _prefix(bfile)
+        sig = [bfile, _fingerprint(f'{bfile}.bed'), _chrom(chrom), int(start), int(end),
+               None if snps is None else sorted(set(snps))]
+        return hashlib.sha1(json.dumps(sig).encode()).hexdigest()
+
+    def _row_key(self, bfile, chrom, block, kb):
+        bfile = _prefix(bfile)
+        sig = ['rows', bfile, _fingerprint(f'{bfile}.bed'), int(chrom), int(block), self.block_size, kb]
+        return hashlib.sha1(json.dumps(sig).encode()).hexdigest()
+
+    # LD rows, for clumping
+    def window(self, bfile, row, kb = 1000):
+        '''
+        r of one SNP (row of the .bim) with every SNP on its chromosome within kb kilobases,
+        read from the cache or computed; call flush() to write new rows to the cache
+        Output: rows of the .bim of the SNPs in the window (a superset), r (float32)
+        '''
+        geno = self.bed(bfile)
+        chrom = int(geno.chrom[row]); block = int(geno.bim.BP.values[row] // self.block_size)
+        key = self._row_key(geno, chrom, block, kb)
+        if not key in self._blocks:
+            # SNPs within kb of any position in the block
+            bp = geno.bim.BP.values
+            cols = np.flatnonzero((geno.chrom == chrom) & (bp >= block * self.block_size - kb * 1000) &
+                                  (bp < (block + 1) * self.block_size + kb * 1000))
+            self._blocks[key] = dict(cols = cols, r = self._read_rows(key, cols), new = {})
+        b = self._blocks[key]
+        if not row in b['r'] and not row in b['new']:
+            b['new'][row] = geno.r(row, b['cols'])
+        return b['cols'], b['r'][row] if row in b['r'] else b['new'][row]
+
+    def _read_rows(self, key, cols):
+        file = f'{self.dirname}/{key}.npz'
+        if not os.path.isfile(file): return {}
+        try:
+            with np.load(file, allow_pickle = False) as f:
+                if not np.array_equal(f['cols'], cols): return {}
+                rows = {int(row): r for row, r in zip(f['rows'], f['r'])}
+        except (OSError, ValueError, KeyError): return {} # partially written or evicted meanwhile
+        self._touch(key)
+        return rows
+
+    def flush(self):
+        '''
+        Adds the LD rows computed by this process to the cache, merged with rows
+        added by other processes meanwhile
+        '''
+        for key, b in self._blocks.items():
+            if len(b['new']) == 0: continue
+            file = f'{self.dirname}/{key}.npz'
+            with _lock(file):
+                rows = self._read_rows(key, b['cols']) | b['new']
+                order = sorted(rows)
+                tmp = f'{file}.tmp{os.getpid()}.npz'
+                np.savez(tmp, cols = b['cols'], rows = np.array(order, dtype = np.int64),
+                         r = np.array([rows[row] for row in order], dtype = np.float32).reshape(len(order), b['cols'].size))
+                os.replace(tmp, file)
+            b['r'] = rows; b['new'] = {}
+            self._touch(key, dict(kind = 'rows', size = os.path.getsize(file)))
+        self.evict()
+
+    # region matrices, for fine-mapping
+    def compute(self, bfile, chrom, start, end, snps = None):
+        '''
+        LD of all SNPs of the bed fileset in [start, end] on chrom, optionally restricted to snps
+        Output: data frame of SNP, BP, A1, A2, row; r (float32)
+        '''
+        geno = self.bed(bfile)
+        bim = geno.bim
+        keep = (geno.chrom == _chrom(chrom)) & (bim.BP.values >= start) & (bim.BP.values <= end)
+        keep &= ~bim.SNP.duplicated().values
+        if snps is not None: keep &= bim.SNP.isin(snps).values
+        info = bim.loc[keep, ['SNP','BP','A1','A2']].reset_index(names = 'row')
+        # blocks of SNPs bound the memory use; the upper blocks are mostly read
+        # from the LRU cache of standardised genotypes of the bed object
+        rows = info.row.values; r = np.empty((rows.size, rows.size), dtype = np.float32)
+        for i in range(0, rows.size, 2048):
+            xi = geno.standardised(rows[i:i+2048])
+            for j in range(0, i + 1, 2048):
+                xj = xi if j == i else geno.standardised(rows[j:j+2048])
+                r[i:i+2048, j:j+2048] = xi @ xj.T
+                r[j:j+2048, i:i+2048] = r[i:i+2048, j:j+2048].T
+        return info, np.clip(r, -1, 1)
+
+    def get(self, bfile, chrom, start, end, snps = None):
+        '''
+        Cached LD matrix of a region, see compute(); computed and stored if absent
+        '''
+        key = self.key(bfile, chrom, start, end, snps)
+        file = f'{self.dirname}/{key}.npz'
+        if os.path.isfile(file):
+            try:
+                with np.load(file, allow_pickle = False) as f:
+                    info = pd.DataFrame({c: f[c] for c in ['row','SNP','BP','A1','A2']})
+                    r = f['r'].astype(np.float32)
+                self._touch(key)
+                return info, r
+            except (OSError, ValueError, KeyError): pass # partially written or evicted meanwhile
+        info, r = self.compute(bfile, chrom, start, end, snps)
+        tmp = f'{file}.tmp{os.getpid()}.npz'
+        np.savez_compressed(tmp, r = r.astype(self.dtype), **{c: info[c].to_numpy().astype(
+            np.int64 if c in ['row','BP'] else str) for c in info.columns})
+        os.replace(tmp, file)
+        self._touch(key, dict(kind = 'region', bfile = _prefix(bfile), chr = _chrom(chrom),
+            start = int(start), end = int(end), nsnp = int(info.shape[0]), size = os.path.getsize(file)))
+        self.evict()
+        return info, r.astype(self.dtype).astype(np.float32) # as if read from the cache
+
+    def polyfun(self, bfile, chrom, start, end):
+        '''
+        Prefix of the LD matrix of a region in the format of polyfun finemapper.py --ld,
+        exported next to the cache entry and deleted with it
+        '''
+        key = self.key(bfile, chrom, start, end)
+        prefix = f'{self.dirname}/{key}.polyfun'
+        if os.path.isfile(f'{prefix}.npz') and os.path.isfile(f'{prefix}.gz'):
+            self._touch(key) # most recently used, as finemapper is about to read it
+            return prefix
+        info, r = self.get(bfile, chrom, start, end)
+        export_polyfun(info, r, _chrom(chrom), prefix)
+        # the export counts towards the size of the entry, which is re-created if evicted meanwhile
+        size = sum(os.path.getsize(f) for f in [f'{self.dirname}/{key}.npz', f'{prefix}.npz', f'{prefix}.gz']
+                   if os.path.isfile(f))
+        def _size(entries):
+            if not key in entries: entries[key] = dict(kind = 'region', bfile = _prefix(bfile), chr = _chrom(chrom),
+                start = int(start), end = int(end), nsnp = int(info.shape[0]))
+            entries[key]['size'] = size; entries[key]['atime'] = time.time()
+        self._update(_size)
+        self.evict()
+        return prefix
+
+    def evict(self):
+        '''
+        Deletes least recently used entries until the total size is below max_size
+        '''
+        def _evict(entries):
+            size = sum(e['size'] for e in entries.values())
+            for key in sorted(entries, key = lambda k: entries[k]['atime']):
+                if size <= self.max_size: break
+                size -= entries[key]['size']
+                for suffix in ['.npz','.polyfun.npz','.polyfun.gz']:
+                    try: os.remove(f'{self.dirname}/{key}{suffix}')
+                    except FileNotFoundError: pass
+                del entries[key]
+        self._update(_evict)
+
+def export_polyfun(info, r, chrom, prefix):
+    '''
+    Writes an LD matrix in the format read by polyfun finemapper.py --ld:
+    {prefix}.gz with the SNPs and {prefix}.npz with a sparse upper triangle,
+    the diagonal is halved as the matrix is symmetrised by R + R.T on loading
+    '''
+    from scipy import sparse
+    snps = pd.DataFrame(dict(rsid = info.SNP, chromosome = chrom, position = info.BP,
+                             allele1 = info.A1, allele2 = info.A2))
+    r = np.triu(np.asarray(r, dtype = np.float32), k = 1) + np.eye(r.shape[0], dtype = np.float32) / 2
+    pid = os.getpid()
+    snps.to_csv(f'{prefix}.tmp{pid}.gz', sep = '\t', index = False)
+    sparse.save_npz(f'{prefix}.tmp{pid}.npz', sparse.csr_matrix(r))
+    os.replace(f'{prefix}.tmp{pid}.gz', f'{prefix}.gz')
+    os.replace(f'{prefix}.tmp{pid}.npz', f'{prefix}.npz')
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+'''
+Author: Yuankai He
+Correspondence: yh464@cam.ac.uk
+2026-10-16
+
+Progress manifest for per-subject outputs (e.g. phenotypes written by pheno.py)
+
+Each output is recorded once, when it has been validated after writing, in an
+SQLite table {subj, kind, file, nrow, ncol, size, mtime}, indexed by subject and
+kind. Planning a batch is then a single query for subjects whose outputs all have
+the expected shapes, instead of reading every output file. The recorded size and
+mtime allow verify() to detect outputs that were modified or deleted afterwards.
+Standard library only.
+'''
+
+import os
+import sqlite3
+
+class manifest():
+    '''
+    file: SQLite database, created if missing
+    '''
+    def __init__(self, file):
+        self.file = file
+        self._db = sqlite3.connect(file, timeout = 60)
+        self._db.execute('''CREATE TABLE IF NOT EXISTS outputs (
+            subj TEXT NOT NULL, kind TEXT NOT NULL, file TEXT NOT NULL,
+            nrow INTEGER, ncol INTEGER, size INTEGER, mtime REAL,
+            PRIMARY KEY (subj, kind))''')
+        self._db.commit()
+
+    def record(self, subj, kind, file, shape, commit = True):
+        '''
+        Records a validated output, call after it has been written and checked
+        shape: (nrow, ncol) of the output, (n,) for vectors
+        '''
+        st = os.stat(file)
+        shape = tuple(shape) + (1,) * (2 - len(shape))
+        self._db.execute('INSERT OR REPLACE INTO outputs VALUES (?,?,?,?,?,?,?)',
+            (subj, kind, os.path.realpath(file), shape[0], shape[1], st.st_size, st.st_mtime))
+        if commit: self._db.commit()
+
+    def commit(self):
+        self._db.commit()
+
+    def remove(self, subj, kind = None):
+        if kind is None: self._db.execute('DELETE FROM outputs WHERE subj = ?', (subj,))
+        else: self._db.execute('DELETE FROM outputs WHERE subj = ? AND kind = ?', (subj, kind))
+        self._db.commit()
+
+    def complete(self, shapes):
+        '''
+        Subjects with all outputs recorded with the expected shapes
+        shapes: dict of (nrow, ncol) by kind, (n,) for vectors
+        '''
+        if len(shapes) == 0: return set()
+        shapes = {k: tuple(v) + (1,) * (2 - len(v)) for k, v in shapes.items()}
+        cond = ' OR '.join(['(kind = ? AND nrow = ? AND ncol = ?)'] * len(shapes))
+        args = [x for k, v in shapes.items() for x in (k, *v)]
+        query = f'SELECT subj FROM outputs WHERE {cond} GROUP BY subj HAVING COUNT(*) = ?'
+        return set(row[0] for row in self._db.execute(query, args + [len(shapes)]))
+
+    def verify(self, threads = 16):
+        '''
+        Compares all records against the file system and removes those whose
+        files were modified or deleted since they were recorded
+        Output: number of stale records removed
+        '''
+        from multiprocessing.pool import ThreadPool
+        rows = self._db.execute('SELECT subj, kind, file, size, mtime FROM outputs').fetchall()
+        def _stale(row):
+            try: st = os.stat(row[2])
+            except FileNotFoundError: return True
+            return st.st_size != row[3] or st.st_mtime != row[4]
+        # stat calls are latency bound on the cluster file system
+        with ThreadPool(threads) as pool:
+            stale = [row[:2] for row, s in zip(rows, pool.map(_stale, rows, chunksize = 256)) if s]
+        self._db.executemany('DELETE FROM outputs WHERE subj = ? AND kind = ?', stale)
+        self._db.commit()
+        return len(stale)
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+'''
+Author: Yuankai He
+Correspondence: yh464@cam.ac.uk
+2026-10-16
+
+Residualisation of many phenotypes against one shared covariate design
+
+The design is factorised once (QR, or SVD if it is rank deficient) and all
+phenotype columns are residualised as a single matrix product. Columns with
+missing values are grouped by their missingness pattern, and each group is
+residualised against the design rows it observes, so that every column gives
+the same residuals as a separate least squares fit on its complete rows.
+'''
+
+import numpy as np
+
+def basis(X, rtol = None):
+    '''
+    Orthonormal basis of the column space of the design X (n x k)
+    rtol: relative tolerance of the rank, defaults to the LAPACK convention
+    '''
+    X = np.asarray(X, dtype = np.float64)
+    if rtol is None: rtol = max(X.shape) * np.finfo(np.float64).eps
+    q, r = np.linalg.qr(X)
+    d = np.abs(np.diag(r))
+    if d.size == 0 or d.min() > rtol * d.max(): return q
+    # rank deficient, e.g. a dummy level absent from the observed rows
+    u, s, _ = np.linalg.svd(X, full_matrices = False)
+    return u[:, s > rtol * s.max()] if s.size > 0 else u[:, :0]
+
+def residualise(Y, X):
+    '''
+    Y: phenotypes (n x p), NaN for missing values
+    X: covariate design (n x k) including the constant, no missing values
+    Output: residuals (n x p), NaN where Y is missing
+    '''
+    Y = np.asarray(Y, dtype = np.float64)
+    X = np.asarray(X, dtype = np.float64)
+    out = np.full(Y.shape, np.nan)
+    miss = np.isnan(Y)
+    if not miss.any():
+        q = basis(X)
+        return Y - q @ (q.T @ Y)
+    patterns, group = np.unique(miss.T, axis = 0, return_inverse = True)
+    for i, pattern in enumerate(patterns):
+        rows = ~pattern; cols = group.reshape(-1) == i
+        if rows.sum() == 0: continue
+        q = basis(X[rows])
+        y = Y[np.ix_(rows, cols)]
+        out[np.ix_(rows, cols)] = y - q @ (q.T @ y)
+    return out
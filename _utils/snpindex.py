@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+'''
+Author: Yuankai He
+Correspondence: yh464@cam.ac.uk
+2026-10-16
+
+Persistent rsID -> byte offset index over all GWAS summary statistics of a
+phenotype group, replacing grep-based SNP extraction
+
+Data structure: {dirname}/{group}/.snpindex/
+    manifest.json       size and mtime of each indexed file
+    {trait}.snp.npy     SNP IDs of the file, sorted
+    {trait}.off.npy     byte offset of the corresponding line in the file
+    {trait}.gzi.npy     for BGZF (.gz) files, compressed and uncompressed block
+                        offsets; line offsets are then in uncompressed bytes
+The index is updated incrementally: only new or modified files are re-indexed.
+'''
+
+import os
+import json
+import numpy as np
+import pandas as pd
+
+def index_dir(group_dir):
+    return f'{group_dir}/.snpindex'
+
+def _fingerprint(file):
+    st = os.stat(file)
+    return dict(size = st.st_size, mtime = st.st_mtime)
+
+def _update_manifest(idir, fn):
+    # read-modify-write of the manifest under an exclusive lock, as jobs on the same group share it
+    import fcntl
+    manifest_file = f'{idir}/manifest.json'
+    with open(f'{manifest_file}.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try: manifest = json.load(open(manifest_file)) if os.path.isfile(manifest_file) else {}
+        except json.JSONDecodeError: manifest = {}
+        out = fn(manifest)
+        tmp = f'{manifest_file}.tmp{os.getpid()}'
+        json.dump(manifest, open(tmp, 'w'), indent = 1)
+        os.replace(tmp, manifest_file)
+        fcntl.flock(lock, fcntl.LOCK_UN)
+    return out
+
+def _read_manifest(idir):
+    # shared lock, so read-only queries neither write to the group nor serialise
+    import fcntl
+    manifest_file = f'{idir}/manifest.json'
+    try: lock = open(f'{manifest_file}.lock', 'r')
+    except FileNotFoundError: lock = None # never written; the manifest is replaced atomically anyway
+    try:
+        if lock is not None: fcntl.flock(lock, fcntl.LOCK_SH)
+        try: return json.load(open(manifest_file)) if os.path.isfile(manifest_file) else {}
+        except json.JSONDecodeError: return {}
+    finally:
+        if lock is not None: lock.close()
+
+def _save(file, arr):
+    tmp = f'{file}.tmp{os.getpid()}.npy'
+    np.save(tmp, arr)
+    os.replace(tmp, file)
+
+def _line_offsets(file, blocksize = 1 << 26):
+    # byte offsets of every line after the header, computed on raw bytes
+    # file may also be a binary buffer, e.g. decompressed BGZF content
+    offsets = []
+    with (open(file, 'rb') if isinstance(file, str) else file) as f:
+        start = len(f.readline())
+        pos = start
+        while True:
+            block = f.read(blocksize)
+            if len(block) == 0: break
+            nl = np.flatnonzero(np.frombuffer(block, dtype = np.uint8) == 10)
+            offsets.append(nl + pos + 1)
+            pos += len(block)
+    offsets = np.concatenate([np.array([start])] + offsets).astype(np.int64)
+    return offsets[offsets < pos] # drop the offset after the trailing newline
+
+def index_file(file, out_prefix):
+    '''
+    Writes the sorted SNP IDs and line offsets of one sumstats file
+    '''
+    if file.endswith('.gz'):
+        from io import BytesIO
+        from _utils import bgzf
+        data = bgzf.decompress(file)
+        snps = pd.read_table(BytesIO(data), sep = '\\s+', usecols = ['SNP'])['SNP'].to_numpy().astype('S')
+        offsets = _line_offsets(BytesIO(data))
+        _save(f'{out_prefix}.gzi.npy', np.array(bgzf.block_index(file), dtype = np.int64).T)
+    else:
+        snps = pd.read_table(file, sep = '\\s+', usecols = ['SNP'])['SNP'].to_numpy().astype('S')
+        offsets = _line_offsets(file)
+        if os.path.isfile(f'{out_prefix}.gzi.npy'): os.remove(f'{out_prefix}.gzi.npy')
+    if snps.size != offsets.size:
+        raise ValueError(f'{file}: {snps.size} SNPs but {offsets.size} lines, check for blank lines')
+    order = np.argsort(snps, kind = 'stable')
+    _save(f'{out_prefix}.snp.npy', snps[order])
+    _save(f'{out_prefix}.off.npy', offsets[order])
+
+def update(group_dir, ext = 'fastGWA'):
+    '''
+    Indexes new or modified sumstats files in a group directory and removes
+    entries for deleted files; returns {trait name: file name}
+    Files may be plain text or BGZF-compressed (.{ext}.gz)
+    '''
+    from fnmatch import fnmatch
+    idir = index_dir(group_dir)
+    if not os.path.isdir(idir): os.mkdir(idir)
+    manifest = _read_manifest(idir)
+
+    traits = {}
+    for x in sorted(os.listdir(group_dir)):
+        if not fnmatch(x.replace('.gz',''), f'*.{ext}') or fnmatch(x, f'*_X.{ext}*'): continue
+        trait = x.replace('.gz','').replace(f'.{ext}','')
+        if trait in traits: continue # plain and compressed copies, the first one is indexed
+        traits[trait] = x
+        fp = _fingerprint(f'{group_dir}/{x}')
+        if manifest.get(trait) == fp: continue
+        index_file(f'{group_dir}/{x}', f'{idir}/{trait}')
+        _update_manifest(idir, lambda m: m.update({trait: fp})) # saves progress
+
+    def _remove(manifest):
+        for trait in [t for t in manifest if t not in traits]:
+            for suffix in ['snp','off','gzi']:
+                try: os.remove(f'{idir}/{trait}.{suffix}.npy')
+                except FileNotFoundError: pass
+            del manifest[trait]
+    if any(t not in traits for t in manifest): _update_manifest(idir, _remove)
+    return traits
+
+def lookup_file(file, prefix, snps):
+    '''
+    Extracts rows for a list of SNPs from one sumstats file using its index,
+    all rows of multi-allelic or duplicated IDs are returned, as by fgrep -w
+    Returns None if none of the SNPs are found
+    '''
+    keys = np.unique(np.array(snps).astype('S'))
+    index = np.load(f'{prefix}.snp.npy', mmap_mode = 'r')
+    lo = np.searchsorted(index, keys, side = 'left')
+    n = np.searchsorted(index, keys, side = 'right') - lo
+    if n.sum() == 0: return None
+    idx = np.repeat(lo - np.cumsum(n) + n, n) + np.arange(n.sum()) # every index in [lo, hi)
+    offsets = np.sort(np.load(f'{prefix}.off.npy', mmap_mode = 'r')[idx])
+
+    from io import BytesIO
+    if file.endswith('.gz'):
+        from _utils import bgzf
+        gzi = np.load(f'{prefix}.gzi.npy')
+        lines = bgzf.read_lines(file, [0] + offsets.tolist(), index = (gzi[:,0].tolist(), gzi[:,1].tolist()))
+    else:
+        with open(file, 'rb') as f:
+            lines = [f.readline()]
+            for off in offsets:
+                f.seek(off)
+                lines.append(f.readline())
+    return pd.read_table(BytesIO(b''.join(lines)), sep = '\\s+')
+
+def lookup(group_dir, snps, ext = 'fastGWA', workers = 8):
+    '''
+    Extracts rows for a list of SNPs from all sumstats files in a group
+    group_dir: directory containing sumstats of a phenotype group
+    snps: list of rsIDs
+    workers: maximum number of threads for concurrent file access
+    Output: dict of {trait: pd.DataFrame}, traits with no hits are omitted
+    '''
+    from multiprocessing.pool import ThreadPool
+    files = update(group_dir, ext = ext)
+    traits = list(files.keys())
+    idir = index_dir(group_dir)
+    def _lookup(trait):
+        return lookup_file(f'{group_dir}/{files[trait]}', f'{idir}/{trait}', snps)
+    with ThreadPool(max(1, min(workers, len(traits)))) as pool:
+        hits = pool.map(_lookup, traits)
+    return {t: h for t, h in zip(traits, hits) if h is not None}
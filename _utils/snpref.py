@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+'''
+Author: Yuankai He
+Correspondence: yh464@cam.ac.uk
+2026-10-16
+
+Memory-mapped SNP reference (e.g. ukb_snp_info.txt) for allele harmonisation
+
+The text reference is converted once into {ref}.mmap/, one .npy array per
+column with all rows sorted by SNP ID. Workers open the arrays read-only with
+mmap, so any number of processes share a single copy through the page cache,
+and SNPs are located by binary search instead of a full-table merge.
+'''
+
+import os
+import json
+import numpy as np
+import pandas as pd
+
+def mmap_path(ref):
+    return f'{ref}.mmap'
+
+def _fingerprint(file):
+    st = os.stat(file)
+    return dict(size = st.st_size, mtime = st.st_mtime)
+
+def is_current(ref):
+    meta = f'{mmap_path(ref)}/meta.json'
+    if not os.path.isfile(meta): return False
+    meta = json.load(open(meta))
+    fp = _fingerprint(ref)
+    return meta['size'] == fp['size'] and meta['mtime'] == fp['mtime']
+
+def convert(ref, force = False):
+    '''
+    Converts a text SNP reference with a SNP column into sorted binary arrays
+    '''
+    import shutil
+    from _utils.sumstats import parse_chrom
+    if is_current(ref) and not force: return mmap_path(ref)
+    df = pd.read_table(ref, sep = '\\s+')
+    df = df.iloc[np.argsort(df['SNP'].to_numpy().astype('S'), kind = 'stable'),:]
+
+    out = mmap_path(ref)
+    tmpdir = f'{out}.tmp{os.getpid()}'
+    if os.path.isdir(tmpdir): shutil.rmtree(tmpdir)
+    os.mkdir(tmpdir)
+    dtypes = {}
+    for col in df.columns:
+        if col == 'CHR': arr = parse_chrom(df[col]).values # X/Y/MT coded as 23/24/26
+        elif col in ['POS','BP']: arr = df[col].values.astype(np.int32)
+        elif not pd.api.types.is_numeric_dtype(df[col]): arr = df[col].to_numpy().astype('S')
+        else: arr = df[col].values
+        np.save(f'{tmpdir}/{col}.npy', arr)
+        dtypes[col] = arr.dtype.kind
+    meta = dict(source = os.path.realpath(ref), columns = df.columns.tolist(),
+                dtypes = dtypes, nrow = df.shape[0]) | _fingerprint(ref)
+    json.dump(meta, open(f'{tmpdir}/meta.json','w'), indent = 1)
+    if os.path.isdir(out): shutil.rmtree(out, ignore_errors = True)
+    try: os.rename(tmpdir, out)
+    except OSError: shutil.rmtree(tmpdir)
+    return out
+
+class snpref():
+    '''
+    Read-only, memory-mapped SNP reference
+    ref: text reference file, converted on first use if necessary
+    '''
+    def __init__(self, ref):
+        if not is_current(ref): convert(ref)
+        self._dir = mmap_path(ref)
+        meta = json.load(open(f'{self._dir}/meta.json'))
+        self.columns = meta['columns']
+        self._dtypes = meta['dtypes']
+        self._cols = {col: np.load(f'{self._dir}/{col}.npy', mmap_mode = 'r') for col in self.columns}
+        self.snp = self._cols['SNP']
+
+    def __len__(self):
+        return self.snp.size
+
+    def lookup(self, snps):
+        '''
+        Row indices of all reference entries for the given SNP IDs
+        (one SNP ID may have several entries, e.g. multi-allelic sites)
+        '''
+        keys = np.unique(np.asarray(snps).astype('S'))
+        lo = np.searchsorted(self.snp, keys, side = 'left')
+        hi = np.searchsorted(self.snp, keys, side = 'right')
+        n = hi - lo
+        return np.repeat(lo, n) + np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+
+    def subset(self, snps, columns = None):
+        '''
+        Reference table restricted to the given SNP IDs
+        '''
+        if columns is None: columns = self.columns
+        idx = self.lookup(snps)
+        data = {}
+        for col in columns:
+            arr = self._cols[col][idx]
+            if self._dtypes[col] == 'S': arr = arr.astype('U')
+            data[col] = arr
+        return pd.DataFrame(data, columns = columns)
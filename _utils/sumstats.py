@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+'''
+Author: Yuankai He
+Correspondence: yh464@cam.ac.uk
+2026-10-16
+
+Compact, dtype-aware loader for the summary statistics formats used in the pipeline
+
+Recognised layouts (by header):
+    fastGWA     CHR SNP POS A1 A2 N AF1 BETA SE P
+    ldsc        SNP A1 A2 Z N (.sumstats)
+    smr         probeID ProbeChr Gene Probe_bp topSNP ... p_SMR p_HEIDI (.smr)
+    clumped     CHR F SNP BP P TOTAL NSIG S05 S01 S001 S0001 SP2 (PLINK .clumped)
+    magma       GENE CHR START STOP NSNPS NPARAM N ZSTAT P (.genes.out)
+Columns are parsed directly into compact types: categorical alleles, int8
+chromosome, int32 positions, float32 effect sizes and frequencies. P-values are
+kept in float64 as float32 underflows below ~1e-38 and loses genome-wide
+significant values. Counts are stored as int32, or int64 if they do not fit.
+Files ending in .gz are read and written as BGZF with multi-threaded (de)compression.
+'''
+
+import os
+import numpy as np
+import pandas as pd
+
+# checked in order, the first layout whose columns are all in the header is used
+layouts = dict(
+    smr = ['probeID','ProbeChr','Gene','Probe_bp','topSNP','A1','A2','b_SMR','se_SMR','p_SMR'],
+    clumped = ['CHR','F','SNP','BP','P','TOTAL','NSIG','SP2'],
+    magma = ['GENE','CHR','START','STOP','NSNPS','ZSTAT','P'],
+    fastGWA = ['CHR','SNP','POS','A1','A2','BETA','SE','P'],
+    ldsc = ['SNP','A1','A2','Z','N'],
+    )
+
+_chrom_codes = {'X': 23, 'Y': 24, 'XY': 25, 'MT': 26, 'M': 26}
+chrom_cols = ['CHR','ProbeChr','topSNP_chr']
+pos_cols = ['POS','BP','START','STOP','Probe_bp','topSNP_bp']
+allele_cols = ['A1','A2']
+count_cols = ['N','N_CAS','N_CON','NSNPS','NPARAM','TOTAL','NSIG','S05','S01','S001','S0001',
+              'F','nsnp_HEIDI']
+float_cols = ['AF1','Freq','BETA','SE','Z','OR','LOGOR','T','ZSTAT','INFO',
+              'b_GWAS','se_GWAS','b_eQTL','se_eQTL','b_SMR','se_SMR']
+
+def parse_chrom(series):
+    # fastGWA uses integers, but external sumstats may use X/Y/MT
+    if pd.api.types.is_numeric_dtype(series): return series.astype(np.int8)
+    series = series.astype(str).str.upper().str.replace('CHR','')
+    return series.replace(_chrom_codes).astype(np.int8)
+
+def resolve(file):
+    # falls back to the BGZF-compressed copy if the plain text file is absent
+    if not os.path.isfile(file) and os.path.isfile(f'{file}.gz'): return f'{file}.gz'
+    return file
+
+def header(file):
+    file = resolve(file)
+    if file.endswith('.gz'):
+        import gzip
+        f = gzip.open(file, 'rt')
+    else: f = open(file)
+    with f: return f.readline().split()
+
+def detect(columns):
+    '''
+    Returns the name of the layout matching a list of column names, or None
+    '''
+    for name, cols in layouts.items():
+        if all(c in columns for c in cols): return name
+    return None
+
+def _parse_dtypes(columns, float32 = True):
+    # dtypes that are safe to apply at parse time, CHR and counts are cast afterwards
+    dtype = {}
+    for col in columns:
+        if col in allele_cols: dtype[col] = 'category'
+        elif col in float_cols and float32: dtype[col] = np.float32
+    return dtype
+
+def compact(df, float32 = True):
+    '''
+    Casts the columns of a sumstats DataFrame to compact types in place
+    float32: downcast effect sizes and frequencies; set False when the table is
+        written back to text, so that no digits are lost
+    '''
+    for col in df.columns:
+        s = df[col]
+        if col in chrom_cols:
+            try: df[col] = parse_chrom(s)
+            except (ValueError, TypeError): pass # unplaced contigs, left as is
+        elif col in allele_cols and not isinstance(s.dtype, pd.CategoricalDtype): df[col] = s.astype('category')
+        elif col in pos_cols and s.dtype.kind in 'iu': df[col] = s.astype(np.int32)
+        elif col in count_cols and s.dtype.kind in 'iuf':
+            if s.isna().any() or (s.dtype.kind == 'f' and (s % 1 != 0).any()):
+                if float32: df[col] = s.astype(np.float32)
+            else:
+                # at least int32, so that arithmetic on counts (e.g. N * N) does not overflow
+                s = pd.to_numeric(s.astype(np.int64), downcast = 'integer')
+                df[col] = s.astype(np.int32) if s.dtype.itemsize < 4 else s
+        elif col in float_cols and float32 and s.dtype == np.float64:
+            df[col] = s.astype(np.float32)
+    return df
+
+def read(file, usecols = None, float32 = True, threads = None, **kwargs):
+    '''
+    Reads a whitespace-delimited sumstats file with compact dtypes
+    The detected layout (or None) is stored in df.attrs['layout']
+    usecols: list of columns to read (projection), defaults to all
+    float32: see compact()
+    threads: decompression threads for .gz files
+    kwargs: passed to pd.read_table
+    '''
+    file = resolve(file)
+    columns = header(file); layout = detect(columns)
+    if usecols is not None:
+        missing = [col for col in usecols if col not in columns]
+        if len(missing) > 0: raise KeyError(f'{missing} not found in {file}')
+        columns = [col for col in columns if col in usecols]
+    src = file
+    if file.endswith('.gz'):
+        from io import BytesIO
+        from _utils import bgzf
+        src = BytesIO(bgzf.decompress(file, threads = threads))
+    df = pd.read_table(src, sep = '\\s+', usecols = usecols,
+                       dtype = _parse_dtypes(columns, float32), **kwargs)
+    df = compact(df, float32 = float32)
+    df.attrs['layout'] = layout
+    return df
+
+def write(df, file, threads = None):
+    '''
+    Writes a tab-delimited sumstats file, as BGZF if the file name ends in .gz
+    '''
+    if not file.endswith('.gz'): return df.to_csv(file, sep = '\t', index = False)
+    import io
+    from _utils import bgzf
+    # the binary writer publishes the file only if to_csv completes, see bgzf.writer
+    with bgzf.writer(file, threads = threads) as w:
+        f = io.TextIOWrapper(w, encoding = 'utf-8', newline = '')
+        try: df.to_csv(f, sep = '\t', index = False)
+        finally: f.detach() # flushes the text buffer, leaves closing to the writer
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+'''
+Author: Yuankai He
+Correspondence: yh464@cam.ac.uk
+2026-10-16
+
+Declarative subject QC rules for the UKB fetch, with cached per-subject masks
+
+Each rule is a dict with a rule type, the UKB columns it reads and, optionally,
+the exclusion counter it reports to:
+    equal       all columns have the same value
+    na          value is NA
+    notna       value is not NA
+    range       min <= value <= max (unparseable values fail)
+    isin        value is one of values
+Rules are applied in order and each subject is counted against the first rule it
+fails. The pass/fail mask of every rule is evaluated once per fetch and rule set,
+and saved as a bitset keyed by eid in {fetch}.qc_{rules hash}.npz, so later
+extractions and subject screens do not parse the QC columns again.
+'''
+
+import os
+import json
+import numpy as np
+
+default_rules = [
+    dict(name = 'sex', rule = 'equal', cols = ['f.31.0.0','f.22001.0.0'], count = 'sex'), # genetic sex ~ self-reported
+    dict(name = 'het', rule = 'na', cols = ['f.22027.0.0'], count = 'het'), # excessive heterozygosity, must be NA
+    dict(name = 'pc1_na', rule = 'notna', cols = ['f.22009.0.1']), # missing PCs are excluded but not counted
+    dict(name = 'pc1', rule = 'range', cols = ['f.22009.0.1'], min = -39.574, max = 16.714, count = 'pc'), # 5SD, manually calculated
+    dict(name = 'pc2_na', rule = 'notna', cols = ['f.22009.0.2']),
+    dict(name = 'pc2', rule = 'range', cols = ['f.22009.0.2'], min = -17.145, max = 23.645, count = 'pc'),
+    dict(name = 'eth', rule = 'isin', cols = ['f.21000.0.0'], values = ['1','1001','1002','1003','1004'], count = 'eth'), # European ancestry
+    ]
+
+def load_rules(file = None):
+    # JSON list of rules in the format of default_rules
+    if file is None: return default_rules
+    return json.load(open(file))
+
+def _rules_hash(rules):
+    import hashlib
+    return hashlib.sha1(json.dumps(rules, sort_keys = True).encode()).hexdigest()[:10]
+
+def mask_path(fetch, rules = None):
+    if rules is None: rules = default_rules
+    return f'{fetch}.qc_{_rules_hash(rules)}.npz'
+
+def _fingerprint(file):
+    st = os.stat(file)
+    return dict(size = st.st_size, mtime = st.st_mtime)
+
+def evaluate(rule, values):
+    '''
+    Pass/fail of a single rule for all subjects, independent of the other rules
+    values: list of arrays, one per column in rule['cols']
+    '''
+    if rule['rule'] == 'equal':
+        return np.all([v == values[0] for v in values[1:]], axis = 0)
+    if rule['rule'] == 'na': return np.char.upper(values[0]) == 'NA'
+    if rule['rule'] == 'notna': return np.char.upper(values[0]) != 'NA'
+    if rule['rule'] == 'range':
+        import pandas as pd
+        x = pd.to_numeric(pd.Series(values[0]), errors = 'coerce').to_numpy(dtype = np.float64)
+        return (x >= rule['min']) & (x <= rule['max'])
+    if rule['rule'] == 'isin': return np.isin(values[0], rule['values'])
+    raise ValueError(f'Unknown QC rule type: {rule["rule"]}')
+
+def _read_columns(fetch, cols):
+    # eids and QC columns from the column store if current, otherwise from text
+    from _utils import ukbstore
+    hdr = open(fetch).readline().replace('\n','').split('\t')
+    missing = [c for c in cols if not c in hdr]
+    if len(missing) > 0: raise KeyError(f'{missing} not found in {fetch}')
+    ids = [0] + [hdr.index(c) for c in cols]
+    if ukbstore.is_current(fetch):
+        data = ukbstore.ukbstore(fetch).read_columns(ids)
+    else:
+        data = [[] for _ in ids]
+        with open(fetch) as fin:
+            fin.readline()
+            for line in fin:
+                line = line.replace('\n','').split('\t')
+                if len(line) != len(hdr): continue # reported by ukb_extract
+                for d, i in zip(data, ids): d.append(line[i])
+    eids = np.array(data[0], dtype = np.int64)
+    return eids, {c: np.array(d, dtype = str) for c, d in zip(cols, data[1:])}
+
+class qcmask():
+    '''
+    Per-subject pass/fail masks of a set of QC rules, sorted by eid
+    '''
+    def __init__(self, eids, masks, rules):
+        self.eids = eids
+        self.masks = masks
+        self.rules = rules
+
+    @classmethod
+    def compute(cls, fetch, rules = None):
+        if rules is None: rules = default_rules
+        cols = list(dict.fromkeys(c for rule in rules for c in rule['cols']))
+        eids, values = _read_columns(fetch, cols)
+        masks = np.array([evaluate(rule, [values[c] for c in rule['cols']]) for rule in rules],
+                         dtype = bool).reshape(len(rules), eids.size)
+        eids, first = np.unique(eids, return_index = True) # first occurrence of duplicated eids
+        return cls(eids, masks[:, first], rules)
+
+    def save(self, file, fingerprint):
+        tmp = f'{file}.tmp{os.getpid()}.npz'
+        np.savez(tmp, eid = self.eids, bits = np.packbits(self.masks, axis = 1),
+                 rules = json.dumps(self.rules), fingerprint = json.dumps(fingerprint))
+        os.replace(tmp, file)
+
+    @classmethod
+    def load(cls, file):
+        f = np.load(file)
+        eids = f['eid']
+        masks = np.unpackbits(f['bits'], axis = 1, count = eids.size).astype(bool)
+        return cls(eids, masks, json.loads(str(f['rules'])))
+
+    def lookup(self, eids):
+        '''
+        Output: boolean array of eids found, and masks (rules x subjects) for them
+        '''
+        eids = np.asarray(eids).astype(np.int64)
+        idx = np.clip(np.searchsorted(self.eids, eids), 0, max(self.eids.size - 1, 0))
+        found = self.eids[idx] == eids if self.eids.size > 0 else np.zeros(eids.size, dtype = bool)
+        return found, self.masks[:, idx]
+
+    def apply(self, eids, keep = None, counts = None):
+        '''
+        Applies the rules in order to a list of eids
+        keep: subjects to consider (e.g. requested subjects), defaults to all
+        counts: dict of exclusion counts by counter name, updated in place
+        Output: boolean mask of subjects passing QC
+        '''
+        found, masks = self.lookup(eids)
+        keep = found if keep is None else np.asarray(keep) & found
+        for rule, mask in zip(self.rules, masks):
+            fail = keep & ~mask
+            if counts is not None and rule.get('count') is not None:
+                counts[rule['count']] = counts.get(rule['count'], 0) + int(fail.sum())
+            keep = keep & ~fail
+        return keep
+
+    def passed(self, eids):
+        return self.apply(eids)
+
+def get(fetch, rules = None, force = False):
+    '''
+    Loads the QC masks of a fetch, evaluating and saving them if missing or out of date
+    '''
+    if rules is None: rules = default_rules
+    file = mask_path(fetch, rules)
+    fp = _fingerprint(fetch)
+    if os.path.isfile(file) and not force:
+        if json.loads(str(np.load(file)['fingerprint'])) == fp: return qcmask.load(file)
+    qc = qcmask.compute(fetch, rules)
+    qc.save(file, fp)
+    return qc
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+'''
+Author: Yuankai He
+Correspondence: yh464@cam.ac.uk
+2026-10-16
+
+Column-selectable binary store for the UKB tab fetch (e.g. ukb677594.tab)
+
+The fetch is converted once into {fetch}.colstore/:
+    meta.json       source fingerprint, header, number of rows, block size,
+                    rows whose length does not match the header (excluded)
+    eid.txt         eids in file order, one per line
+    data.bin        row blocks; within a block, the values of each column for
+                    all rows of the block are stored contiguously, '\\n'-separated
+    index.bin       int64 byte offsets into data.bin, (ncols + 1) per block
+Reading a set of columns touches only their byte ranges, adjacent columns
+(e.g. all instances and arrays of one field) are read in one request per block.
+Pure standard library, so that ukb_extract_nodep.py can use it as well.
+'''
+
+import os
+import json
+import mmap
+import struct
+from array import array
+
+def store_path(fetch):
+    return f'{fetch}.colstore'
+
+def _fingerprint(file):
+    st = os.stat(file)
+    return dict(size = st.st_size, mtime = st.st_mtime)
+
+def load_meta(fetch):
+    meta = f'{store_path(fetch)}/meta.json'
+    if not os.path.isfile(meta): return None
+    return json.load(open(meta))
+
+def is_current(fetch):
+    meta = load_meta(fetch)
+    if meta is None: return False
+    fp = _fingerprint(fetch)
+    return meta['size'] == fp['size'] and meta['mtime'] == fp['mtime']
+
+def convert(fetch, blocksize = 1000, force = False, log = None):
+    '''
+    Converts a tab-delimited UKB fetch into a column-selectable store
+    blocksize: rows per block, bounds memory use to blocksize split lines
+    log: optional file object for progress messages
+    '''
+    import shutil
+    if is_current(fetch) and not force: return store_path(fetch)
+    out = store_path(fetch)
+    tmpdir = f'{out}.tmp{os.getpid()}'
+    if os.path.isdir(tmpdir): shutil.rmtree(tmpdir)
+    os.mkdir(tmpdir)
+
+    fin = open(fetch, 'r')
+    hdr = fin.readline().replace('\n','').split('\t')
+    ncols = len(hdr)
+    fdata = open(f'{tmpdir}/data.bin', 'wb')
+    findex = open(f'{tmpdir}/index.bin', 'wb')
+    feid = open(f'{tmpdir}/eid.txt', 'w')
+    malformed = []; nrow = 0; nblocks = 0
+
+    def write_block(rows):
+        index = array('q')
+        for col in zip(*rows):
+            index.append(fdata.tell())
+            fdata.write('\n'.join(col).encode())
+        index.append(fdata.tell())
+        index.tofile(findex)
+        feid.write('\n'.join(row[0] for row in rows) + '\n')
+
+    rows = []
+    for line in fin:
+        line = line.replace('\n','').split('\t')
+        if len(line) != ncols: malformed.append((line[0], len(line))); continue
+        rows.append(line)
+        if len(rows) == blocksize:
+            write_block(rows); nrow += len(rows); nblocks += 1; rows = []
+            if log is not None and nblocks % 50 == 0: print(f'converted {nrow} subjects', file = log)
+    if len(rows) > 0: write_block(rows); nrow += len(rows); nblocks += 1
+    for f in [fin, fdata, findex, feid]: f.close()
+
+    meta = dict(source = os.path.realpath(fetch), header = hdr, nrow = nrow, nblocks = nblocks,
+                blocksize = blocksize, malformed = malformed) | _fingerprint(fetch)
+    json.dump(meta, open(f'{tmpdir}/meta.json','w'))
+    if os.path.isdir(out): shutil.rmtree(out, ignore_errors = True)
+    try: os.rename(tmpdir, out)
+    except OSError: shutil.rmtree(tmpdir) # another job has just finished the same store
+    return out
+
+class ukbstore():
+    '''
+    Read-only access to a converted UKB fetch
+    fetch: path of the original tab file
+    '''
+    def __init__(self, fetch):
+        meta = load_meta(fetch)
+        if meta is None: raise FileNotFoundError(f'No column store found for {fetch}')
+        self._dir = store_path(fetch)
+        self.header = meta['header']
+        self.nrow = meta['nrow']
+        self.nblocks = meta['nblocks']
+        self.blocksize = meta['blocksize']
+        self.malformed = meta['malformed']
+
+    def eids(self):
+        return open(f'{self._dir}/eid.txt').read().splitlines()
+
+    def read(self, col_ids):
+        '''
+        Reads columns by their index in the header
+        Output: list of rows in file order, each a list of values in the order of col_ids
+        '''
+        columns = self.read_columns(col_ids)
+        return [list(row) for row in zip(*columns)]
+
+    def read_columns(self, col_ids):
+        '''
+        Reads columns by their index in the header
+        Output: list of columns in the order of col_ids, each a list of values in file order
+        '''
+        ncols = len(self.header)
+        # runs of adjacent columns are read with a single request per block
+        ids = sorted(set(col_ids))
+        runs = []
+        for c in ids:
+            if len(runs) > 0 and runs[-1][1] == c: runs[-1][1] = c + 1
+            else: runs.append([c, c + 1])
+
+        columns = {c: [] for c in ids}
+        with open(f'{self._dir}/index.bin', 'rb') as findex, open(f'{self._dir}/data.bin', 'rb') as fdata:
+            index = mmap.mmap(findex.fileno(), 0, access = mmap.ACCESS_READ)
+            for b in range(self.nblocks):
+                base = b * (ncols + 1) * 8
+                for start, stop in runs:
+                    offsets = struct.unpack_from(f'={stop - start + 1}q', index, base + start * 8)
+                    fdata.seek(offsets[0])
+                    buf = fdata.read(offsets[-1] - offsets[0])
+                    for k, c in enumerate(range(start, stop)):
+                        values = buf[offsets[k] - offsets[0]: offsets[k+1] - offsets[0]].decode().split('\n')
+                        columns[c].extend(values)
+            index.close()
+        return [columns[c] for c in col_ids]
@@ -87,6 +87,7 @@ def main(args):
     from fnmatch import fnmatch
     import pandas as pd
     import matplotlib.pyplot as plt
+    from _utils import sumstats
     
     # output directory
     outdir = f'{args.out}/{args.pheno}/{args.prefix}'
@@ -101,7 +102,7 @@ def main(args):
             '.annot','').replace('.out','')
         if os.path.isfile(f'{outdir}/{args.prefix}.{gset}.manhattan.pdf') and not args.force:
             continue
-        df = pd.read_table(f'{magma_dir}/{x}', sep = '\\s+')
+        df = sumstats.read(f'{magma_dir}/{x}')
         fig = plot_magma(df, ref)
         fig.savefig(f'{outdir}/{args.prefix}.{gset}.manhattan.pdf', bbox_inches = 'tight')
         fig.savefig(f'{outdir}/{args.prefix}.{gset}.manhattan.png', bbox_inches = 'tight')
@@ -119,7 +120,7 @@ def main(args):
         df = []
         for y in range(1,25):
             if not os.path.isfile(f'{smr_dir}/{x}/chr{y}.smr'): continue
-            df.append(pd.read_table(f'{smr_dir}/{x}/chr{y}.smr', sep = '\\s+'))
+            df.append(sumstats.read(f'{smr_dir}/{x}/chr{y}.smr'))
         df = pd.concat(df, axis = 0)
         fig = plot_smr(df)
         fig.savefig(f'{outdir}/{args.prefix}.{qtl}.manhattan.pdf', bbox_inches = 'tight')
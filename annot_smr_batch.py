@@ -16,7 +16,8 @@ def format_gwa(gwa, tmpgwa):
     # input file name, usually fastGWA format
     import pandas as pd
     import numpy as np
-    df = pd.read_table(gwa)
+    from _utils.gwastore import read_sumstats
+    df = read_sumstats(gwa)
     out = [0,0,0,0,0,0,0,0] # 8 columns
     
     for col in df.columns:
@@ -42,7 +43,7 @@ def main(args):
     if not os.path.isdir(tmpdir): os.system(f'mkdir -p {tmpdir}')
     
     # array submitter
-    from _utils import array_submitter
+    from _utils import array_submitter, cache
     submitter = array_submitter.array_submitter(
         name = f'annot_smr_{args.pheno[0]}',
         n_cpu = 2,
@@ -50,6 +51,10 @@ def main(args):
         debug = True
     )
     
+    # formatted sumstats read by the jobs of this batch; outputs that are still stale
+    # include those of jobs queued by earlier batches, which read the same files
+    needed = set()
+    
     # annotation utility for single fastGWA and single xQTL dataset
     def annot_smr(gwa, xqtl, bfile, out, smr, force):
         # output directory
@@ -57,9 +62,17 @@ def main(args):
         prefix = '.'.join(prefix.split('.')[:-1])
         if not os.path.isdir(out): os.system(f'mkdir -p {out}')
         
-        # munge input summary statistics
-        if not os.path.isfile(f'{tmpdir}/{prefix}.txt') or force:
-            format_gwa(gwa, f'{tmpdir}/{prefix}.txt')
+        # munge input summary statistics, redone only if the GWAS has changed,
+        # and only when an SMR job needs them, as the temp directory is evicted
+        tmpgwa = f'{tmpdir}/{prefix}.txt'
+        def prepare():
+            needed.add(tmpgwa)
+            if force or not cache.valid(tmpgwa, [gwa], dict(stage = 'smr')):
+                format_gwa(gwa, tmpgwa)
+                cache.store(tmpgwa, [gwa], dict(stage = 'smr'))
+        def stale(smr_out):
+            # SMR outputs older than the GWAS are redone, the formatted copy may have been rebuilt after eviction
+            return force or not cache.newer(smr_out, [gwa])
         
         # parse input xqtl file
         from fnmatch import fnmatch
@@ -96,7 +109,8 @@ def main(args):
                 bfile_list.append(None)
         
         if os.path.isfile(f'{xqtl}.besd') and os.path.isfile(f'{bfile}.bed'):
-            if not os.path.isfile(f'{out}/{prefix}.smr') or force:
+            if stale(f'{out}/{prefix}.{qtl}.smr'):
+                prepare()
                 submitter.add(
                 f'{smr} --bfile {bfile} --gwas-summary {tmpdir}/{prefix}.txt '+
                 f'--beqtl-summary {xqtl} --out {out}/{prefix}.{qtl}'
@@ -111,7 +125,8 @@ def main(args):
             
             for x, b, chrom in zip(xqtl_list, bfile_list, range(1,25)):
                 if x == None or b == None: continue
-                if not os.path.isfile(f'{out}/{prefix}.{qtl}/chr{chrom}.smr') or force:
+                if stale(f'{out}/{prefix}.{qtl}/chr{chrom}.smr'):
+                    prepare()
                     submitter.add(
                     f'{smr} --bfile {b} --gwas-summary {tmpdir}/{prefix}.txt '+
                     f'--beqtl-summary {x} --out {out}/{prefix}.{qtl}/chr{chrom}'
@@ -148,6 +163,7 @@ def main(args):
                     force = args.force
                     )
     
+    cache.evict(tmpdir, keep = needed) # formatted sumstats are pure cache
     submitter.submit()
 
 if __name__ == '__main__':
@@ -11,8 +11,9 @@ Upstream workflow:
 '''
 
 def read_smr(file):
-    import pandas as pd
-    df = pd.read_table(file, usecols = ['probeID','ProbeChr','Gene', 'topSNP','A1','A2','b_SMR','se_SMR','p_SMR','p_HEIDI','nsnp_HEIDI'])
+    from _utils import sumstats
+    df = sumstats.read(file, usecols = ['probeID','ProbeChr','Gene', 'topSNP','A1','A2','b_SMR','se_SMR','p_SMR','p_HEIDI','nsnp_HEIDI'],
+                       float32 = False)
     df.columns = ['probe','chr','gene','SNP','A1','A2','beta','se','p','p_heidi','nsnp_heidi']
     return df
 
@@ -13,6 +13,7 @@ Required input:
 def main(args):
     if args.force: force = '-f'
     else: force = ''
+    ld = f'--ld {args.ld}' if args.ld is not None else ''
     
     # make output directories
     import os
@@ -56,7 +57,7 @@ def main(args):
         
         submitter.add(
           f'python finemap_by_trait.py {x} -i {y} -d {args._in} -c {args.clump} -o {args.out}'+
-          f' -p {args.p:.4e} --polyfun {args.polyfun} -b {args.bfile} {force}')
+          f' -p {args.p:.4e} --polyfun {args.polyfun} -b {args.bfile} {ld} {force}')
     submitter.submit()
     # submitter.debug()
     
@@ -75,6 +76,7 @@ if __name__ == '__main__':
       default = '../params/bed/')
     parser.add_argument('--polyfun', help = 'directory of POLYFUN tool',
       default = '/rds/project/rb643/rds-rb643-ukbiobank2/Data_Users/yh464/toolbox/polyfun/')
+    parser.add_argument('--ld', help = 'LD cache directory shared by all traits, see _utils/ldcache.py')
     parser.add_argument('-p', dest = 'p', help = 'p-value', default = 3.1076e-11, type = float)
     parser.add_argument('-f','--force',dest = 'force', help = 'force output',
       default = False, action = 'store_true')
@@ -82,6 +84,7 @@ if __name__ == '__main__':
     import os
     for arg in ['_in','out','clump','bfile']:
         exec(f'args.{arg} = os.path.realpath(args.{arg})')
+    if args.ld is not None: args.ld = os.path.realpath(args.ld)
     
     from _utils import path, cmdhistory, logger
     logger.splash(args)
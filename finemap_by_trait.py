@@ -33,6 +33,8 @@ parser.add_argument('-b', '--bfile', dest = 'bfile', help = 'directory of bed bi
   default = '/rds/project/rb643/rds-rb643-ukbiobank2/Data_Users/yh464/params/bed/')
 parser.add_argument('--polyfun', help = 'directory of POLYFUN tool',
   default = '/rds/project/rb643/rds-rb643-ukbiobank2/Data_Users/yh464/toolbox/polyfun/')
+parser.add_argument('--ld', help = 'LD cache directory, LD matrices are read from or added to the cache '+
+  'instead of computed by finemapper.py from the bed files')
 parser.add_argument('-p', dest = 'p', help = 'p-value', type = float, default = 3.1076e-11)
 parser.add_argument('-f','--force',dest = 'force', help = 'force output',
   default = False, action = 'store_true')
@@ -41,6 +43,7 @@ args = parser.parse_args()
 import os
 for arg in ['dir','clump','out','bfile']:
     exec(f'args.{arg} = os.path.realpath(args.{arg})')
+if args.ld is not None: args.ld = os.path.realpath(args.ld)
 
 from _utils import logger
 logger.splash(args)
@@ -78,16 +81,20 @@ overlaps = overlaps[prefix]
 overlaps = overlaps[overlaps > 0]
 snps = overlaps.index
 
-df = pd.read_csv(f'{args.dir}/{args.pheno}/{args._in}', sep = '\s+', 
-                 usecols = ['SNP','CHR','POS','N'])
+from _utils.gwastore import read_sumstats
+df = read_sumstats(f'{args.dir}/{args.pheno}/{args._in}', columns = ['SNP','CHR','POS','N'], compact = True)
 n = df['N'].max()
 
+if args.ld is not None:
+    from _utils.ldcache import ldcache
+    ld = ldcache(args.ld)
+
 summary = []
 print('Following SNPs are being fine-mapped')
 print(snps.to_numpy())
 for snp in snps:
     pos = df.loc[df.SNP == snp, 'POS'].iloc[0]
-    start = int(min(pos-5*10**5,1))
+    start = int(max(pos-5*10**5,1))
     stop = start + 10**6
     c = df.loc[df.SNP == snp, 'CHR'].iloc[0]
     if c < 23: geno = f'{args.bfile}/chr{c:.0f}'
@@ -98,9 +105,11 @@ for snp in snps:
     if (not os.path.isfile(f'{stats_dir}/{prefix}_chr{c}_{start}_{stop}.csv')) or args.force:
       scripts_path = os.path.realpath(__file__)
       scripts_path = os.path.dirname(scripts_path)
+      # loci shared by many phenotypes have their LD computed once in the cache
+      ldsrc = f'--geno {geno}' if args.ld is None else f'--ld {ld.polyfun(geno, c, start, stop)}'
       cmd = f'python {args.polyfun}/finemapper.py '+ \
         f'--method susie --n {n:.0f} --sumstats {stats_dir}/{prefix}.snpvar --chr {c:.0f} ' + \
-        f'--start {start:.0f} --end {stop:.0f} --geno {geno} --out {stats_dir}/{prefix}_chr{c}_{start}_{stop}.txt '+ \
+        f'--start {start:.0f} --end {stop:.0f} {ldsrc} --out {stats_dir}/{prefix}_chr{c}_{start}_{stop}.txt '+ \
         '--max-num-causal 5 --allow-swapped-indel-alleles'
       o = os.system(cmd)
       
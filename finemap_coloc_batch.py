@@ -34,6 +34,7 @@ def main(args):
     
     # scans directory for fastGWA files
     from _utils.path import find_gwas, find_clump
+    from _utils import sumstats
     flist = []
     gwa = []
     if len(args.pheno) > 1 and args.filter:
@@ -67,7 +68,7 @@ def main(args):
     for x,y in gwa:
         print(f'Identifying blocks for {x}/{y}')
         clump,_ = find_clump(f'{args.clump}/{x}',y,args.p)
-        try: clump = pd.read_table(clump, sep = '\\s+', usecols = ['CHR','BP'])
+        try: clump = sumstats.read(clump, usecols = ['CHR','BP'])
         except: continue
         
         # select 1MB chunks for fine-mapping
@@ -24,6 +24,9 @@ optlist = list(
 )
 args = parse_args(OptionParser(option_list = optlist))
 args$input = strsplit(args$input, ':')[[1]]
+# directory of this script, so that gwa_region.py is found from any working directory
+script_dir = grep('^--file=', commandArgs(trailingOnly = FALSE), value = T)
+script_dir = if (length(script_dir) > 0) dirname(normalizePath(sub('^--file=', '', script_dir[1]))) else here()
 print('Input options')
 print(args)
 
@@ -53,10 +56,13 @@ if (! file.exists(cache_betas) | ! file.exists(cache_ses) | args$force) {
     trait = paste0(basename(dirname(file)), '_',
                    basename(file) %>% gsub('.fastGWA','',.))
     print(paste0('Reading file ', file))
-    df = read.table(file, header = T) %>% as_tibble()
-    df = df[df$CHR == args$chr,]
-    df = df[df$POS > args$start,]
-    df = df[df$POS < args$stop,]
+    # region query through the positional index of the columnar store (gwa_region.py)
+    # the region is an open interval, as in the previous whole-file filter
+    # integers are formatted explicitly, as paste() prints e.g. 1e+06 for round doubles
+    cmd = paste('python', shQuote(file.path(script_dir, 'gwa_region.py')), shQuote(file), '--chr', args$chr,
+                '--start', format(as.integer(args$start + 1), scientific = F),
+                '--stop', format(as.integer(args$stop - 1), scientific = F))
+    df = read.table(pipe(cmd), header = T) %>% as_tibble()
     if ('OR' %in% colnames(df)) df$BETA = log(df$OR)
     df = df[,c('CHR','SNP','POS','BETA','SE')]
     
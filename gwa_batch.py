@@ -36,6 +36,7 @@ def main(args):
     
     force = '-f' if args.force else ''
     xchr = '' if args.xchr else '--no-xchr'
+    gz = '--gz' if args.gz else ''
     
     # check validity of the phenotype file
     import pandas as pd
@@ -65,14 +66,15 @@ def main(args):
       trait = c[i]
       out_fname = outdir + trait
       # check existing files
-      if os.path.isfile(f'{out_fname}.fastGWA') and not args.force:
+      if (os.path.isfile(f'{out_fname}.fastGWA') or os.path.isfile(f'{out_fname}.fastGWA.gz')) \
+          and not args.force:
         print(f'Trait already analysed for: {trait}')
         continue
       
       submitter.add(
           f'python gwa_by_trait.py -i {f} -o {out_fname} --mpheno {mpheno} --dcov {args.dcov} '+
           f'--qcov {args.qcov} --bed {args.bed} --grm {args.grm} --gcta {args.gcta} --maf {args.maf} '+
-          f'--keep {args.keep} {xchr} --xbed {args.xbed} {force}'
+          f'--keep {args.keep} {xchr} --xbed {args.xbed} {gz} {force}'
           )
     submitter.submit()
 
@@ -90,6 +92,8 @@ if __name__ == '__main__':
       default = '../gwa/')
     io.add_argument('--dcov',dest = 'dcov', help = 'DISCRETE covariance file',
       default = '../params/discrete_covars.txt')
+    io.add_argument('--gz', help = 'Write BGZF-compressed output',
+      default = False, action = 'store_true')
     io.add_argument('--qcov',dest = 'qcov', help = 'QUANTITATIVE covariance file',
       default = '../params/quantitative_covars.txt')
     io.add_argument('--bed',dest = 'bed', help = 'PLINK2 binaries',
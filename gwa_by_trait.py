@@ -51,13 +51,13 @@ def main(args):
         xbfile = f'--bfile {args.xbed}'
     else: args.xchr = False; print('Warning: skipping X chromosome because no bed file found')
     
+    if args.gz and os.path.isfile(f'{args.out}.fastGWA.gz') and not args.force: return
     if not os.path.isfile(f'{args.out}.fastGWA') or args.force:
         os.system(f'{args.gcta} --fastGWA-mlm {bfile} --grm-sparse {args.grm} '+
             f'--pheno {args._in} --mpheno {args.mpheno} --qcovar {args.qcov} --covar {args.dcov}'+
             f' {ft} --keep {args.keep} --out {args.out}')
     
-    if not args.xchr: return
-    if not os.path.isfile(f'{args.out}_X.fastGWA') or args.force:
+    if args.xchr and (not os.path.isfile(f'{args.out}_X.fastGWA') or args.force):
         xkeep_file = args.keep.replace('.txt','_X.txt')
         if not os.path.isfile(xkeep_file):
             xkeep = pd.read_table(args.keep)
@@ -71,6 +71,11 @@ def main(args):
             f' {ft} --keep {xkeep_file} --model-only --out {args.out}_Xmodel')
         os.system(f'{args.gcta} {xbfile} --load-model {args.out}_Xmodel.fastGWA --geno 0.1 --out {args.out}_X')
         os.system(f'tail -n +2 {args.out}_X.fastGWA >> {args.out}.fastGWA')
+    
+    # block-compress the output, readers decompress .gz transparently
+    if args.gz and os.path.isfile(f'{args.out}.fastGWA'):
+        from _utils.bgzf import compress_file
+        compress_file(f'{args.out}.fastGWA')
 
 if __name__ == '__main__':
     import argparse
@@ -82,6 +87,8 @@ if __name__ == '__main__':
     io.add_argument('-i','--in', dest = '_in', help = 'Phenotype file', required = True)
     io.add_argument('-o','--out',dest  = 'out', help = 'Output prefix', required = True)
     io.add_argument('--mpheno', help = 'Phenotype ID in file, required for fastGWA')
+    io.add_argument('--gz', help = 'Write BGZF-compressed output ({out}.fastGWA.gz)',
+      default = False, action = 'store_true')
     io.add_argument('--dcov',dest = 'dcov', help = 'DISCRETE covariance file',
       default = '../params/discrete_covars.txt')
     io.add_argument('--qcov',dest = 'qcov', help = 'QUANTITATIVE covariance file',
@@ -13,14 +13,20 @@ Requires following inputs:
 import argparse
 parser = argparse.ArgumentParser()
 parser.add_argument('-i','--in', dest = '_in', help = 'Input directory')
-parser.add_argument('--file', dest = 'file', help = 'Input file (fastGWA)')
+parser.add_argument('--file', dest = 'file', nargs = '+', help = 'Input file(s) (fastGWA)')
 parser.add_argument('-b','--bfile', dest = 'bfile', help = 'BED file list',
   default = '../params/bed_files_ukb.txt')
 parser.add_argument('--plink', dest = 'plink', help = 'Path to PLINK *1.9* executable', 
   default = '/rds/project/rb643-1/rds-rb643-ukbiobank2/Data_Genetics/plink')
+parser.add_argument('--engine', help = 'plink: PLINK 1.9 --clump on temp files; native: _utils/clump.py '+
+  'reading the bed files in-process, genotypes are reused across input files',
+  choices = ['plink','native'], default = 'plink')
+parser.add_argument('--ld', help = 'LD cache directory for the native engine, shared with finemap_by_trait.py')
 parser.add_argument('-o','--out', dest = 'out', help = 'Output directory')     # defaults to input dir
-parser.add_argument('-p',help = 'p-value threshold',
-  default = 5e-8, type = float) # or 3.1076e-11, or 5e-6; 3.1076e-11 is derived from matrix decomposition
+parser.add_argument('-p',help = 'p-value threshold(s), all are clumped in a single pass',
+  default = [5e-8], type = float, nargs = '+') # or 3.1076e-11, or 5e-6; 3.1076e-11 is derived from matrix decomposition
+parser.add_argument('-t','--threads', dest = 'threads', help = 'Number of chromosomes clumped concurrently',
+  default = 1, type = int)
 parser.add_argument('-f','--force', dest = 'force', help = 'Force overwrite',
   default = False, action = 'store_true')
 args = parser.parse_args()
@@ -28,72 +34,120 @@ args = parser.parse_args()
 import os
 for arg in ['_in','out','bfile']:
     exec(f'args.{arg} = os.path.realpath(args.{arg})')
+if args.ld is not None: args.ld = os.path.realpath(args.ld)
 if type(args.out) == type(None): args.out = args._in
 
 from _utils import logger
 logger.splash(args)
 
+def clump_plink(df, c, bf, tmpdir, file, p, args):
+    # clumps one chromosome with PLINK 1.9, through temp files
+    from _utils import sumstats
+    df_tmp = df.loc[df.CHR == c, :].sort_values(by = 'P')
+    tmpgwa = f'{tmpdir}/{file}_chr{c}.fastGWA'
+    tmpsnp = f'{tmpdir}/{file}_chr{c}.snplist'
+    df_tmp.to_csv(tmpgwa, index = False, sep = '\t')
+    df_tmp['SNP'].to_csv(tmpsnp, index = False, header = False)
+    tmpout = f'{tmpdir}/{file}_chr{c}'
+    
+    if not os.path.isfile(f'{tmpout}.clumped') or args.force:
+        # clumps by chromosome
+        os.system(f'{args.plink} --noweb --bfile {bf} --clump {tmpgwa} '+
+          f'--clump-field P --clump-p1 {p} --clump-p2 1 --clump-r2 0.1 '+       # p1 must be determined by matrix decomposition
+          f'--clump-kb 1000 --extract {tmpsnp} --out {tmpout}')
+    if os.path.isfile(f'{tmpout}.clumped'):
+        return sumstats.read(f'{tmpout}.clumped')
+
+def clump_native(df, c, geno, p, ld = None):
+    # clumps one chromosome in-process, same parameters as clump_plink
+    from _utils import clump
+    return clump.clump(df.loc[df.CHR == c, ['SNP','P']], geno, p1 = p, p2 = 1, r2 = 0.1, kb = 1000, ld = ld)
+
+# per-process state of the native engine: bed files are opened once and reused across input files
+_genos = {}
+_ld = None
+
+def _init(ld_dir):
+    global _ld
+    if ld_dir is not None:
+        from _utils.ldcache import ldcache
+        _ld = ldcache(ld_dir)
+
+def clump_chrom(job):
+    # clumps one chromosome of one file, in a worker process if -t > 1
+    import time
+    from _utils import clump
+    c, df, bf, tmpdir, f, p = job
+    tic = time.perf_counter()
+    if args.engine == 'plink': res = clump_plink(df, c, bf, tmpdir, f, p, args)
+    else:
+        if not c in _genos: _genos[c] = clump.bed(bf)
+        res = clump_native(df, c, _genos[c], p, _ld)
+    return c, res, time.perf_counter() - tic
+
 def main(args):
     import time
     import pandas as pd
     import numpy as np
     
     tic = time.perf_counter()
-    idx = 0
     blist = np.loadtxt(args.bfile,dtype = 'U')
-    prefix = '.'.join(args.file.split('.')[:-1])
-    out = f'{args.out}/{prefix}_{args.p:.0e}.clumped'
+    if args.threads > 1:
+      # fork, as this script parses arguments and runs main() on import;
+      # the pool is kept across input files so workers keep their opened bed files
+      from multiprocessing import get_context
+      pool = get_context('fork').Pool(args.threads, initializer = _init, initargs = (args.ld,))
+    else:
+      pool = None; _init(args.ld)
     
-    tmpdir = f'/rds/project/rb643/rds-rb643-ukbiobank2/Data_Users/yh464/temp/clump_cache/{os.path.basename(args._in)}_{args.p:.0e}'
-    if not os.path.isdir(tmpdir): os.system(f'mkdir -p {tmpdir}')
+    # index SNPs are visited in order of p-value and clumps only claim SNPs from later ones,
+    # so the clumps at a stricter threshold are those at the loosest one with index p <= threshold
+    pmax = max(args.p)
+    tmpdir = f'/rds/project/rb643/rds-rb643-ukbiobank2/Data_Users/yh464/temp/clump_cache/{os.path.basename(args._in)}_{pmax:.0e}'
+    if args.engine == 'plink' and not os.path.isdir(tmpdir): os.system(f'mkdir -p {tmpdir}')
     os.chdir(args.out)                                                             # we do not need the input dir
     
-    df = pd.read_table(f'{args._in}/{args.file}', sep = '\t')
-    sf = df.P.values < args.p                                                      # sig filter, must be determined by matrix decomposition
-    if sf.sum() == 0:
-      print(f'File {args.file} contains no significant SNP, skipping')
-      toc = time.perf_counter() - tic
-      print(f'Total time = {toc:.3f}.')
-      return
-    
-    df_sig = df.loc[sf,:].sort_values(by = 'P')
-    df_sig.to_csv(out.replace('clumped','siglist'), sep = '\t',index = False)      # export top few snps
-    
-    tmp_flist = []                                                                 # list of temp files
-    chrs = df_sig['CHR'].unique()
-    idx = 0
-    
-    out_df = []
-    for c in chrs:                                                                 # every chromosome that is sig, sorted 
-      idx += 1
-      # separates files by chromosome
-      df_tmp = df.loc[df.CHR == c, :].sort_values(by = 'P')
-      tmpgwa = f'{tmpdir}/{args.file}_chr{c}.fastGWA'
-      tmpsnp = f'{tmpdir}/{args.file}_chr{c}.snplist'
-      df_tmp.to_csv(tmpgwa, index = False, sep = '\t')
-      df_tmp['SNP'].to_csv(tmpsnp, index = False, header = False)
-      bf = blist[c-1]                                                              # c ranges 1-23
-      tmpout = f'{tmpdir}/{args.file}_chr{c}'
-      tmp_flist.append(tmpgwa)
-      tmp_flist.append(tmpsnp)
-      tmp_flist.append(f'{tmpout}.hh')
-      tmp_flist.append(f'{tmpout}.clumped')
+    from _utils.gwastore import read_sumstats, is_current
+    from _utils import clump
+    for f in args.file:
+      prefix = '.'.join(f.replace('.gz','').split('.')[:-1])
+      outs = {p: f'{args.out}/{prefix}_{p:.0e}' for p in args.p}
+      if all(os.path.isfile(f'{out}.clumped') for out in outs.values()) and not args.force and len(args.file) > 1: continue
+      
+      file = f'{args._in}/{f}'
+      if is_current(file):
+        # only read chromosomes containing significant SNPs from the columnar store
+        tmp = read_sumstats(file, columns = ['CHR','P'])
+        df = read_sumstats(file, chrom = tmp.loc[tmp.P <= pmax, 'CHR'].unique())
+      else: df = read_sumstats(file)
+      sf = df.P.values <= pmax                                                       # sig filter, must be determined by matrix decomposition
+      if sf.sum() == 0:
+        print(f'File {f} contains no significant SNP, skipping')
+        toc = time.perf_counter() - tic
+        print(f'Total time = {toc:.3f}.')
+        continue
+      
+      df_sig = df.loc[sf,:].sort_values(by = 'P')
+      chrs = df_sig['CHR'].unique()
+      jobs = [(c, df.loc[df.CHR == c, :], blist[c-1], tmpdir, f, pmax) for c in chrs] # c ranges 1-23
+      
+      res = {}
+      for idx, (c, r, t) in enumerate(map(clump_chrom, jobs) if pool is None else
+                                      pool.imap_unordered(clump_chrom, jobs), 1):
+        res[c] = r
+        toc = time.perf_counter() - tic
+        print(f'Finished clumping chromosome {c}, {idx}/{len(chrs)} chromosome time = {t:.3f}, total time = {toc:.3f}.')
       
-      if not os.path.isfile(f'{tmpout}.clumped') or args.force:
-          # clumps by chromosome
-          os.system(f'{args.plink} --noweb --bfile {bf} --clump {tmpgwa} '+
-            f'--clump-field P --clump-p1 {args.p} --clump-p2 1 --clump-r2 0.1 '+       # p1 must be determined by matrix decomposition
-            f'--clump-kb 1000 --extract {tmpsnp} --out {tmpout}')
-      if os.path.isfile(f'{tmpout}.clumped'):
-          out_df.append(pd.read_table(f'{tmpout}.clumped', sep = '\s+'))
-      toc = time.perf_counter() - tic
-      print(f'Finished clumping chromosome {c}, {idx}/{len(chrs)} time = {toc:.3f}.')
+      # merged in the order of the most significant SNP per chromosome, as when clumped sequentially
+      out_df = [res[c] for c in chrs if res[c] is not None]
+      out_df = pd.concat(out_df, axis = 0) if len(out_df) > 0 else pd.DataFrame(columns = clump.clumped_cols)
+      for p, out in outs.items():
+        if (df_sig.P.values <= p).sum() == 0:
+          print(f'File {f} contains no significant SNP at p <= {p:.0e}')
+          continue
+        df_sig.loc[df_sig.P <= p, :].to_csv(f'{out}.siglist', sep = '\t',index = False) # export top few snps
+        clump.write(out_df.loc[out_df.P <= p, :], f'{out}.clumped')
     
-    out_df = pd.concat(out_df, axis = 0)
-    out_df.to_csv(out, sep = '\t', index = False)
-    # # clears temp
-    # for x in tmp_flist:
-    #   try: os.remove(x)
-    #   except: pass
+    if pool is not None: pool.close(); pool.join()
 
 main(args)
\ No newline at end of file
@@ -25,11 +25,13 @@ def main(args):
     log = open(f'{logdir}/gwa_clump.log','w')                                       # log file
     
     # array submitter
-    timeout = 5 if args.p < 1e-8 else 20
+    timeout = 5 if max(args.p) < 1e-8 else 20                                     # cost is that of the loosest threshold
+    timeout *= args.chunk
     from _utils import array_submitter
     submitter = array_submitter.array_submitter(
-        name = f'clump_{args.pheno[0]}_{args.p:.0e}',
+        name = f'clump_{args.pheno[0]}_{max(args.p):.0e}',
         timeout = timeout,
+        n_cpu = args.threads,
         debug = False
         )
     
@@ -49,15 +51,17 @@ def main(args):
       
       os.chdir(args.out)
       os.chdir(x)
+      todo = []
       for y in flist:
-        out_fname = y.replace('fastGWA','clumped')
-        if os.path.isfile(out_fname) and (not args.force): continue
-        scripts_path = os.path.realpath(__file__)
-        scripts_path = os.path.dirname(scripts_path)
+        prefix = '.'.join(y.replace('.gz','').split('.')[:-1])
+        if all(os.path.isfile(f'{prefix}_{p:.0e}.clumped') for p in args.p) and (not args.force): continue
+        todo.append(y)
+      # the native engine reuses genotypes across files, so several files share a job
+      for i in range(0, len(todo), args.chunk):
         submitter.add(
           # f'bash {scripts_path}/pymaster.sh '+
-          f'python gwa_clump.py --in {args._in}/{x}/ --file {y} -b {args.bfile} --plink {args.plink} '+
-          f'-p {args.p} -o {args.out}/{x}/ {force}')
+          f'python gwa_clump.py --in {args._in}/{x}/ --file {" ".join(todo[i:i+args.chunk])} -b {args.bfile} '+
+          f'--plink {args.plink} --engine {args.engine} -p {" ".join([str(p) for p in args.p])} -o {args.out}/{x}/ -t {args.threads} {force}')
     submitter.submit()
     
 if __name__ == '__main__':
@@ -72,10 +76,16 @@ if __name__ == '__main__':
       default = '/rds/project/rb643/rds-rb643-ukbiobank2/Data_Genetics/plink')
     parser.add_argument('-b','--bfile', dest = 'bfile', help = 'BED file list',
       default = '../params/bed_files_ukb.txt')
+    parser.add_argument('--engine', help = 'Clumping engine, see gwa_clump.py',
+      choices = ['plink','native'], default = 'plink')
+    parser.add_argument('--chunk', help = 'Number of GWAS files per job',
+      default = 1, type = int)
+    parser.add_argument('-t','--threads', dest = 'threads', help = 'Number of chromosomes clumped concurrently per job',
+      default = 1, type = int)
     parser.add_argument('-o','--out', dest = 'out', help = 'Output directory',
       default = '../clump/')
-    parser.add_argument('-p',help = 'p-value threshold',
-      default = 5e-8, type = float) # or 3.1076e-11, or 1e-6
+    parser.add_argument('-p',help = 'p-value threshold(s), all are clumped in a single job',
+      default = [5e-8], type = float, nargs = '+') # or 3.1076e-11, or 1e-6
     parser.add_argument('-f','--force', dest = 'force', help = 'Force output',
       default = False, action = 'store_true')
     args = parser.parse_args()
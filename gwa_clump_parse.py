@@ -11,33 +11,70 @@ Also identifies overlaps between different phenotypes within a phenotype group
 Output format: tabular, columns = loci (one representative SNP in the clump), rows = phenotypes
 '''
 
+def clump_edges(df):
+    '''
+    Parses the SP2 column once into (index SNP, member SNP) pairs
+    Output: data frame of SNP, member
+    '''
+    edges = df[['SNP','SP2']].dropna()
+    edges = edges.assign(member = edges.SP2.str.split(',')).explode('member')
+    edges['member'] = edges.member.str.replace(r'\(\d+\)$', '', regex = True) # strips the '(1)' file tag
+    return edges.loc[edges.member != 'NONE', ['SNP','member']]
+
 def identify_clumps(df):
-    from fnmatch import fnmatch
-    clumps = []
-    snps = df['SNP'].unique()
+    '''
+    Groups the index SNPs of df into loci: two index SNPs belong to the same locus
+    if either is listed in the SP2 of the other, merged transitively by union-find
+    Output: list of clumps (lists of SNPs in the order of df); clump[0] represents the locus
+    '''
+    import numpy as np
+    import pandas as pd
+    snps = pd.Index(df['SNP'].unique())
     if len(snps) == 0: return []
-    current_clump = [snps[0]]
-    for i in snps[1:]:
-        for j in current_clump:
-            all_p2 = df.loc[df.SNP==j,'SP2'] # lists all SNPs within clumping distance
-            in_clump = False
-            for p2 in all_p2:
-                if fnmatch(p2, f'*{i}*'):
-                    in_clump = True; break
-            if in_clump:
-                break
-        if in_clump:
-            current_clump.append(i); continue
-        else:
-            clumps.append(current_clump); current_clump = [i]
-    clumps.append(current_clump)
-    return clumps
+    edges = clump_edges(df)
+    i = snps.get_indexer(edges.SNP); j = snps.get_indexer(edges.member)
+    keep = (i >= 0) & (j >= 0)
+
+    parent = np.arange(len(snps))
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]; x = parent[x]
+        return x
+    for a, b in zip(i[keep], j[keep]):
+        ra, rb = find(a), find(b)
+        if ra != rb: parent[max(ra, rb)] = min(ra, rb) # the root is the first SNP of the locus
+    roots = np.array([find(x) for x in range(len(snps))])
+
+    clumps = {}
+    for snp, root in zip(snps, roots): clumps.setdefault(root, []).append(snp)
+    return list(clumps.values())
+
+def locus_map(clumps):
+    '''
+    Output: series mapping each SNP to the representative SNP of its locus
+    '''
+    import pandas as pd
+    return pd.Series({snp: clump[0] for clump in clumps for snp in clump}, dtype = object)
+
+def overlap_matrix(df, clumps, by):
+    '''
+    Binary table of loci (columns) with a significant SNP for each phenotype (rows)
+    by: column(s) of df identifying a phenotype
+    '''
+    import pandas as pd
+    df = df.reset_index(drop = True) # concatenated tables repeat index labels, which crosstab aligns on
+    locus = df.SNP.map(locus_map(clumps))
+    rows = [df[b] for b in by] if isinstance(by, list) else df[by]
+    overlaps = (pd.crosstab(rows, locus) > 0).astype(int)
+    overlaps.columns.name = None
+    return overlaps.reindex(columns = [clump[0] for clump in clumps], fill_value = 0)
 
 def main(args):
     import os
     import pandas as pd
     from fnmatch import fnmatch
     from _utils.path import normaliser
+    from _utils import sumstats
     
     norm = normaliser()
     
@@ -56,8 +93,8 @@ def main(args):
         dflist = []
         prefix_list = []
         for f in flist:
-            df = pd.read_table(f'{args._in}/{p}/{f}', sep = '\\s+').drop(['CHR','F','BP','P'], axis = 1)
-            df1 = pd.read_table(f'{args._in}/{p}/{f}'.replace('clumped','siglist'), sep = '\\s+')
+            df = sumstats.read(f'{args._in}/{p}/{f}').drop(['CHR','F','BP','P'], axis = 1)
+            df1 = sumstats.read(f'{args._in}/{p}/{f[:-len(".clumped")]}.siglist', float32 = False)
             df = pd.merge(df1, df, on = 'SNP')
             prefix = f.replace(f'_{args.p:.0e}.clumped','')
             prefix = prefix.replace('_0.01','')
@@ -76,15 +113,7 @@ def main(args):
         clumps = identify_clumps(outdf)
         
         ## then compile the table of overlaps
-        overlaps = pd.DataFrame(data = 0, index = prefix_list, 
-                                columns = [clump[0] for clump in clumps])
-        for phen in prefix_list:
-            siglist = outdf.loc[outdf.phenotype==phen,'SNP']
-            for snp in siglist:
-                for clump in clumps:
-                    if not snp in clump: continue
-                    idx_snp = clump[0]
-                    overlaps.loc[phen,idx_snp] = 1
+        overlaps = overlap_matrix(outdf, clumps, 'phenotype').reindex(prefix_list, fill_value = 0)
         overlaps.insert(loc = 0, column = 'label', value = prefix_list)
         overlaps.to_csv(f'{args._in}/{p}_{args.p:.0e}_overlaps.txt',sep = '\t',index = False)
     
@@ -92,18 +121,8 @@ def main(args):
     ct_prefix = '_'.join(args.pheno)
     # identify overlaps as above
     clumps = identify_clumps(crosstrait_clumps)
-    overlaps = pd.DataFrame(data = 0, index = pd.MultiIndex.from_frame(crosstrait_clumps[['phen_group','phenotype']]),
-                            columns = [clump[0] for clump in clumps]).sort_index()
-    for pheng in args.pheno:
-        for phen in crosstrait_clumps.phenotype.unique():
-            siglist = crosstrait_clumps.loc[(crosstrait_clumps.phen_group == pheng) &
-                (crosstrait_clumps.phenotype == phen),'SNP']
-            for snp in siglist:
-                for clump in clumps:
-                    if not snp in clump: continue
-                    idx_snp = clump[0]
-                    overlaps.loc[(pheng,phen), idx_snp] = 1
-                    
+    overlaps = overlap_matrix(crosstrait_clumps, clumps, ['phen_group','phenotype']).sort_index()
+
     norm.normalise(crosstrait_clumps).to_csv(f'{args._in}/all_clumps_{ct_prefix}_{args.p:.0e}.txt', sep = '\t', index = False)
     norm.normalise(overlaps).to_csv(f'{args._in}/all_overlaps_{ct_prefix}_{args.p:.0e}.txt', sep = '\t')
 if __name__ == '__main__':
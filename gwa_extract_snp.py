@@ -5,27 +5,15 @@ Correspondence: yh464@cam.ac.uk
 Version 1: 2025-01-20
 
 Utility script to extract input SNPs from GWAS files
+using a persistent SNP index for each phenotype group (_utils/snpindex.py)
 
 Requires following inputs: 
     GWAS summary statistics (single file)
 '''
 
-def search_file(file, patterns):
-    import os
+def format_hits(df, trait):
     import numpy as np
-    import pandas as pd
-    import subprocess
-    
-    patterns = os.path.realpath(patterns)
-    hdr = open(file).readline().replace('\n','').split()
-    cmd = ['/bin/fgrep','-wf',patterns,file]
-    search = subprocess.Popen(cmd, stdout = subprocess.PIPE)
-    
-    try: df = pd.read_table(search.stdout, header = None)
-    except: print(f'None of the SNPs found in {file}'); return None
-    
-    df.columns = hdr
-    df['Phenotype'] = os.path.basename(file).replace('.fastGWA','')
+    df['Phenotype'] = trait
     if 'OR' in df.columns: df['BETA'] = np.log(df['OR'])
     if 'N' not in df.columns: df['N'] = df.N_CAS + df.N_CON
     if 'BETA' not in df.columns: df['BETA'] = np.nan
@@ -33,39 +21,22 @@ def search_file(file, patterns):
     df = df.loc[:,['Phenotype','SNP','BETA','SE','P','N','A1','A2','AF1']]
     return df
     
-def search_snp(x, tmpdir, args): 
-    # must define in main environment for multiprocessing
+def search_snp(x, snps, tmpdir, args): 
     import os
-    from fnmatch import fnmatch
-    import numpy as np
     import pandas as pd
-    from multiprocessing import Pool
-    from functools import partial
+    from _utils import snpindex
     print(x)
     
-    if os.path.isfile(args.snp[0]) and len(args.snp) == 1:
-        patterns = args.snp[0]
-        snps = open(patterns).read().splitlines()
-    else: patterns = f'{tmpdir}/snp_list.txt'; snps = args.snp
-    # search for required SNP using grep
-    flist = []
-    for y in os.listdir(f'{args._in}/{x}'):
-        if fnmatch(y,'*.fastGWA') and not fnmatch(y, '*_X.fastGWA'): 
-            flist.append(f'{args._in}/{x}/{y}')
-    if len(flist) == 0: print(f'NO GWAS FILE FOR {x}'); return None
-    
     cache = f'{tmpdir}/sigsnp_{snps[0]}_{snps[-1]}_{x}.txt'
     if os.path.isfile(cache) and not args.force:
         df = pd.read_table(cache)
         return df
     
-    pool = Pool(max((len(flist)),10))
-    search = pool.map(partial(search_file, patterns=patterns), flist, 
-                      chunksize = int(np.ceil(len(flist)/10)))
-    temp = []
-    for y in search:
-        if type(y) != type(None): temp.append(y)
-    df = pd.concat(temp)
+    # search for required SNPs using the persistent SNP index of the group
+    # (new or modified GWAS files are indexed incrementally)
+    hits = snpindex.lookup(f'{args._in}/{x}', snps, workers = args.threads)
+    if len(hits) == 0: print(f'NONE OF THE SNPS FOUND FOR {x}'); return None
+    df = pd.concat([format_hits(v, k) for k, v in hits.items()])
     df.insert(loc = 0, column = 'Group', value = x)
     df.insert(loc = 2, column = 'q', value = df.P * 1e+6)
     df.insert(loc = 4, column = 'Z', value = df.BETA/df.SE)
@@ -83,14 +54,10 @@ def main(args):
     if not os.path.isdir(tmpdir): os.system(f'mkdir -p {tmpdir}')
     
     if os.path.isfile(args.snp[0]) and len(args.snp) == 1:
-        patterns = args.snp[0]
-    else:
-        patterns = f'{tmpdir}/snp_list.txt'
-        with open(patterns,'w') as tmpfile:
-            for snp in args.snp: print(snp, file = tmpfile)
-            tmpfile.close()
+        snps = open(args.snp[0]).read().splitlines()
+    else: snps = args.snp
     
-    temp = [search_snp(x, tmpdir, args) for x in args.pheno]
+    temp = [search_snp(x, snps, tmpdir, args) for x in args.pheno]
     all_files = []
     for x in temp: 
         if type(x) != type(None): all_files.append(x)
@@ -115,6 +82,8 @@ if __name__ == '__main__':
         help = 'Directory containing all GWA summary statistics',
         default = '../gwa/')
     parser.add_argument('-o','--out', dest = 'out', help = 'Output list file')
+    parser.add_argument('-t','--threads', dest = 'threads', type = int, default = 8,
+        help = 'maximum number of concurrent file lookups')
     parser.add_argument('-f','--force', dest = 'force', action = 'store_true',
         default = False, help = 'force overwrite')
     args = parser.parse_args()
@@ -1,20 +1,119 @@
 #!/usr/bin/env python3
 '''
-This scripts filters fastGWA files
+This scripts filters fastGWA files by minor allele frequency
+
+Files are streamed in fixed-size blocks so that peak memory does not depend
+on file size; several MAF thresholds can be written in a single pass, and a
+whole directory of files can be processed by a pool of workers
 '''
 
-import argparse
-
-# argument input
-parser = argparse.ArgumentParser(description=
-  'This programme filters the GRM to different thresholds')
-parser.add_argument('-i', dest = '_in', help = 'input fastGWA file')
-parser.add_argument('-o', dest = 'out', help = 'output fastGWA file')
-parser.add_argument('--freq', dest = 'freq', help = 'MAF filter')
-args = parser.parse_args()
-
-import pandas as pd
-df = pd.read_csv(args._in,sep = '\t')
-df = df[df.AF1 >= float(args.freq)]
-df = df[df.AF1 <= 1-float(args.freq)]
-df.to_csv(args.out, index = False, sep = '\t')
\ No newline at end of file
+def filter_file(_in, outs, chunksize = 500000):
+    '''
+    Streams one fastGWA file and writes one output per MAF threshold
+    _in: input fastGWA file (plain or .gz), requires an AF1 column
+    outs: {MAF threshold: output file}, BGZF-compressed if the name ends in .gz
+    chunksize: number of rows held in memory at a time
+    '''
+    import os
+    import pandas as pd
+    from contextlib import ExitStack
+    from _utils import bgzf
+    # .gz outputs are written as BGZF; all outputs go to temporary files and are
+    # moved into place only once the whole input has been read, no partial outputs
+    tmp = {freq: f'{out}.tmp{os.getpid()}' for freq, out in outs.items() if not out.endswith('.gz')}
+    try:
+        with ExitStack() as stack:
+            files = {freq: stack.enter_context(bgzf.open_text(out) if out.endswith('.gz') else
+                                               open(tmp[freq], 'w', newline = '')) for freq, out in outs.items()}
+            header = True
+            for chunk in pd.read_csv(_in, sep = '\t', chunksize = chunksize):
+                for freq, f in files.items():
+                    keep = (chunk.AF1 >= freq) & (chunk.AF1 <= 1-freq)
+                    chunk.loc[keep,:].to_csv(f, index = False, sep = '\t', header = header)
+                header = False
+            if header: raise ValueError(f'{_in} contains no variants')
+    except BaseException:
+        for t in tmp.values():
+            if os.path.isfile(t): os.remove(t)
+        raise
+    for freq, t in tmp.items(): os.replace(t, outs[freq])
+    return _in
+
+def out_files(_in, out, freqs, todir = False):
+    # output file for each MAF threshold, %maf in the output path is substituted
+    import os
+    if len(freqs) > 1 and not '%maf' in out:
+        raise ValueError('Output path must contain %maf when filtering by multiple thresholds')
+    outs = {}
+    for freq in freqs:
+        o = out.replace('%maf', str(freq))
+        if todir or os.path.isdir(o):
+            o = f'{o}/' + os.path.basename(_in).replace('_raw','')
+        outs[freq] = o
+    return outs
+
+def main(args):
+    import os
+    from fnmatch import fnmatch
+    from functools import partial
+    from multiprocessing import Pool
+    from time import perf_counter as t
+    from _utils import cache
+    tic = t()
+
+    # single file or all files in a directory
+    todir = os.path.isdir(args._in)
+    if todir:
+        flist = [f'{args._in}/{y}' for y in sorted(os.listdir(args._in)) if fnmatch(y.replace('.gz',''), '*.fastGWA')]
+    else: flist = [args._in]
+
+    jobs = []
+    for x in flist:
+        outs = out_files(x, args.out, args.freq, todir = todir)
+        # outputs are redone if the input file or the threshold has changed
+        if not args.force: outs = {k: v for k, v in outs.items() if not cache.valid(v, [x], dict(maf = k))}
+        if len(outs) == 0: continue
+        for o in outs.values():
+            if not os.path.isdir(os.path.dirname(o)): os.system(f'mkdir -p {os.path.dirname(o)}')
+        jobs.append((x, outs))
+    print(f'{len(jobs)} files to be filtered')
+
+    # files are independent, each worker holds one block at a time
+    _filter = partial(_star_filter, chunksize = args.chunksize)
+    outs = dict(jobs)
+    def _done(x):
+        for freq, o in outs[x].items(): cache.store(o, [x], dict(maf = freq))
+        print(f'Filtered {x}, time = {t()-tic:.3f}')
+    if args.threads > 1 and len(jobs) > 1:
+        with Pool(min(args.threads, len(jobs))) as pool:
+            for x in pool.imap_unordered(_filter, jobs): _done(x)
+    else:
+        for job in jobs: _done(_filter(job))
+
+def _star_filter(job, chunksize):
+    # must be defined at module level for multiprocessing
+    return filter_file(*job, chunksize = chunksize)
+
+if __name__ == '__main__':
+    import argparse
+
+    # argument input
+    parser = argparse.ArgumentParser(description=
+      'This programme filters GWAS summary statistics to different MAF thresholds')
+    parser.add_argument('-i', dest = '_in', help = 'input fastGWA file or directory')
+    parser.add_argument('-o', dest = 'out',
+      help = 'output fastGWA file or directory, may contain %%maf for multiple thresholds')
+    parser.add_argument('--freq', dest = 'freq', help = 'MAF filter(s)', nargs = '*',
+      type = float, default = [0.01])
+    parser.add_argument('-t','--threads', dest = 'threads', help = 'number of worker processes',
+      type = int, default = 1)
+    parser.add_argument('--chunksize', help = 'number of rows processed at a time',
+      type = int, default = 500000)
+    parser.add_argument('-f','--force', dest = 'force', help = 'Force output',
+      default = False, action = 'store_true')
+    args = parser.parse_args()
+    import os
+    for arg in ['_in','out']:
+        exec(f'args.{arg} = os.path.realpath(args.{arg})')
+
+    main(args)
@@ -6,32 +6,42 @@ This script filters all GWA files for a phenotype
 def main(args):
     import os
     from fnmatch import fnmatch
+    from _utils import cache
     
     if type(args.pheno) == type('a'):
       pheno = [args.pheno] # forcibly convert to list 
     else:
       pheno = args.pheno
     
-    # array submitter
+    # array submitter: one job per phenotype group, files are streamed by a
+    # pool of workers so memory stays flat and jobs fit on the small nodes
     from _utils import array_submitter
     submitter = array_submitter.array_submitter(
         name = 'gwa_filter',
-        timeout = 10)
+        partition = 'icelake',
+        n_cpu = args.threads,
+        timeout = 60)
     scripts_path = os.path.realpath(__file__)
     scripts_path = os.path.dirname(scripts_path)
+    force = '-f' if args.force else ''
+    freqs = ' '.join([str(f) for f in args.freq])
     
     for x in pheno:
-      out_dir = f'{args._in}/{x}_{args.freq}/'
-      out_dir = f'{args._in}/{x}/'
+      # a single threshold keeps the previous output directory
+      out_dir = f'{args._in}/{x}/' if len(args.freq) == 1 else f'{args._in}/{x}_%maf/'
       print(f'Output to {out_dir}')
-      if not os.path.isdir(out_dir): os.system(f'mkdir -p {out_dir}')
-      os.chdir(args._in)
-      os.chdir(x+'_raw')
-      for y in os.listdir():
-        if fnmatch(y,'*.fastGWA'):
-          out_fname = y.replace('_raw','')
-          submitter.add(f'bash {scripts_path}/pymaster.sh '+
-            f'gwa_filter.py -i {args._in}/{x}_raw/{y} -o {out_dir}/{out_fname} --freq {args.freq}')
+      
+      # skip groups whose outputs are up to date with the raw sumstats
+      todo = False
+      for y in os.listdir(f'{args._in}/{x}_raw'):
+        if not fnmatch(y.replace('.gz',''),'*.fastGWA'): continue
+        for f in args.freq:
+          if not cache.valid(out_dir.replace('%maf', str(f)) + y.replace('_raw',''),
+                             [f'{args._in}/{x}_raw/{y}'], dict(maf = f)): todo = True
+      if not todo and not args.force: continue
+      
+      submitter.add(f'bash {scripts_path}/pymaster.sh '+
+        f'gwa_filter.py -i {args._in}/{x}_raw/ -o {out_dir} --freq {freqs} -t {args.threads} {force}')
     submitter.submit()
     
 if __name__ == '__main__':
@@ -41,12 +51,14 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description=
       'This programme filters the GRM to different thresholds')
     parser.add_argument('pheno', help = 'Phenotypes', nargs = '*')
-    parser.add_argument('--freq', dest = 'freq', help = 'Minor allele frequency threshold',
-                        default = 0.01)
+    parser.add_argument('--freq', dest = 'freq', help = 'Minor allele frequency threshold(s)',
+                        nargs = '*', type = float, default = [0.01])
+    parser.add_argument('-t','--threads', dest = 'threads', help = 'Number of workers per group',
+                        type = int, default = 4)
     parser.add_argument('-i','--in', dest = '_in', help = 'GWA file directory',
       default = '../gwa/')
     parser.add_argument('-f','--force', dest = 'force', help = 'Force output',
-      default = False, const = True, action = 'store_const')
+      default = False, action = 'store_true')
     args = parser.parse_args()
     
     import os
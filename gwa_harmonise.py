@@ -11,55 +11,85 @@ Requires following inputs:
     require the following columns: SNP, A1, A2, BETA or OR (manually edit if necessary)
 '''
 
+_ref = None
+def _init_worker(ref):
+    # each worker opens the memory-mapped reference once, pages are shared
+    global _ref
+    from _utils.snpref import snpref
+    _ref = snpref(ref)
+
+def harmonise_file(x):
+    from _utils.harmonise import align, format_report
+    from _utils import sumstats
+    # first line to skip irrelevant files
+    l = sumstats.header(x)
+    if not 'BETA' in l and not 'OR' in l: return None
+    print(f'Harmonising {x}')
+    
+    # read df
+    df = sumstats.read(x, float32 = False) # written back to text, no float32
+    for col in ['CHR','POS','BP']: # erase CHR and BP information in case of different GRCh builds
+        if col in df.columns: df.drop(col, axis = 1, inplace = True)
+    
+    # single join against the reference rows for SNPs in this file,
+    # swapped/strand-flipped alleles are aligned in place
+    tmpref = _ref.subset(df['SNP'])
+    df, report = align(df, tmpref)
+    print(format_report(report, x))
+    df = df.sort_values(by = ['CHR','POS'], kind = 'stable')
+    sumstats.write(df, x) # .gz files are rewritten as BGZF
+    return x, report
+
 def main(args):
     import os
-    import pandas as pd
     from fnmatch import fnmatch
+    from multiprocessing import Pool
     from time import perf_counter as t
+    from _utils.snpref import convert
+    from _utils import cache
     tic = t()
-    # reference SNP info: CHR, SNP, POS, A1, A2, AF1
-    ref = pd.read_table(args.ref)
+    # reference SNP info: CHR, SNP, POS, A1, A2, AF1, converted once to a memory-mapped table
+    convert(args.ref)
     toc = t() - tic
     print(f'Read reference, time = {toc:.3f}')
+    
+    flist = []
     for p in args.pheno:
-        flist = []
         for x in os.listdir(f'{args._in}/{p}'):
-            if fnmatch(f'{args._in}/{p}/{x}', '*.fastGWA') or fnmatch (x,'*.txt'):
+            if fnmatch(x.replace('.gz',''), '*.fastGWA') or fnmatch(x.replace('.gz',''), '*.txt'):
                 flist.append(f'{args._in}/{p}/{x}')
-        
+    # files are harmonised in place: skip those unchanged since their last harmonisation
+    params = dict(stage = 'harmonise')
+    if not args.force:
+        flist = [x for x in flist if not cache.valid(x, [x, args.ref], params, adopt = False)]
+    print(f'{len(flist)} files to be harmonised')
+    
+    reports = {}
+    if args.threads > 1:
+        # all workers share one copy of the reference through the page cache
+        with Pool(args.threads, initializer = _init_worker, initargs = (args.ref,)) as pool:
+            for res in pool.imap_unordered(harmonise_file, flist):
+                if res is None: continue
+                reports[res[0]] = res[1]
+                cache.store(res[0], [res[0], args.ref], params)
+                toc = t() - tic
+                print(f'Finished harmonising {res[0]}, time = {toc:.3f}')
+    else:
+        _init_worker(args.ref)
         for x in flist:
-            # first line to skip irrelevant files
-            l = open(x).readline()
-            if not 'BETA' in l and not 'OR' in l: continue
-            print(f'Harmonising {x}')
-            
-            # read df
-            df = pd.read_table(x, sep = '\s+')
-            for col in ['CHR','POS','BP']: # erase CHR and BP information in case of different GRCh builds
-                if col in df.columns: df.drop(col, axis = 1, inplace = True)
-            for col in ['A1','A2']:
-                df[col] = df[col].str.upper()
-                
-            # construct df with flipped alleles
-            df_rev = df.copy()
-            df_rev.loc[:,'A2'] = df.loc[:,'A1'].copy() # intentional
-            df_rev.loc[:,'A1'] = df.loc[:,'A2'].copy()
-            if 'OR' in df.columns: df_rev['OR'] = df_rev['OR'] ^ -1
-            if 'BETA' in df.columns: df_rev['BETA'] *= -1
-            
-            if 'AF1' in df.columns:
-                tmpref = ref.drop('AF1', axis = 1)
-                df_rev.loc[:,'AF1'] *= -1
-                df_rev.loc[:,'AF1'] += 1
-            else: tmpref = ref
-            
-            merge = pd.merge(tmpref, df, on = ['SNP','A1','A2'])
-            merge_rev = pd.merge(tmpref, df_rev, on = ['SNP','A1','A2'])
-            
-            df = pd.concat([merge, merge_rev], axis = 0).sort_values(by = ['CHR','POS'])
-            df.to_csv(x, sep = '\t', index = False)
+            res = harmonise_file(x)
+            if res is None: continue
+            reports[x] = res[1]
+            cache.store(x, [x, args.ref], params)
             toc = t() - tic
             print(f'Finished harmonising {x}, time = {toc:.3f}')
+    
+    # per-file counts of aligned and dropped variants
+    import pandas as pd
+    if len(reports) == 0: return
+    pd.DataFrame(reports).T.to_csv(f'{args._in}/harmonise_report_'+'_'.join(args.pheno)+'.txt', 
+        sep = '\t', index_label = 'file')
+
 if __name__ == '__main__':
     import argparse
     parser = argparse.ArgumentParser(description='This script harmonises GWAS summary stats to align with UKB genetics data')
@@ -68,6 +98,10 @@ if __name__ == '__main__':
         default = '../gwa/')
     parser.add_argument('-r','--ref', dest = 'ref', help = 'reference UKB genetics data',
         default = '/rds/project/rb643/rds-rb643-ukbiobank2/Data_Users/yh464/params/ukb_snp_info.txt')
+    parser.add_argument('-t','--threads', dest = 'threads', help = 'number of worker processes',
+        type = int, default = 1)
+    parser.add_argument('-f','--force', dest = 'force', help = 'Harmonise all files, including unchanged ones',
+        default = False, action = 'store_true')
     args = parser.parse_args()
     import os
     args._in = os.path.realpath(args._in)
@@ -20,17 +20,19 @@ def main(args):
     all_sumstats = []
     import pandas as pd
     import numpy as np
+    from _utils.gwastore import query_region, locate_snp
     for file in args.gwa:
         prefix = '.'.join(os.path.basename(file).split('.')[:-1])
         prefix = prefix.replace('_0.01','').replace('_meta','')
-        tmp = pd.read_table(file, usecols = ['CHR','SNP','POS','P','A1','A2'], index_col = 'SNP')
         
         if args.chr == None or args.pos == None:
-            chrom = tmp.loc[args.snp, 'CHR']; pos = tmp.loc[args.snp, 'POS']
+            chrom, pos = locate_snp(file, args.snp)
         else:
             chrom = args.chr; pos = args.pos
         
-        tmp = tmp.loc[(tmp.CHR == chrom) & (tmp.POS > pos - args.ld) & (tmp.POS < pos + args.ld), ['CHR','POS','A1','A2','P']]
+        # open interval around the index SNP, read from the columnar store
+        tmp = query_region(file, chrom, pos - args.ld + 1, pos + args.ld - 1, 
+                           columns = ['CHR','POS','A1','A2','P'])
         tmp['POS'] /= 1000000
         tmp['-log(P)'] = -np.log10(tmp.P)
         tmp.insert(loc = 0, column = 'Phenotype', value = prefix)
@@ -25,6 +25,7 @@ import time
 tic = time.perf_counter()
 
 import pandas as pd
+from _utils.gwastore import read_sumstats
 from qmplot import manhattanplot, qqplot
 import matplotlib.pyplot as plt
 
@@ -37,11 +38,11 @@ print(f'Loaded modules. Time = {toc:.3f} seconds')
 os.chdir(f'{args._in}/{args.pheno}')
 x = args.file
 if not os.path.isdir(f'{args.out}/{args.pheno}'): os.mkdir(f'{args.out}/{args.pheno}')
-out_fname = f'{args.out}/{args.pheno}/{x}'.replace('.fastGWA','.manhattan.pdf')
+out_fname = f'{args.out}/{args.pheno}/{x}'.replace('.gz','').replace('.fastGWA','.manhattan.pdf')
 _,ax = plt.subplots(figsize = (6,2), constrained_layout = True)
 
 if (not os.path.isfile(out_fname)) or args.force:
-  df = pd.read_table(x).sort_values(by = ['CHR','POS'])
+  df = read_sumstats(x, columns = ['CHR','SNP','POS','P'], compact = True).sort_values(by = ['CHR','POS'])
   sig = df.loc[df.P < 1e-3,:]
   
   # truncated Manhattan plot, pdf
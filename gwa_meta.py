@@ -17,9 +17,11 @@ def main(args):
     import os
     import pandas as pd
     import scipy.stats as sts
+    from _utils.harmonise import align, format_report
+    from _utils import sumstats
     
-    # output format
-    out_prefix = args.out.replace('.fastGWA','')
+    # output format, .gz outputs are written as BGZF
+    out_prefix = args.out.replace('.gz','').replace('.fastGWA','')
     
     # METAL: heterogeneity test, AF1/SE, 
     metal_out = f'{out_prefix}.metal'
@@ -69,10 +71,9 @@ def main(args):
         # process METAL outputs
         metal_df = pd.read_table(metal_out)
         # format columns
-        metal_df.columns = ['SNP','A1x','A2','AF1','AF1SE','N','Z','P','DIR',
+        metal_df.columns = ['SNP','A1','A2','AF1','AF1SE','N','Z','P','DIR',
                             'HET_I2','HET_CHI2','HET_DF','HET_P']
-        metal_df['A1x'] = metal_df['A1x'].str.upper()
-        metal_df = metal_df[['SNP','A1x','AF1','AF1SE','N','DIR',
+        metal_df = metal_df[['SNP','A1','A2','AF1','AF1SE','N','DIR',
                              'HET_I2','HET_CHI2','HET_DF','HET_P']]
         print(metal_df.head())
         # estimate BETA and SE from PLINK output
@@ -83,15 +84,15 @@ def main(args):
         plink_df['Z'] = plink_df['BETA']/plink_df['SE']
         plink_df.dropna(inplace=True)
         print(plink_df.head())
-        # harmonise allele frequencies
-        df = pd.merge(plink_df, metal_df, on = ['SNP'])
-        df.loc[df['A1x'] != df['A1'], 'AF1'] = 1 - df.loc[df['A1x'] != df['A1'], 'AF1']
-        df.drop('A1x', axis = 1, inplace = True)
+        # harmonise allele frequencies to the PLINK effect allele
+        metal_df, report = align(metal_df, plink_df[['SNP','A1','A2']])
+        print(format_report(report, 'METAL output'))
+        df = pd.merge(plink_df, metal_df.drop(['A1','A2'], axis = 1), on = ['SNP'])
         df = df[['CHR','SNP','POS','A1','A2','AF1','AF1SE','N','BETA','SE','Z','P',
                  'DIR','HET_I2','HET_CHI2','HET_DF','HET_P']].dropna()
         # sort by p values
         df = df.sort_values(by = ['CHR','POS'], ascending = True)
-        df.to_csv(args.out, sep = '\t', index = False)
+        sumstats.write(df, args.out)
 
 
 if __name__ == '__main__':
@@ -104,7 +105,7 @@ if __name__ == '__main__':
       default = '/rds/project/rb643/rds-rb643-ukbiobank2/Data_Users/yh464/toolbox/metal') # intended to be absolute
     parser.add_argument('--plink', help = 'PLINK 1.9 executable',
       default = '/rds/project/rb643/rds-rb643-ukbiobank2/Data_Users/yh464/toolbox/plink') # intended to be absolute
-    parser.add_argument('-o','--out', dest = 'out', help = 'output file name')
+    parser.add_argument('-o','--out', dest = 'out', help = 'output file name, BGZF-compressed if ending in .gz')
     parser.add_argument('-f','--force',dest = 'force', help = 'force overwrite',
       default = False, action = 'store_true')
     args = parser.parse_args()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+'''
+Author: Yuankai He
+Correspondence: yh464@cam.ac.uk
+Version 1: 2026-10-16
+
+Utility script to extract a genomic region from GWAS summary statistics
+using the positional index of the columnar store; prints to stdout by default
+so that R scripts can read it through pipe()
+
+Requires following inputs: 
+    GWAS summary statistics (single file)
+'''
+
+def main(args):
+    import sys
+    from _utils.gwastore import query_region
+    df = query_region(args.file, args.chr, args.start, args.stop, columns = args.cols)
+    out = sys.stdout if args.out == None else args.out
+    df.to_csv(out, sep = '\t', index = False)
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description = 
+      'This script extracts all SNPs within a region (inclusive) from GWAS summary stats')
+    parser.add_argument('file', help = 'GWAS summary stats')
+    parser.add_argument('-c','--chr', dest = 'chr', type = int, help = 'chromosome', required = True)
+    parser.add_argument('--start', type = int, help = 'start BP', required = True)
+    parser.add_argument('--stop', type = int, help = 'stop BP', required = True)
+    parser.add_argument('--cols', nargs = '*', help = 'columns to extract, defaults to all')
+    parser.add_argument('-o','--out', dest = 'out', help = 'output file, defaults to stdout')
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+'''
+Author: Yuankai He
+Correspondence: yh464@cam.ac.uk
+Version 1: 2026-10-16
+
+Converts fastGWA summary statistics into chromosome-partitioned columnar stores
+so that downstream scripts can read selected columns and chromosomes only
+
+Requires following inputs:
+    GWAS summary statistics (scans directory)
+'''
+
+def main(args):
+    from time import perf_counter as t
+    from _utils.path import find_gwas
+    from _utils.gwastore import convert, is_current
+    tic = t()
+
+    for p, traits in find_gwas(*args.pheno, dirname = args._in, ext = args.ext):
+        for x in traits:
+            file = f'{args._in}/{p}/{x}.{args.ext}'
+            if not os.path.isfile(file): file += '.gz'
+            if is_current(file) and not args.force: continue
+            convert(file, force = args.force)
+            toc = t() - tic
+            print(f'Converted {p}/{x}, time = {toc:.3f}')
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description =
+      'This script converts GWAS summary stats into chromosome-partitioned columnar stores')
+    parser.add_argument('pheno', help = 'Phenotype groups', nargs = '*')
+    parser.add_argument('-i','--in', dest = '_in', help = 'Input directory',
+        default = '../gwa/')
+    parser.add_argument('--ext', help = 'Extension of summary statistics files',
+        default = 'fastGWA')
+    parser.add_argument('-f','--force', dest = 'force', help = 'force overwrite',
+        default = False, action = 'store_true')
+    args = parser.parse_args()
+    import os
+    args._in = os.path.realpath(args._in)
+
+    from _utils import cmdhistory, path, logger
+    logger.splash(args)
+    cmdhistory.log()
+    proj = path.project()
+    proj.add_input(args._in+'/%pheng/%pheno_%maf.fastGWA', __file__)
+    proj.add_output(args._in+'/%pheng/%pheno_%maf.fastGWA.store', __file__)
+    try: main(args)
+    except: cmdhistory.errlog()
@@ -20,7 +20,7 @@ def main(args):
     force = '-f' if args.force else ''
     
     # array submitter
-    from _utils import array_submitter
+    from _utils import array_submitter, cache
     submitter = array_submitter.array_submitter(
         name = f'heri_{args.pheno[0]}',
         timeout = 10, mode = 'long',
@@ -37,7 +37,11 @@ def main(args):
         if fnmatch(y, '*X.fastGWA'):
             continue                               # autosomes
         prefix = y.replace('.fastGWA','')
-        if os.path.isfile(f'{args.out}/{x}/{prefix}.h2.log') and not args.force: continue
+        # skip only if both outputs are up to date with the GWAS, see heri_by_trait.py
+        munged = f'{args.out}/{x}/{prefix}.sumstats'
+        if not args.force and cache.valid(munged, [f'{args._in}/{x}/{y}', f'{args.ldsc}/ukb_merge_ldscore.txt'],
+                dict(stage = 'munge', chunksize = 50000)) and cache.valid(f'{args.out}/{x}/{prefix}.h2.log',
+                [munged], dict(stage = 'h2', ref_ld = os.path.realpath(f'{args.ldsc}/baseline'))): continue
         submitter.add('python '+
             f'heri_by_trait.py -i {args._in}/{x}/{y} -o {args.out}/{x}/ --ldsc {args.ldsc} {force}')
     submitter.submit()
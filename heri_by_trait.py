@@ -15,18 +15,25 @@ parser.add_argument('-f','--force',dest = 'force', help = 'force output',
 args = parser.parse_args()
 
 import os
+from _utils import cache
 
 args.out = os.path.realpath(args.out)
-prefix = os.path.basename(args._in).replace('.fastGWA', '')
+prefix = os.path.basename(args._in).replace('.gz','').replace('.fastGWA', '')
 
 scripts_path = os.path.realpath(__file__)
 scripts_path = os.path.dirname(scripts_path)
-if args.force or (not os.path.isfile(f'{args.out}/{prefix}.sumstats')):
+# munged sumstats and h2 are redone only if the GWAS or the LD scores have changed
+munged = f'{args.out}/{prefix}.sumstats'
+munge_inputs = [args._in, f'{args.ldsc}/ukb_merge_ldscore.txt']
+munge_params = dict(stage = 'munge', chunksize = 50000)
+refresh = args.force or not cache.valid(munged, munge_inputs, munge_params)
+if refresh:
     # this command uses python2 so a separate script for ldsc  
     os.system(f'bash {scripts_path}/ldsc_master.sh munge_sumstats.py --sumstats {args._in} '+ \
           f'--merge-alleles {args.ldsc}/ukb_merge_ldscore.txt '+
           # f'--merge-alleles {args.ldsc}/w_hm3.snplist '
           f'--out {args.out}/{prefix} --chunksize 50000')
+    if os.path.isfile(munged): cache.store(munged, munge_inputs, munge_params)
 
 # QC h2 log
 h2log = f'{args.out}/{prefix}.h2.log'
@@ -35,8 +42,10 @@ if os.path.isfile(h2log):
     try: h2 = float(tmp[-2])
     except: os.remove(h2log)
 
-if (not os.path.isfile(f'{args.out}/{prefix}.h2.log')) or args.force:
+h2_params = dict(stage = 'h2', ref_ld = os.path.realpath(f'{args.ldsc}/baseline'))
+if refresh or not os.path.isfile(munged) or not cache.valid(h2log, [munged], h2_params):
   os.system(f'bash {scripts_path}/ldsc_master.sh ldsc.py '+
     f'--ref-ld-chr {args.ldsc}/baseline/ --w-ld-chr {args.ldsc}/baseline/ '+
     f'--h2 {args.out}/{prefix}.sumstats '+
-    f'--out {args.out}/{prefix}.h2')
\ No newline at end of file
+    f'--out {args.out}/{prefix}.h2')
+  if os.path.isfile(h2log) and os.path.isfile(munged): cache.store(h2log, [munged], h2_params)
\ No newline at end of file
@@ -9,6 +9,9 @@ def main(args):
     import numpy as np
     import scipy.stats as sts
     import matplotlib.pyplot as plt
+    from _utils.gwastore import read_sumstats
+    from _utils.harmonise import align, format_report
+    from _utils import sumstats
     
     tic = time.perf_counter()
     
@@ -19,12 +22,12 @@ def main(args):
     dirs = []
     
     for x in flist:
-      if not fnmatch(x,'*.fastGWA'):
+      if not fnmatch(x.replace('.gz',''),'*.fastGWA'):
         flist.remove(x)
       tmp = x.split('/')
       tmp = tmp[-1]
       dirs.append(x.replace(tmp,''))                                               # remove the directories
-      tmp = tmp.replace('.fastGWA', '')
+      tmp = tmp.replace('.gz','').replace('.fastGWA', '')
       prefix.append(tmp)
     n = len(flist)
     
@@ -63,14 +66,22 @@ def main(args):
         prefix_x = prefix[i]
         
         # read fastGWA file
-        df = pd.read_csv(x, sep = '\s+').drop_duplicates(subset = 'SNP')
+        # not compact: AF1 of the first trait is written to the output text
+        df = read_sumstats(x, columns = ['CHR','SNP','POS','A1','A2','N','AF1','BETA','SE','P']
+                           ).drop_duplicates(subset = 'SNP').reset_index(drop = True)
+        # align every trait to the alleles and SNP order of the first trait
+        if i == 0: ref = df[['CHR', 'SNP', 'POS', 'A1', 'A2', 'AF1']].reset_index(drop = True)
+        else:
+          df, report = align(df, ref[['SNP','A1','A2']])
+          print(format_report(report, prefix_x), file = log)
+          df = df.set_index('SNP').reindex(ref.SNP).reset_index()
         df.insert(loc = df.shape[1]-1, column = 'Z', value = df.BETA/df.SE)
         # columns: chr, snp, pos, a1, a2, n, af1, beta, se, z, p
         dflist.append(df[['N','BETA','SE','Z','P']])
         
         # read h2 file
-        if not os.path.isfile(x.replace('_0.01.fastGWA','.greml.hsq')): raise ValueError
-        f = open(x.replace('_0.01.fastGWA','.greml.hsq')).read().splitlines()
+        if not os.path.isfile(x.replace('.gz','').replace('_0.01.fastGWA','.greml.hsq')): raise ValueError
+        f = open(x.replace('.gz','').replace('_0.01.fastGWA','.greml.hsq')).read().splitlines()
         for y in f:
           if 'V(G)/Vp' in y:
             h2[i] = float(y.split('\t')[1])
@@ -99,8 +110,6 @@ def main(args):
         print(f'Processed {prefix_x} ({i+1}/{n}), time = {toc:.3f} seconds')
         print(f'Processed {prefix_x} ({i+1}/{n}), time = {toc:.3f} seconds', file = log)
       
-      ref = df[['CHR', 'SNP', 'POS', 'A1', 'A2', 'AF1']]
-      
       # write cache
       with open(cache, 'wb') as f:
         pickle.dump(dict(
@@ -109,6 +118,15 @@ def main(args):
           h2 = h2,
           cti = cti), f)
     
+    # SNPs missing from a trait, or dropped by align() as mismatched, are NaN after reindexing;
+    # only SNPs present in every trait are analysed
+    common = np.logical_and.reduce([df[['N','Z']].notna().all(axis = 1).values for df in dflist])
+    if not common.all():
+      msg = f'Removed {(~common).sum()} of {common.size} SNPs not present in all traits'
+      print(msg); print(msg, file = log)
+    ref = ref.loc[common,:].reset_index(drop = True)
+    dflist = [df.loc[common,:].reset_index(drop = True) for df in dflist]
+    
     print(h2)
     print(cti)
     # We skip the sanity checks since all GWA data have been generated in the same pipeline
@@ -158,8 +176,9 @@ def main(args):
     
     # write output
     toc = time.perf_counter() - tic
-    print(f'Writing file to {args.out}/{args.prefix}.gwama, time = {toc:.3f} seconds', file = log)
-    out.to_csv(f'{args.out}/{args.prefix}.gwama', sep = '\t', index = False)
+    out_file = f'{args.out}/{args.prefix}.gwama' + ('.gz' if args.gz else '')
+    print(f'Writing file to {out_file}, time = {toc:.3f} seconds', file = log)
+    sumstats.write(out, out_file)
     
     toc = time.perf_counter() - tic
     msg = f'Analysis finished at {toc:.3f} seconds. {nsnp} SNPs were included'
@@ -202,6 +221,8 @@ if __name__ == '__main__':
       default = '../multivar-gwa/')
     parser.add_argument('-p','--prefix', dest = 'prefix', help = 'name of the output file',
                         required = True)
+    parser.add_argument('--gz', help = 'Write BGZF-compressed output',
+                        default = False, action = 'store_true')
     parser.add_argument('-f', '--force', dest = 'force', action = 'store_true',
                         default = False, help = 'force overwrite')
     args = parser.parse_args()
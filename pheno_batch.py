@@ -33,11 +33,30 @@ def main(args):
     f = open(logdir+logout,'w')
     idx = 0
     
+    # expected output shapes, global phenotypes are vectors
+    shapes = {'global': (17,), 'global_asym': (17,), 'local': (nroi, 7), 'local_asym': (nroi//2, 21)}
+    def load_shape(kind, fname):
+      if kind in ['global','global_asym']: return (np.loadtxt(fname).size,)
+      return pd.read_csv(fname).shape
+    
+    # outputs are validated once and recorded in the manifest, see _utils/manifest.py
+    from _utils.manifest import manifest
+    man = manifest(f'{args.out}/.pheno_manifest.db')
+    if args.verify:
+      n = man.verify()
+      print(f'{n} outputs were modified or deleted since validation')
+    done = set() if args.force else man.complete(shapes)
+    toc = time.perf_counter()-tic
+    print(f'{len(done)} subjects already phenotyped according to the manifest, time = {toc:.3f}')
+    
     for subj in subjs:
       if idx % 100 == 0:
           toc = time.perf_counter()-tic
           print(f'Subject {idx} / {nsubj}, time = {toc:.3f}')
       idx += 1
+      if subj in done:
+        print(f'{subj}: connectome is already phenotyped', file = f)
+        continue
       in_fname = args._in.replace('%sub',subj)
       
       # check progress
@@ -48,28 +67,14 @@ def main(args):
       skip = True
       if args.force: skip = False
       
-      if skip:
-        try:
-          tmp = np.loadtxt(f'{args.out}/global/{subj}.txt')
-          if tmp.size != 17: skip = False
-        except: skip = False
-      
-      if skip:
-        try:
-          tmp = np.loadtxt(f'{args.out}/global_asym/{subj}.txt')
-          if tmp.size != 17: skip = False
-        except: skip = False
-      
-      if skip:
-        try:
-          tmp = pd.read_csv(f'{args.out}/local/{subj}.txt')
-          if tmp.shape[0] != nroi or tmp.shape[1] != 7: skip = False
-        except: skip = False
-      
-      if skip:
+      # outputs not yet in the manifest, e.g. written since the last batch
+      for kind, shape in shapes.items():
+        if not skip: break
+        fname = f'{args.out}/{kind}/{subj}.txt'
         try:
-          tmp = pd.read_csv(f'{args.out}/local_asym/{subj}.txt')
-          if tmp.shape[0] != nroi/2 or tmp.shape[1] != 21: skip = False
+          tmp = load_shape(kind, fname)
+          if tmp != shape: skip = False
+          else: man.record(subj, kind, fname, tmp, commit = False)
         except: skip = False
       
       if skip: 
@@ -79,7 +84,10 @@ def main(args):
         submitter.add(
           f'python pheno.py {subj} -i {indir} -o {args.out}/{fs}')
         print(f'{subj} submitted for analysis', file = f)
+      if idx % 100 == 0: man.commit()
     
+    man.commit()
+    man.close()
     submitter.submit()
     
     
@@ -97,6 +105,8 @@ if __name__ == '__main__':
         default = '../params/subjlist_rsfmri_hcp.txt')
     parser.add_argument('-o','--out',dest = 'out', help = 'Output directory',
         default = '../pheno/ukb/')
+    parser.add_argument('--verify', help = 'Check the output manifest against the file system',
+        default = False, action = 'store_true')
     parser.add_argument('-f','--force', dest = 'force', help = 'Force output',
         default = False,const = True, action = 'store_const')
     args = parser.parse_args()
@@ -19,32 +19,117 @@ Output:
     downstream: 
 
 Changelog:
+    subject files are read by a thread pool directly into subject x phenotype arrays per group,
+    and cached in {phenotype directory}/.concat_cache.npz so that only new or modified files are read
     changed input format so that index = phenotype name, columns = phenotype group name
 '''
+def read_subject(file):
+    '''
+    Parses one subject file without pandas, opening the file dominates for tiny files
+    Output: phenotype names, phenotype group names, values (phenotypes x groups)
+    '''
+    import numpy as np
+    lines = open(file).read().splitlines()
+    groups = lines[0].split('\t')[1:]
+    phenos = []; values = np.full((len(lines) - 1, len(groups)), np.nan)
+    for i, line in enumerate(lines[1:]):
+        line = line.split('\t')
+        phenos.append(line[0])
+        for j, v in enumerate(line[1:len(groups)+1]):
+            try: values[i, j] = float(v)
+            except ValueError: pass # NA and other missing value strings
+    return phenos, groups, values
+
+def load_cache(file):
+    '''
+    Raw (unscaled) values of previously read subjects, written by save_cache
+    Output: fingerprints by subject, subjects, phenotypes, groups, values (groups x subjects x phenotypes)
+    '''
+    import numpy as np
+    import json
+    f = np.load(file)
+    return (json.loads(str(f['fingerprints'])), list(f['subjects']), list(f['phenos']),
+            list(f['groups']), f['values'])
+
+def save_cache(file, fingerprints, subjects, phenos, groups, values):
+    import numpy as np
+    import json
+    import os
+    tmp = f'{file}.tmp{os.getpid()}.npz'
+    np.savez(tmp, fingerprints = json.dumps(fingerprints), subjects = np.array(subjects, dtype = str),
+             phenos = np.array(phenos, dtype = str), groups = np.array(groups, dtype = str), values = values)
+    os.replace(tmp, file)
+
+def concat(x, threads = 8, force = False):
+    '''
+    Reads all subject files in directory x into a subjects x phenotypes array per group;
+    subjects whose files are unchanged since the last run are taken from {x}/.concat_cache.npz
+    Output: subjects, phenotypes, groups, values (groups x subjects x phenotypes)
+    '''
+    import numpy as np
+    import os
+    from multiprocessing.pool import ThreadPool
+    cache_file = f'{x}/.concat_cache.npz'
+    files = {}
+    with os.scandir(x) as it:
+        for y in it:
+            if not y.name.endswith('.txt'): continue
+            st = y.stat()
+            files[y.name[:-4]] = [st.st_size, st.st_mtime]
+    
+    # subjects whose files have not changed since the last run
+    fp = {}; c_subj = []; c_pheno = []; c_group = []; c_values = None
+    if os.path.isfile(cache_file) and not force:
+        fp, c_subj, c_pheno, c_group, c_values = load_cache(cache_file)
+    cached = [s for s in c_subj if fp.get(s) == files.get(s)]
+    new = [s for s in files if not s in fp or fp[s] != files[s]]
+    print(f'{x}: {len(cached)} subjects cached, reading {len(new)} subject files')
+    
+    # file reads are I/O bound on the cluster file system, threads suffice
+    with ThreadPool(threads) as pool:
+        parsed = pool.map(read_subject, [f'{x}/{s}.txt' for s in new], chunksize = 64)
+    
+    # union of phenotypes and groups
+    phenos = dict.fromkeys(c_pheno); groups = dict.fromkeys(c_group)
+    for p, g, _ in parsed: phenos.update(dict.fromkeys(p)); groups.update(dict.fromkeys(g))
+    phenos = list(phenos); groups = list(groups)
+    p_idx = {p: i for i, p in enumerate(phenos)}
+    g_idx = {g: i for i, g in enumerate(groups)}
+    subjects = cached + new
+    
+    # preallocated array, each subject is written into its own row of every group
+    values = np.full((len(groups), len(subjects), len(phenos)), np.nan)
+    if len(cached) > 0:
+        c_idx = {s: i for i, s in enumerate(c_subj)}
+        rows = [c_idx[s] for s in cached]
+        gi = [g_idx[g] for g in c_group]; pi = [p_idx[p] for p in c_pheno]
+        values[np.ix_(gi, range(len(cached)), pi)] = c_values[:, rows, :]
+    for k, (p, g, v) in enumerate(parsed):
+        gi = [g_idx[z] for z in g]; pi = [p_idx[z] for z in p]
+        values[np.ix_(gi, [len(cached) + k], pi)] = v.T[:, None, :]
+    
+    if len(new) > 0 or len(cached) < len(c_subj):
+        save_cache(cache_file, {s: files[s] for s in subjects}, subjects, phenos, groups, values)
+    return subjects, phenos, groups, values
+
 def main(args):
     import pandas as pd
+    import numpy as np
     import os
-    from fnmatch import fnmatch
     os.chdir(args._in)
     for x in args.pheno:
-        dflist = []
-        for y in os.listdir(x):
-            if not fnmatch(y, '*.txt'): continue
-            subj = y.replace('.txt','')
-            df = pd.read_table(f'{x}/{y}', index_col = 0)
-            df['pheno'] = df.index
-            df = df.melt(id_vars = 'pheno', var_name = 'pheng')
-            df.insert(0, column = 'EID', value = subj)
-            dflist.append(df)
-        df = pd.concat(dflist)
-        pheno_groups = df['pheng'].unique()
-        for pg in pheno_groups:
-            tmp = df.loc[df.pheng == pg, :]
-            tmp = tmp.pivot_table(columns = 'pheno', index = 'EID', values = 'value')
-            for c in tmp.columns:
-                tmp[c] /= tmp[c].std()
-            tmp.insert(0, column = 'FID', value = tmp.index)
-            tmp.insert(1, column = 'IID', value = tmp.index)
+        subjects, phenos, groups, values = concat(x, threads = args.threads, force = args.force)
+        s_order = np.argsort(subjects, kind = 'stable'); p_order = np.argsort(phenos, kind = 'stable')
+        subjects = np.array(subjects, dtype = object)[s_order]; phenos = np.array(phenos, dtype = object)[p_order]
+        for g, pg in enumerate(groups):
+            tmp = values[g][np.ix_(s_order, p_order)]
+            # subjects and phenotypes without any value in this group are dropped
+            rows = ~np.isnan(tmp).all(axis = 1); cols = ~np.isnan(tmp).all(axis = 0)
+            tmp = tmp[np.ix_(rows, cols)]
+            tmp = pd.DataFrame(tmp, columns = phenos[cols])
+            tmp /= tmp.std()
+            tmp.insert(0, column = 'FID', value = subjects[rows])
+            tmp.insert(1, column = 'IID', value = subjects[rows])
             tmp.to_csv(f'{pg}.txt', index = False, sep = '\t')
     return
 
@@ -56,7 +141,9 @@ if __name__ == '__main__':
     parser.add_argument('-i','--in', dest = '_in', 
                         default = '../pheno/ukb/',
                         help = 'Data directory')
-    parser.add_argument('-f','--force', dest = 'force', help = 'Force output',
+    parser.add_argument('-t','--threads', dest = 'threads', help = 'Number of threads to read subject files',
+                        default = 8, type = int)
+    parser.add_argument('-f','--force', dest = 'force', help = 'Force output, ignores the subject cache',
                         default = False, action = 'store_true')
     args = parser.parse_args()
     import os
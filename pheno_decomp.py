@@ -3,7 +3,7 @@
 def decomp(corrmat):
     import numpy as np
     corrmat = np.abs(corrmat)
-    l,_ = np.linalg.eig(corrmat)
+    l = np.linalg.eigvalsh(corrmat) # correlation matrices are symmetric
     n = l.size
     n_old = n * (1 - (n-1) * np.var(l) / n**2)
     p_old = 1-0.95**(1/n_old)
@@ -12,6 +12,16 @@ def decomp(corrmat):
     p_new = 1-0.95**(1/n_new)
     return [n_old, p_old, n_new, p_new]
 
+_corr = None
+def _init(corr):
+    # the full correlation matrix is shared with each worker once
+    global _corr
+    _corr = corr
+
+def _decomp_block(idx):
+    import numpy as np
+    return decomp(_corr[np.ix_(idx, idx)])
+
 def main(args):
     import os
     import pandas as pd
@@ -47,9 +57,15 @@ def main(args):
                 df.drop(col, axis = 1, inplace = True)
         dflist.append(df)
     
-    dflist = pd.Series(dflist)
     n_pheno = len(dflist)
     
+    # correlations are pairwise complete, so the correlation matrix of any subset of
+    # phenotype files is a block of the full matrix, which is computed only once
+    ncols = np.cumsum([0] + [df.shape[1] for df in dflist])
+    corr = pd.concat(dflist, axis = 1).corr().values
+    toc = t() - tic
+    print(f'Computed {corr.shape[0]} x {corr.shape[1]} correlation matrix, time = {toc:.3f}')
+    
     if args._all:
         comb = []
         from itertools import combinations
@@ -62,23 +78,18 @@ def main(args):
         comb = np.vstack((np.identity(n_pheno), np.ones((1,n_pheno)))).astype('?')
     
     comb_df = pd.DataFrame(data = comb, columns = pflist)
-    out_df = pd.DataFrame(data = float(0), index = comb_df.index, 
-                     columns = ['n_old','p_old','n_new','p_new'])
     
-    for i in comb_df.index:
-        c = pd.concat(dflist[comb_df.loc[i,:].tolist()].tolist(), axis = 1).corr()
-        c = np.abs(c)
-        l,_ = np.linalg.eig(c)
-        n = l.size
-        neff_abs = n * (1 - (n-1) * np.var(l) / n**2)
-        out_df.loc[i,'n_old'] = neff_abs
-        out_df.loc[i,'p_old'] = 1-0.95**(1/neff_abs)
-        l[l<0] = 0
-        neff_pos = n * (1 - (n-1) * np.var(l) / n**2)
-        out_df.loc[i,'n_new'] = neff_pos
-        out_df.loc[i,'p_new'] = 1-0.95**(1/neff_pos)
-        toc = t() - tic
-        print(f'{i+1}/{comb_df.shape[0]}, time = {toc:.3f}')
+    from multiprocessing import Pool
+    blocks = [np.concatenate([np.arange(ncols[j], ncols[j+1]) for j in np.flatnonzero(c)]) for c in comb_df.values]
+    with Pool(args.n_cpu, initializer = _init, initargs = (corr,)) as pool:
+        res = []
+        for r in pool.imap(_decomp_block, blocks, chunksize = max(1, len(blocks) // (args.n_cpu * 16))):
+            res.append(r)
+            if len(res) % 100 == 0 or len(res) == len(blocks):
+                toc = t() - tic
+                print(f'{len(res)}/{comb_df.shape[0]}, time = {toc:.3f}')
+    out_df = pd.DataFrame(data = res, index = comb_df.index, 
+                     columns = ['n_old','p_old','n_new','p_new'])
         
     out_df = pd.concat([comb_df, out_df], axis = 1)
     out_df.to_csv(f'{args._in}/neff_'+'_'.join(args.pheno)+'.txt', sep = '\t', index   = False, header = True)
@@ -99,6 +110,8 @@ if __name__ == '__main__':
       default = '../pheno/ukb/')
     parser.add_argument('-a', dest = '_all', help = 'Iterate over all combinations of phenotypes',
       default = False, action = 'store_true')
+    parser.add_argument('-n', dest = 'n_cpu', help = 'Number of processes',
+      default = 1, type = int)
     # always overwrites
     args = parser.parse_args()
     import os
@@ -4,22 +4,22 @@
 def main(args):
   import os
   from fnmatch import fnmatch
-  import pandas as pd
-  import seaborn as sns
-  import matplotlib.pyplot as plt
+  from _plots.histogram import render_all
   
   os.chdir(args._in)
   if not os.path.isdir('diagnostics'): os.mkdir('diagnostics')
+  jobs = []
   for f in os.listdir():
     if not fnmatch(f, '*.txt'): continue
     prefix = os.path.basename(f).replace('.txt','')
     out_fname = f'diagnostics/{prefix}.png'
     if os.path.isfile(out_fname) and not args.force: continue
-    df = pd.read_csv(f, sep = args.sep).melt(id_vars = ['FID','IID'])
-    sns.displot(data = df, x = 'value', col = 'variable', height = 10)
-    plt.savefig(out_fname)
-    plt.close()
-    print(f'Processed: {f}')
+    jobs.append(dict(file = f'{args._in}/{f}', out = f'{args._in}/{out_fname}', sep = args.sep,
+                     style = 'facet', bins = args.bins))
+  
+  # bin counts are computed from the wide table and figures rendered in parallel
+  for out in render_all(jobs, args.n_cpu):
+    print(f'Processed: {os.path.basename(out).replace(".png",".txt")}')
 
 if __name__ == '__main__':
   import argparse
@@ -28,6 +28,10 @@ if __name__ == '__main__':
     default = '../pheno/ukb/')
   parser.add_argument('-s','--sep', dest = 'sep', help = 'column separator', 
     default = '\s+')
+  parser.add_argument('-b','--bins', dest = 'bins', help = 'number of bins per histogram',
+    default = 50, type = int)
+  parser.add_argument('-n', dest = 'n_cpu', help = 'number of processes',
+    default = 1, type = int)
   parser.add_argument('-f','--force', dest = 'force', help = 'force overwrite',
     action = 'store_true', default = False)
   args = parser.parse_args()
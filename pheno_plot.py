@@ -4,12 +4,10 @@ Creates diagnostic plots for the asymmetry statistics
 '''
 
 def main(args):
-    import pandas as pd
-    import seaborn as sns
-    import matplotlib.pyplot as plt
     import os
     import fnmatch
     import time
+    from _plots.histogram import render_all
     
     os.chdir(args._in)
     files = []
@@ -21,26 +19,18 @@ def main(args):
       os.system(f'mkdir -p {args.out}/')
     
     tic = time.perf_counter()
-    for i in range(len(files)):
-      f = files[i]
-      print(f'processing {f}')
+    jobs = []
+    for f in files:
       if os.path.isfile(f'{args.out}/{f}'.replace('txt',args.fmt)) and (not args.force):
         print(f'{f} is already plotted')
         continue
-      df = pd.read_csv(f,sep = ' ')
-      cols = df.columns.values
-      cols = cols[cols!='FID']
-      cols = cols[cols!='IID']
-      df = df[cols]
-      df = df.melt(value_name = 'value', var_name = 'metric')
-      _,ax = plt.subplots(figsize = (15,10))
-      sns.histplot(data = df, x = 'value', hue = 'metric',bins = 50, common_bins = False,
-                   ax = ax, legend = False, palette = 'pastel6')
-      toc = time.perf_counter() - tic
-      print(f'output to {args.out}/{f}, time = {toc:.3f}'.replace('txt','png'))
-      plt.savefig(f'{args.out}/{f}'.replace('txt',args.fmt))
-      toc= time.perf_counter()-tic
-      print(f'finished {f}. {i+1}/{len(files)}, {toc:.3f} seconds')
+      jobs.append(dict(file = f'{args._in}/{f}', out = f'{args.out}/{f}'.replace('txt',args.fmt),
+                       sep = ' ', style = 'overlay', bins = 50))
+    
+    # bin counts are computed from the wide table and figures rendered in parallel
+    for i, out in enumerate(render_all(jobs, args.n_cpu)):
+      toc = time.perf_counter()-tic
+      print(f'finished {out}. {i+1}/{len(jobs)}, {toc:.3f} seconds')
   
   
 if __name__ == '__main__':
@@ -53,6 +43,8 @@ if __name__ == '__main__':
                         help = 'Output directory')
     parser.add_argument('--file',dest = 'file', default = '*.txt', help = 'Files to plot')
     parser.add_argument('--fmt', dest = 'fmt', default = 'png', help = 'Output Format')
+    parser.add_argument('-n', dest = 'n_cpu', help = 'Number of processes',
+                        default = 1, type = int)
     parser.add_argument('-f','--force', dest = 'force', help = 'Force overwrite',
                         default = False, const = True, action = 'store_const')
     args = parser.parse_args()
@@ -64,6 +56,6 @@ if __name__ == '__main__':
     cmdhistory.log()
     proj = path.project()
     proj.add_input(args._in, __file__)
-    proj.add_output(args._out, __file__)
+    proj.add_output(args.out, __file__)
     try: main(args)
     except: cmdhistory.errlog()
\ No newline at end of file
@@ -3,39 +3,44 @@
 Screens faulty files
 '''
 
+def screen(subj, _in, cache = None):
+    '''
+    Output: None if no connectome is found, otherwise whether it contains NaN
+    '''
+    import numpy as np
+    import os
+    from _utils import connectome
+    in_filename = _in.replace('%subj',subj)
+    if not os.path.isfile(in_filename): return None
+    rsc = connectome.load(in_filename, subj, cache)
+    return bool(np.isnan(rsc).any())
+
 def main(args):
     import numpy as np
     import os
     import time
+    from functools import partial
+    from multiprocessing import Pool
     
     subjs = np.loadtxt(args.subjs,dtype = 'U')
     if len(subjs[0]) > 10:
       for i in range(subjs.size):
         subjs[i] = subjs[i][13:23]
-    naflag = []
     logout = open('/rds/project/rb643-1/rds-rb643-ukbiobank2/Data_Users/yh464/logs/asym_stats_timeout.log','w')
+    if args.cache is not None and not os.path.isdir(args.cache): os.makedirs(args.cache)
     
     tic = time.perf_counter()
-    idx = 0
-    for subj in subjs:
-      toc = time.perf_counter()-tic
-      print(f'{idx}/{subjs.size}, time = {toc:.3f}')
-      idx += 1
-      # specify directories
-      in_filename = args._in.replace('%subj',subj)
-      
-      if not os.path.isfile(in_filename):
-        print(f'No connectome found for the subject {subj}', file = logout)
-        continue
-      
-      # loading the connectome  
-      tic = time.perf_counter()
-      rsc = np.loadtxt(in_filename,delimiter = ',')
-      if np.isnan(rsc).any():
-        naflag.append(True)
-      else:
-        naflag.append(False)
-
+    naflag = np.zeros(subjs.size, dtype = bool)
+    with Pool(args.n_cpu) as pool:
+      res = pool.imap(partial(screen, _in = args._in, cache = args.cache), subjs, chunksize = 16)
+      for idx, (subj, flag) in enumerate(zip(subjs, res)):
+        if idx % 100 == 0:
+          toc = time.perf_counter()-tic
+          print(f'{idx}/{subjs.size}, time = {toc:.3f}')
+        if flag is None:
+          print(f'No connectome found for the subject {subj}', file = logout)
+          continue
+        naflag[idx] = flag
       
     with open(args.out,'w') as f:
       nalist = subjs[naflag]
@@ -55,12 +60,16 @@ if __name__ == '__main__':
                         default = '../params/subjlist_rsfmri_hcp.txt')
     parser.add_argument('-o','--out',dest = 'out', help = 'Output directory',
                         default = '../params/subjlist_rsfmri_hcp_nan.txt')
+    parser.add_argument('-n', dest = 'n_cpu', help = 'Number of processes',
+                        default = 1, type = int)
+    parser.add_argument('--cache', help = 'Directory to cache parsed connectomes as float32 .npy files')
     parser.add_argument('-f','--force', dest = 'force', help = 'Force overwrite',
                         default = False,const = True, action = 'store_const')
     args = parser.parse_args()
     import os
     for arg in ['_in','out','subjs']:
         exec(f'args.{arg} = os.path.realpath(args.{arg})')
+    if args.cache is not None: args.cache = os.path.realpath(args.cache)
     
     from _utils import cmdhistory
     cmdhistory.log()
@@ -6,7 +6,6 @@ def main(args):
     import numpy as np
     from fnmatch import fnmatch
     from time import perf_counter as t
-    from sklearn.linear_model import LinearRegression
     
     tic = t()
     def toc():
@@ -34,27 +33,24 @@ def main(args):
     
     toc()
     
+    # all phenotype columns are residualised against one factorisation of the design
+    from _utils.resid import residualise
     os.chdir(args._in)
     for x in os.listdir():
       if not fnmatch(x,'*.txt'): continue
-      df = pd.read_csv(x, sep = '\s+').dropna()
-      df = pd.merge(df, cov_id, on = ['FID','IID'], how = 'inner')
-      out = df[['FID','IID']]
-      ref = df[['FID','IID']]
-      resid_list = []
-      for y in df.columns.tolist()[2:]:
-        endog = df[y].values
-        exog = pd.merge(cov_out,ref, on = ['FID','IID'], how = 'inner').values
-        md = LinearRegression().fit(exog, endog)
-        resid = endog - md.predict(exog)
-        resid_list.append(pd.Series(resid))
-      out = pd.concat([out] + resid_list, axis = 1)
-      out.columns = df.columns
+      df = pd.read_csv(x, sep = '\s+')
+      pheno = df.columns.tolist()[2:]
+      # partial: keep subjects with some missing phenotypes, each column uses its observed rows
+      df = df.dropna(how = 'all', subset = pheno) if args.partial else df.dropna()
+      # the design is aligned to the phenotype rows by a single merge
+      df = pd.merge(df, cov_out, on = ['FID','IID'], how = 'inner')
+      resid = residualise(df[pheno].values.astype(np.float64), df[cov_collist].values.astype(np.float64))
+      out = pd.concat([df[['FID','IID']], pd.DataFrame(resid, columns = pheno)], axis = 1)
       prefix = x.replace('.txt','')
       out.to_csv(f'{args.out}/{prefix}_resid.txt', index = False)
       print(f'Finished processing {x}')
       toc()
-      del df, out, ref
+      del df, out, resid
 
 if __name__ == '__main__':
     import argparse
@@ -67,6 +63,8 @@ if __name__ == '__main__':
       default = '../params/quantitative_covars.txt')
     parser.add_argument('-o','--out', dest = 'out', help = 'Output directory',
       default = '../pheno/resid/')
+    parser.add_argument('--partial', help = 'Keep subjects with partially missing phenotypes',
+      default = False, action = 'store_true')
     # always forces
     args=parser.parse_args()
     import os
@@ -77,6 +75,6 @@ if __name__ == '__main__':
     cmdhistory.log()
     proj = path.project()
     proj.add_input(args._in, __file__)
-    proj.add_output(args._out, __file__)
+    proj.add_output(args.out, __file__)
     try: main(args)
     except: cmdhistory.errlog()
\ No newline at end of file
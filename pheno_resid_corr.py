@@ -20,9 +20,11 @@ def main(args):
     except:
       pass
     
-    df = pd.read_csv(f'{args.pheno[0]}_resid.txt')
-    for i in range(1,len(args.pheno)):
-      df = df.merge(pd.read_csv(f'{args.pheno[i]}_resid.txt'), on = ['FID','IID']).dropna()
+    # all residual files are aligned on FID/IID once, missing values are kept
+    from functools import reduce
+    from _utils.corr import pairwise, long_format
+    df = reduce(lambda x, y: x.merge(y, on = ['FID','IID'], how = 'outer'),
+                [pd.read_csv(f'{p}_resid.txt') for p in args.pheno])
     
     df = df.iloc[:,2:]
     out_col = []
@@ -31,11 +33,17 @@ def main(args):
         out_col.append(x)
     df = df[out_col]
     
-    corr = df.corr()
+    # pairwise-complete correlations, N and p-values by masked matrix products
+    r, n, p = pairwise(df.values)
+    corr = pd.DataFrame(r, index = out_col, columns = out_col)
     out_fname = args.out + '/resid_corr_'+'_'.join(args.pheno)
     corr.to_csv(out_fname + '.csv')
-    sns.heatmap(corr, vmin = -1, vmax = 1, cmap = 'redblue', annot = True, fmt = '.2f',
-                    ax = plt.subplots(figsize = (22,22))[1])
+    long_format(r, n, p, out_col).to_csv(out_fname + '_long.txt', sep = '\t', index = False)
+    
+    # annotations are only legible for small matrices
+    size = min(max(8, len(out_col) * .4), 60)
+    sns.heatmap(corr, vmin = -1, vmax = 1, cmap = 'redblue', annot = len(out_col) <= 50, fmt = '.2f',
+                    ax = plt.subplots(figsize = (size, size))[1])
     
     plt.savefig(out_fname+ '.png')
     plt.close()
@@ -58,6 +66,6 @@ if __name__ == '__main__':
     cmdhistory.log()
     proj = path.project()
     proj.add_input(args._in, __file__)
-    proj.add_output(args._out, __file__)
+    proj.add_output(args.out, __file__)
     try: main(args)
     except: cmdhistory.errlog()
\ No newline at end of file
@@ -6,6 +6,8 @@ This script generates PRScs from external sumstats
 def main(args):
     from fnmatch import fnmatch
     import pandas as pd
+    from _utils.gwastore import read_sumstats
+    from _utils import cache, sumstats
     
     # array submitter
     from _utils import array_submitter
@@ -22,19 +24,34 @@ def main(args):
     
     tmpdir = '/rds/project/rb643/rds-rb643-ukbiobank2/Data_Users/yh464/temp/prs_temp'
     if not os.path.isdir(tmpdir): os.mkdir(tmpdir)
+    needed = set() # formatted sumstats read by submitted jobs, see below
     
     for p in args.pheno:
         if not os.path.isdir(f'{tmpdir}/{p}'): os.mkdir(f'{tmpdir}/{p}')
         for x in os.listdir(f'{args._in}/{p}'):
-            if fnmatch(x, '*_X.fastGWA') or not fnmatch(x, '*.fastGWA'): continue
-            prefix = x.replace('.fastGWA','')
+            if fnmatch(x, '*_X.fastGWA*') or not fnmatch(x.replace('.gz',''), '*.fastGWA'): continue
+            if x.endswith('.gz') and os.path.isfile(f'{args._in}/{p}/{x[:-3]}'): continue # plain copy is used
+            prefix = x.replace('.gz','').replace('.fastGWA','')
             print(prefix)
+            gwa = f'{args._in}/{p}/{x}'
             tmpgwa = f'{tmpdir}/{p}/{prefix}.txt'
             tmpn = f'{tmpdir}/{p}/{prefix}_n.txt'
             
-            if not os.path.isfile(tmpgwa) or not os.path.isfile(tmpn) or args.force:
+            outdir = f'{args.out}/{p}/{prefix}'
+            out_prefix = f'{outdir}/{prefix}'
+            # PRS-CS outputs older than the GWAS are redone; the formatted sumstats
+            # may have been evicted and rebuilt, so their mtime is not used
+            todo = [j for j in range(22) if args.force or not
+                    cache.newer(out_prefix+f'_pst_eff_a1_b0.5_phi{args.phi:.0e}_chr{j+1}.txt', [gwa])]
+            if len(todo) == 0: continue
+            needed |= {tmpgwa, tmpn}
+            
+            # formatted sumstats are redone only if the GWAS has changed
+            if args.force or not cache.valid([tmpgwa, tmpn], [gwa], dict(stage = 'prscs')):
                 # format GWAS
-                df = pd.read_table(f'{args._in}/{p}/{x}')
+                hdr = sumstats.header(gwa)
+                cols = [c for c in ['SNP','A1','A2','OR','BETA','Z','P','N','N_CAS','N_CON'] if c in hdr]
+                df = read_sumstats(gwa, columns = cols)
                 if 'OR' in df.columns:
                     tmpdf = df[['SNP','A1','A2','OR','P']]
                 elif 'BETA' in df.columns:
@@ -52,20 +69,21 @@ def main(args):
                 with open(tmpn, 'w') as n_file: 
                     print(n, file = n_file)
                     n_file.close()
+                cache.store([tmpgwa, tmpn], [gwa], dict(stage = 'prscs'))
             else:
                 n = open(tmpn).read().splitlines()
                 n = int(float(n[0]))
             
-            outdir = f'{args.out}/{p}/{prefix}'
             if not os.path.isdir(outdir): os.system(f'mkdir -p {outdir}')
       
-            for j in range(22):
-                out_prefix = f'{outdir}/{prefix}'
-                if os.path.isfile(out_prefix+f'_pst_eff_a1_b0.5_phi{args.phi:.0e}_chr{j+1}.txt') and (not args.force):
-                    continue
+            for j in todo:
                 submitter.add(f'python {args.prscs}/PRScs.py --ref_dir={args.ref} '+
                           f'--bim_prefix={bed_list[j]} --sst_file={tmpgwa} --n_gwas={n} --out_dir={out_prefix} '+
                           f'--chrom={j+1} --phi={args.phi} --seed 114514')
+    
+    # evicted after submission planning: files whose outputs are still stale are
+    # inputs of jobs submitted now or still queued from an earlier batch
+    for p in args.pheno: cache.evict(f'{tmpdir}/{p}', keep = needed) # formatted sumstats are pure cache
     submitter.submit()
         
 if __name__ == '__main__':
@@ -12,43 +12,75 @@ def main(args):
     # progress check
     fout = f'{args.out}/{args.prefix}.txt'
     errlog = f'{args.out}/{args.prefix}_not_found.txt'
+    qclog = f'{args.out}/{args.prefix}_qc_excluded.txt'
     if os.path.isfile(fout) and not args.force: 
         print('subj list already generated')
         return
     
     # count subjs with imaging profiles and w/o
-    found = 0
+    # a subject is found if the target files of all templates exist, see _utils/fscan.py
+    from _utils import fscan
+    subjs, found_by_target = fscan.scan(args.target, snapshot = f'{args.out}/.{args.prefix}_scan.json',
+        recheck = args.recheck, rescan = args.rescan, threads = args.threads,
+        max_age = args.max_age * 86400 if args.max_age >= 0 else None)
+    found = []
     not_found = 0
-    fout = open(fout,'w')
     errlog = open(errlog,'w')
-    base = args.target.split('%subj')[0]
-    for subj in os.listdir(base):
-        target = args.target.replace('%subj',subj) # target file path
-        if os.path.isfile(target):
-            found += 1
-            print(subj.replace('UKB',''), file = fout)
+    for subj in subjs:
+        if all(subj in found_by_target[t] for t in args.target):
+            found.append(subj.replace('UKB',''))
         else:
             not_found += 1
             print(subj.replace('UKB',''), file = errlog)
     
-    print(f'Total {found + not_found} subjects')
-    print(f'Found imaging profiles for {found} subjects')
+    print(f'Total {len(found) + not_found} subjects')
+    print(f'Found imaging profiles for {len(found)} subjects')
     print(f'No imaging profile for {not_found} subjects')
     
+    # genetic QC from the cached per-subject masks, see _utils/ukbqc.py
+    if args.ukb is not None:
+        from _utils import ukbqc
+        qc = ukbqc.get(args.ukb, ukbqc.load_rules(args.qc))
+        counts = {}
+        keep = qc.apply([int(x) for x in found], counts = counts)
+        in_fetch = qc.lookup([int(x) for x in found])[0]
+        with open(qclog, 'w') as f:
+            for x, k in zip(found, keep):
+                if not k: print(x, file = f)
+        found = [x for x, k in zip(found, keep) if k]
+        print(f'{int((~in_fetch).sum())} subjects not found in the UKB fetch')
+        for k, v in counts.items(): print(f'{v} subjects excluded by QC ({k})')
+        print(f'{len(found)} subjects passed QC')
+    
+    with open(fout, 'w') as f:
+        for x in found: print(x, file = f)
+    
     return
 
 if __name__ == '__main__':
     from argparse import ArgumentParser
     parser = ArgumentParser(description='This programme finds subjects with '+
         'a valid imaging profile')
-    parser.add_argument('-t','--target',dest = 'target', help =
-        'Target file to screen',
-        default = '/rds/project/rb643-1/rds-rb643-ukbiobank2/Data_Imaging/'+
-        '%subj/func/fMRI/parcellations/HCP.fsaverage.aparc_seq/Connectivity_sc2345.txt')
+    parser.add_argument('-t','--target',dest = 'target', nargs = '+', help =
+        'Target file(s) to screen, subjects need all of them',
+        default = ['/rds/project/rb643-1/rds-rb643-ukbiobank2/Data_Imaging/'+
+        '%subj/func/fMRI/parcellations/HCP.fsaverage.aparc_seq/Connectivity_sc2345.txt'])
     parser.add_argument('-o','--out', dest = 'out', help = 'output subj list dir',
         default = '../params')
     parser.add_argument('-p','--prefix', dest = 'prefix', required = True,
         help = 'output file prefix')
+    parser.add_argument('--ukb', help = 'UKB fetch in TAB format, screens subjects by genetic QC if given',
+        default = None)
+    parser.add_argument('--qc', help = 'QC rules in JSON format, defaults to _utils/ukbqc.py default_rules',
+        default = None)
+    parser.add_argument('--threads', help = 'Number of threads for file system checks',
+        default = 32, type = int)
+    parser.add_argument('--recheck', action = 'store_true', default = False,
+        help = 'check all subjects not found in the previous scan again, regardless of --max-age')
+    parser.add_argument('--max-age', dest = 'max_age', default = 7, type = float,
+        help = 'days after which subjects not found in the previous scan are checked again, negative for never')
+    parser.add_argument('--rescan', action = 'store_true', default = False,
+        help = 'check all subjects, ignoring the snapshot of the previous scan')
     parser.add_argument('-f','--force', dest = 'force', action = 'store_true',
         default = False, help = 'force overwrite')
     args = parser.parse_args()
@@ -0,0 +1,66 @@
+'''
+Shared fixtures for the tests of _utils and the pipeline scripts
+Run from the repository root: python -m pytest tests
+'''
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+if not root in sys.path: sys.path.insert(0, root)
+datadir = f'{root}/tests/data'
+
+def make_sumstats(n = 500, seed = 0, chroms = (1, 2, 3)):
+    # synthetic fastGWA table, positions are unique within each chromosome
+    rng = np.random.default_rng(seed)
+    chrom = np.sort(rng.choice(chroms, n))
+    pos = np.concatenate([np.sort(rng.choice(10**7, (chrom == c).sum(), replace = False)) + 1
+                          for c in chroms])
+    a1, a2 = np.array([rng.choice(['A','C','G','T'], 2, replace = False) for _ in range(n)]).T
+    return pd.DataFrame(dict(CHR = chrom, SNP = [f'rs{i}' for i in rng.permutation(n) + 1], POS = pos,
+        A1 = a1, A2 = a2, N = rng.integers(20000, 40000, n), AF1 = rng.uniform(.01, .99, n).round(6),
+        BETA = rng.normal(0, .05, n).round(6), SE = rng.uniform(.005, .02, n).round(6),
+        P = 10**-rng.uniform(0, 12, n)))
+
+@pytest.fixture
+def fastgwa(tmp_path):
+    # path of a synthetic fastGWA file, and its content
+    df = make_sumstats()
+    file = f'{tmp_path}/trait.fastGWA'
+    df.to_csv(file, sep = '\t', index = False)
+    return file, df
+
+def make_fetch(file, n = 300, seed = 0):
+    # synthetic UKB tab fetch with the QC fields (in the order of the former ukb_extract.py
+    # qc_cols), a data field and one malformed row
+    rng = np.random.default_rng(seed)
+    na = lambda x, frac: np.where(rng.uniform(size = n) < frac, 'NA', x)
+    sex = rng.integers(0, 2, n)
+    df = pd.DataFrame({'f.eid': rng.permutation(np.arange(1000000, 1000000 + 2 * n))[:n].astype(str),
+        'f.31.0.0': sex.astype(str), 'f.21000.0.0': rng.choice(['1001','1002','3001','-3'], n, p = [.7, .2, .05, .05]),
+        'f.22001.0.0': np.where(rng.uniform(size = n) < .05, 1 - sex, sex).astype(str),
+        'f.22009.0.1': na(rng.normal(0, 15, n).round(3).astype(str), .02),
+        'f.22009.0.2': na(rng.normal(0, 8, n).round(3).astype(str), .02),
+        'f.22027.0.0': na('1', .95), 'f.25000.2.0': na(rng.normal(100, 10, n).round(2).astype(str), .3)})
+    with open(file, 'w') as f:
+        df.to_csv(f, sep = '\t', index = False)
+        f.write('9999999\t1\t1\n')
+    return df
+
+def write_bed(prefix, geno, chrom, bp, snps = None):
+    # SNP-major PLINK 1 binary fileset; geno: A1 counts (SNPs x samples), NaN for missing
+    geno = np.asarray(geno, dtype = np.float64)
+    nsnp, nsamp = geno.shape
+    if snps is None: snps = [f'rs{i}' for i in range(nsnp)]
+    codes = np.where(np.isnan(geno), 1, np.select([geno == 2, geno == 1], [0, 2], 3)).astype(np.uint8)
+    codes = np.pad(codes, ((0, 0), (0, -nsamp % 4)), constant_values = 3).reshape(nsnp, -1, 4)
+    packed = (codes << np.array([0, 2, 4, 6], dtype = np.uint8)).sum(axis = 2).astype(np.uint8)
+    with open(f'{prefix}.bed', 'wb') as f: f.write(bytes([0x6c, 0x1b, 0x01]) + packed.tobytes())
+    pd.DataFrame(dict(CHR = chrom, SNP = snps, CM = 0, BP = bp, A1 = 'A', A2 = 'G')).to_csv(
+        f'{prefix}.bim', sep = '\t', header = False, index = False)
+    pd.DataFrame(dict(FID = range(nsamp), IID = range(nsamp), P = 0, M = 0, S = 0, Y = -9)).to_csv(
+        f'{prefix}.fam', sep = ' ', header = False, index = False)
+    return prefix
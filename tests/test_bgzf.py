@@ -0,0 +1,102 @@
+'''
+BGZF writer and reader: round trips, gzip compatibility, random access and
+no partial outputs when writing fails
+'''
+
+import os
+import gzip
+import numpy as np
+import pandas as pd
+import pytest
+from _utils import bgzf, sumstats
+import gwa_filter
+
+@pytest.fixture
+def text():
+    # several blocks, with lines spanning block boundaries
+    rng = np.random.default_rng(5)
+    return ''.join(f'rs{i}\t{x:.6f}\n' for i, x in enumerate(rng.normal(size = 30000))).encode()
+
+@pytest.mark.parametrize('threads', [1, 4])
+def test_roundtrip(tmp_path, text, threads):
+    file = f'{tmp_path}/t.gz'
+    with bgzf.writer(file, threads = threads) as w:
+        for i in range(0, len(text), 7777): w.write(text[i:i+7777])
+    assert bgzf.is_bgzf(file)
+    assert len(bgzf.block_index(file)[0]) > 2
+    assert bgzf.decompress(file, threads = threads) == text
+    assert gzip.open(file).read() == text # readable by any gzip reader
+    assert os.listdir(tmp_path) == ['t.gz']
+
+def test_plain_gzip(tmp_path, text):
+    file = f'{tmp_path}/t.gz'
+    with gzip.open(file, 'wb') as f: f.write(text)
+    assert not bgzf.is_bgzf(file)
+    assert bgzf.decompress(file) == text
+
+def test_compress_file(tmp_path, text):
+    src = f'{tmp_path}/t.txt'
+    open(src, 'wb').write(text)
+    assert bgzf.compress_file(src) == f'{src}.gz'
+    assert not os.path.isfile(src) and bgzf.decompress(f'{src}.gz') == text
+
+def test_read_lines(tmp_path, text):
+    file = f'{tmp_path}/t.gz'
+    with bgzf.writer(file) as w: w.write(text)
+    starts = np.concatenate([[0], np.flatnonzero(np.frombuffer(text, dtype = np.uint8) == 10)[:-1] + 1])
+    offsets = starts[[0, 1, 5000, 12345, starts.size - 1]].tolist()
+    lines = text.split(b'\n')
+    assert bgzf.read_lines(file, offsets) == [lines[i] + b'\n' for i in [0, 1, 5000, 12345, starts.size - 1]]
+
+def _failing_frame(n = 200000):
+    # raises half-way through to_csv, after the first chunks have been written
+    class failing(float):
+        def __str__(self):
+            raise RuntimeError('injected')
+        __repr__ = __format__ = lambda self, *args: self.__str__()
+    df = pd.DataFrame(dict(SNP = [f'rs{i}' for i in range(n)], P = np.linspace(0, 1, n)))
+    df['X'] = pd.Series([1.] * (n // 2) + [failing(1.)] + [1.] * (n - n // 2 - 1), dtype = object)
+    return df
+
+def _previous(file):
+    with bgzf.writer(file) as w: w.write(b'previous\n')
+
+def test_writer_abort(tmp_path):
+    file = f'{tmp_path}/t.gz'
+    _previous(file)
+    with pytest.raises(RuntimeError):
+        with bgzf.writer(file) as w:
+            w.write(b'x' * 10**6)
+            raise RuntimeError('injected')
+    assert os.listdir(tmp_path) == ['t.gz'] and bgzf.decompress(file) == b'previous\n'
+
+def test_open_text_abort(tmp_path):
+    file = f'{tmp_path}/t.gz'
+    _previous(file)
+    with pytest.raises(RuntimeError, match = 'injected'):
+        with bgzf.open_text(file) as f: _failing_frame().to_csv(f, sep = '\t', index = False)
+    assert os.listdir(tmp_path) == ['t.gz'] and bgzf.decompress(file) == b'previous\n'
+    with bgzf.open_text(f'{tmp_path}/new.gz') as f: f.write('a\tb\n')
+    assert bgzf.decompress(f'{tmp_path}/new.gz') == b'a\tb\n'
+
+def test_sumstats_write_abort(tmp_path):
+    file = f'{tmp_path}/t.fastGWA.gz'
+    _previous(file)
+    with pytest.raises(RuntimeError, match = 'injected'):
+        sumstats.write(_failing_frame(), file)
+    assert os.listdir(tmp_path) == ['t.fastGWA.gz'] and bgzf.decompress(file) == b'previous\n'
+
+def test_filter_abort(fastgwa, tmp_path):
+    file, df = fastgwa
+    outs = {0.01: f'{tmp_path}/o1.fastGWA.gz', 0.1: f'{tmp_path}/o2.fastGWA'}
+    gwa_filter.filter_file(file, outs, chunksize = 100)
+    before = {o: open(o, 'rb').read() for o in outs.values()}
+    # an input that breaks after the first chunk
+    bad = f'{tmp_path}/bad.fastGWA'
+    with open(bad, 'w') as f:
+        df.to_csv(f, sep = '\t', index = False)
+        f.write('1\trs_bad\t1\tA\tG\t1\tnot_a_number\t0\t1\t1\n')
+    with pytest.raises(Exception):
+        gwa_filter.filter_file(bad, outs, chunksize = 100)
+    assert sorted(os.listdir(tmp_path)) == ['bad.fastGWA', 'o1.fastGWA.gz', 'o2.fastGWA', 'trait.fastGWA']
+    assert {o: open(o, 'rb').read() for o in outs.values()} == before
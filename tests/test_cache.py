@@ -0,0 +1,67 @@
+'''
+Result cache: validity against inputs and parameters, adoption and eviction
+'''
+
+import os
+import time
+import pytest
+from _utils import cache
+
+def _write(file, text, mtime = None):
+    open(file, 'w').write(text)
+    if mtime is not None: os.utime(file, (mtime, mtime))
+    return file
+
+@pytest.fixture
+def files(tmp_path):
+    now = time.time()
+    src = _write(f'{tmp_path}/in.txt', 'input', now - 100)
+    out = _write(f'{tmp_path}/out.txt', 'output', now - 50)
+    return src, out
+
+@pytest.mark.parametrize('hash', [False, True])
+def test_valid_after_store(files, hash):
+    src, out = files
+    cache.store(out, [src], dict(maf = .01), hash = hash)
+    assert cache.valid(out, [src], dict(maf = .01), hash = hash)
+    assert not cache.valid(out, [src], dict(maf = .05), hash = hash)
+    _write(src, 'changed')
+    assert not cache.valid(out, [src], dict(maf = .01), hash = hash)
+
+def test_missing_files(files):
+    src, out = files
+    cache.store(out, [src])
+    assert not cache.valid(out, [src, f'{src}.absent'])
+    assert not cache.valid([out, f'{out}.absent'], [src])
+    os.remove(src)
+    assert not cache.valid(out, [src])
+
+def test_adopt(files):
+    src, out = files
+    assert not cache.valid(out, [src], adopt = False)
+    assert cache.valid(out, [src]) # newer than its input, recorded on adoption
+    assert os.path.basename(out) in cache._load(cache._manifest(out))
+    os.utime(out, (0, 0)); cache._update(cache._manifest(out), lambda e: e.clear())
+    assert not cache.valid(out, [src])
+
+def test_newer(files):
+    src, out = files
+    assert cache.newer(out, [src]) and not cache.newer(src, [out])
+    assert cache.newer(out, [f'{src}.absent']) and not cache.newer(f'{out}.absent', [src])
+
+def test_evict(tmp_path, files):
+    src, _ = files
+    outs = []
+    for i in range(4):
+        outs.append(_write(f'{tmp_path}/out{i}.txt', 'x' * 100))
+        cache.store(outs[-1], [src])
+        time.sleep(.01)
+    # one output over the size limit, the oldest is kept as a queued job still reads it
+    cache.evict(str(tmp_path), max_size = 300, keep = [outs[0]])
+    assert [os.path.isfile(o) for o in outs] == [True, False, True, True]
+    assert sorted(cache._load(f'{tmp_path}/{cache.manifest_name}')) == ['out0.txt','out2.txt','out3.txt']
+    # entries past max_age, or whose outputs are gone, are removed
+    os.remove(outs[3])
+    cache.evict(str(tmp_path), max_age = 1e-9)
+    assert not any(os.path.isfile(o) for o in outs)
+    assert cache._load(f'{tmp_path}/{cache.manifest_name}') == {}
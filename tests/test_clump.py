@@ -0,0 +1,77 @@
+'''
+Native clumping against a PLINK 1.9 .clumped fixture
+
+tests/data/clump.{bed,bim,fam}: 8 samples and 12 SNPs on chromosomes 1 and 2 whose
+genotypes are copies, mirrors or balanced orthogonal patterns of each other, so
+every r2 is exactly 0 or 1 and the result of --clump does not depend on
+rounding. clump.clumped is the output, written out by hand in the PLINK format, of
+    plink --bfile clump --clump clump.fastGWA --clump-field P --clump-p1 5e-8
+          --clump-p2 1 --clump-r2 0.1 --clump-kb 1000
+for clump.fastGWA, which also contains a SNP absent from the genotypes.
+'''
+
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import datadir, write_bed
+from _utils import clump, sumstats
+
+@pytest.fixture
+def geno():
+    return clump.bed(f'{datadir}/clump')
+
+def _native(geno, p1 = 5e-8, ld = None):
+    df = sumstats.read(f'{datadir}/clump.fastGWA')
+    return pd.concat([clump.clump(df.loc[df.CHR == c, ['SNP','P']], geno, p1 = p1, p2 = 1, r2 = .1, kb = 1000, ld = ld)
+                      for c in [1, 2]])
+
+def _plink():
+    return sumstats.read(f'{datadir}/clump.clumped')
+
+def _key(df):
+    return df.sort_values(['CHR','P']).reset_index(drop = True)
+
+def test_matches_plink(geno):
+    out = _native(geno)
+    assert out.columns.tolist() == clump.clumped_cols
+    pd.testing.assert_frame_equal(_key(out), _key(_plink()), check_dtype = False, check_categorical = False)
+    for c, tmp in out.groupby('CHR'): assert tmp.P.is_monotonic_increasing
+
+def test_stricter_threshold(geno):
+    # index SNPs at p1 are a prefix of those at a looser threshold, with the same clumps
+    exp = _plink()
+    pd.testing.assert_frame_equal(_key(_native(geno, p1 = 1e-8)), _key(exp.loc[exp.P <= 1e-8]),
+                                  check_dtype = False, check_categorical = False)
+
+def test_write_roundtrip(geno, tmp_path):
+    out = _native(geno)
+    clump.write(out, f'{tmp_path}/a.clumped')
+    back = sumstats.read(f'{tmp_path}/a.clumped')
+    assert back.attrs['layout'] == 'clumped'
+    pd.testing.assert_frame_equal(back, out.reset_index(drop = True), check_dtype = False, check_categorical = False)
+
+def test_bed(geno):
+    assert geno.nsamp == 8 and geno.bim.shape[0] == 12
+    assert geno.lookup(['rs3', 'rs10', 'rs11']).tolist() == [2, -1, 9]
+    np.testing.assert_allclose(geno.r(0, np.arange(12)), [1, 1, -1, 0, 0, 0, 0, 0, 1, 1, 1, 0], atol = 1e-6)
+    x = geno.standardised([0, 5])
+    np.testing.assert_allclose((x**2).sum(axis = 1), 1, rtol = 1e-6)
+    np.testing.assert_allclose(x.sum(axis = 1), 0, atol = 1e-6)
+
+def test_missing_genotypes(tmp_path):
+    # r of mean-imputed genotypes, with sample counts that are not multiples of 4
+    rng = np.random.default_rng(15)
+    g = rng.integers(0, 3, (6, 37)).astype(float)
+    g[rng.uniform(size = g.shape) < .1] = np.nan
+    g[5] = 1 # monomorphic, r = 0
+    geno = clump.bed(write_bed(f'{tmp_path}/t', g, 1, np.arange(6) * 100 + 1))
+    x = np.where(np.isnan(g), np.nanmean(g, axis = 1, keepdims = True), g)
+    exp = np.corrcoef(x[:5])[0]
+    np.testing.assert_allclose(geno.r(0, np.arange(5)), exp, atol = 1e-6)
+    assert (geno.r(0, np.array([5])) == 0).all()
+
+def test_bed_validation(tmp_path):
+    for ext in ['bim', 'fam']:
+        open(f'{tmp_path}/t.{ext}', 'w').write(open(f'{datadir}/clump.{ext}').read())
+    open(f'{tmp_path}/t.bed', 'wb').write(open(f'{datadir}/clump.bed', 'rb').read()[:-1])
+    with pytest.raises(ValueError): clump.bed(f'{tmp_path}/t')
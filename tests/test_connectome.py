@@ -0,0 +1,38 @@
+'''
+Connectome cache and NaN screening
+'''
+
+import os
+import numpy as np
+from _utils import connectome
+import pheno_qc
+
+def _write(file, x, mtime = None):
+    np.savetxt(file, x, delimiter = ',')
+    if mtime is not None: os.utime(file, (mtime, mtime))
+
+def test_load_cache(tmp_path):
+    rng = np.random.default_rng(11)
+    x = rng.normal(size = (20, 20))
+    file = f'{tmp_path}/c.txt'; cache = f'{tmp_path}/cache'; os.mkdir(cache)
+    _write(file, x, mtime = 1000)
+    parsed = connectome.load(file)
+    first = connectome.load(file, 's1', cache)
+    # float32 whether parsed or cached
+    assert parsed.dtype == first.dtype == np.float32 and os.path.isfile(connectome.cache_path(cache, 's1'))
+    np.testing.assert_array_equal(first, parsed)
+    np.testing.assert_allclose(first, x, rtol = 1e-6)
+    # the cached array is read while it is newer than the text file
+    np.save(connectome.cache_path(cache, 's1'), np.zeros((20, 20), dtype = np.float32))
+    assert (connectome.load(file, 's1', cache, mmap = True) == 0).all()
+    _write(file, x + 1)
+    np.testing.assert_allclose(connectome.load(file, 's1', cache), x + 1, rtol = 1e-6)
+
+def test_screen(tmp_path):
+    x = np.ones((5, 5)); y = x.copy(); y[2, 3] = np.nan
+    os.mkdir(f'{tmp_path}/a'); os.mkdir(f'{tmp_path}/b'); os.mkdir(f'{tmp_path}/cache')
+    _write(f'{tmp_path}/a/conn.txt', x); _write(f'{tmp_path}/b/conn.txt', y)
+    pattern = f'{tmp_path}/%subj/conn.txt'
+    for cache in [None, f'{tmp_path}/cache']:
+        assert [pheno_qc.screen(s, pattern, cache) for s in ['a', 'missing', 'b']] == [False, None, True]
+    assert sorted(os.listdir(f'{tmp_path}/cache')) == ['a.npy', 'b.npy']
@@ -0,0 +1,44 @@
+'''
+Pairwise-complete correlations against pd.DataFrame.corr and scipy
+'''
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from _utils import corr
+
+def _data(n = 400, p = 8, seed = 14):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size = (n, p)) @ rng.normal(size = (p, p)) + 100 # offset tests cancellation
+    x[rng.uniform(size = x.shape) < .2] = np.nan
+    x[:, 5] = np.nan; x[:2, 5] = [1, 2]           # two observations
+    x[50:, 6] = np.nan                            # few observations
+    return x
+
+def test_matches_dataframe_corr():
+    x = _data()
+    r, n, p = corr.pairwise(x)
+    df = pd.DataFrame(x)
+    np.testing.assert_allclose(r, df.corr().values, atol = 1e-10, equal_nan = True)
+    np.testing.assert_array_equal(n, df.notna().astype(int).T @ df.notna().astype(int))
+
+def test_p_values_match_pearsonr():
+    x = _data()
+    r, n, p = corr.pairwise(x)
+    for i in range(x.shape[1]):
+        for j in range(x.shape[1]):
+            rows = ~np.isnan(x[:, i]) & ~np.isnan(x[:, j])
+            if i == j or rows.sum() < 3: continue
+            res = stats.pearsonr(x[rows, i], x[rows, j])
+            np.testing.assert_allclose([r[i, j], p[i, j]], [res[0], res[1]], rtol = 1e-8, atol = 1e-12)
+    assert np.isnan(p[5, 5]) and p[0, 0] == 0
+
+def test_long_format():
+    x = _data()
+    r, n, p = corr.pairwise(x)
+    names = [f'p{i}' for i in range(x.shape[1])]
+    out = corr.long_format(r, n, p, names)
+    assert out.shape[0] == 28 and (out.pheno1 < out.pheno2).all()
+    row = out.loc[(out.pheno1 == 'p1') & (out.pheno2 == 'p3')].iloc[0]
+    assert (row.r, row.N, row.p) == (r[1, 3], n[1, 3], p[1, 3])
+    assert corr.long_format(r, n, p, names, triangle = False).shape[0] == 64
@@ -0,0 +1,54 @@
+'''
+Subject discovery: threaded scan against direct file checks, and snapshot reuse
+'''
+
+import os
+import argparse
+import pytest
+from _utils import fscan
+import subj_list
+
+@pytest.fixture
+def tree(tmp_path):
+    # subjects with both, one or none of two target files, and a stray file
+    img = f'{tmp_path}/img'
+    for i in range(30):
+        os.makedirs(f'{img}/UKB{1000 + i}/func')
+        if i % 3 != 0: open(f'{img}/UKB{1000 + i}/func/conn.txt', 'w').close()
+        if i % 2 == 0: open(f'{img}/UKB{1000 + i}/func/ts.txt', 'w').close()
+    open(f'{img}/readme.txt', 'w').close()
+    return img, [f'{img}/%subj/func/conn.txt', f'{img}/%subj/func/ts.txt']
+
+def _direct(t, subjs):
+    return set(s for s in subjs if os.path.isfile(t.replace('%subj', s)))
+
+def test_scan_matches_direct_checks(tree):
+    img, templates = tree
+    subjs, found = fscan.scan(templates, threads = 4)
+    assert subjs == sorted(x for x in os.listdir(img) if x.startswith('UKB'))
+    for t in templates: assert found[t] == _direct(t, subjs)
+
+def test_snapshot(tree, tmp_path):
+    img, templates = tree
+    snap = f'{tmp_path}/scan.json'
+    fscan.scan(templates, snapshot = snap, max_age = None)
+    # new subject, new image for a subject not found before, removed subject
+    os.makedirs(f'{img}/UKB2000/func'); open(f'{img}/UKB2000/func/conn.txt', 'w').close()
+    open(f'{img}/UKB1000/func/conn.txt', 'w').close()
+    os.rename(f'{img}/UKB1001', f'{tmp_path}/UKB1001')
+    subjs, found = fscan.scan(templates, snapshot = snap, max_age = None)
+    assert 'UKB2000' in found[templates[0]] and not 'UKB1000' in found[templates[0]]
+    assert not 'UKB1001' in subjs and not 'UKB1001' in found[templates[0]]
+    # previously missing subjects are checked again with recheck or once max_age has passed
+    assert 'UKB1000' in fscan.scan(templates, snapshot = snap, max_age = 0)[1][templates[0]]
+    subjs, found = fscan.scan(templates, snapshot = snap, rescan = True)
+    for t in templates: assert found[t] == _direct(t, subjs)
+
+def test_subj_list(tree, tmp_path, capsys):
+    img, templates = tree
+    args = argparse.Namespace(target = templates, out = f'{tmp_path}/params', prefix = 'hcp', ukb = None, qc = None,
+                              threads = 4, recheck = False, rescan = False, max_age = 7, force = False)
+    subj_list.main(args)
+    exp = [str(1000 + i) for i in range(30) if i % 3 != 0 and i % 2 == 0]
+    assert open(f'{tmp_path}/params/hcp.txt').read().split() == exp
+    assert len(open(f'{tmp_path}/params/hcp_not_found.txt').read().split()) == 30 - len(exp)
@@ -0,0 +1,77 @@
+'''
+gwa_clump.py with the native engine: several thresholds in one pass, and
+consistency of the .siglist and .clumped outputs
+'''
+
+import os
+import sys
+import shutil
+import subprocess
+import pandas as pd
+import pytest
+from conftest import root, datadir
+from _utils import sumstats
+
+@pytest.fixture
+def indir(tmp_path):
+    os.mkdir(f'{tmp_path}/in')
+    shutil.copy(f'{datadir}/clump.fastGWA', f'{tmp_path}/in/a.fastGWA')
+    # one bed fileset per chromosome, here the same fileset for both
+    open(f'{tmp_path}/blist.txt', 'w').write(f'{datadir}/clump\n{datadir}/clump\n')
+    return tmp_path
+
+def _run(tmp_path, out, p, *opts):
+    os.makedirs(f'{tmp_path}/{out}', exist_ok = True)
+    subprocess.run([sys.executable, f'{root}/gwa_clump.py', '-i', f'{tmp_path}/in', '--file', 'a.fastGWA',
+                    '-b', f'{tmp_path}/blist.txt', '--engine', 'native', '-o', f'{tmp_path}/{out}', '-p', *p, *opts],
+                   check = True, capture_output = True, cwd = tmp_path)
+    return f'{tmp_path}/{out}'
+
+@pytest.mark.parametrize('opts', [[], ['-t', '2'], ['--ld', 'ldcache']])
+def test_thresholds_in_one_pass(indir, opts):
+    thresholds = ['5e-08', '3e-08', '1e-08']
+    multi = _run(indir, 'multi', thresholds, *opts)
+    for p in thresholds:
+        single = _run(indir, f'single_{p}', [p])
+        for ext in ['clumped', 'siglist']:
+            a = pd.read_table(f'{multi}/a_{p}.{ext}'); b = pd.read_table(f'{single}/a_{p}.{ext}')
+            pd.testing.assert_frame_equal(a, b)
+
+def test_siglist_matches_clumped(indir):
+    out = _run(indir, 'out', ['5e-08', '1e-08'])
+    exp = sumstats.read(f'{datadir}/clump.clumped')
+    for p in [5e-8, 1e-8]:
+        clumped = pd.read_table(f'{out}/a_{p:.0e}.clumped')
+        siglist = pd.read_table(f'{out}/a_{p:.0e}.siglist')
+        # thresholds are inclusive for both, rs9 has p = 5e-8 exactly
+        assert (siglist.P <= p).all() and (clumped.P <= p).all()
+        assert set(clumped.SNP) == set(siglist.SNP) - {'rs10'} - set(s[:-3] for x in clumped.SP2 for s in x.split(','))
+        assert sorted(clumped.SNP) == sorted(exp.loc[exp.P <= p, 'SNP'])
+
+def test_no_significant_snp(indir):
+    out = _run(indir, 'out', ['1e-20'])
+    assert os.listdir(out) == []
+
+@pytest.mark.parametrize('engine', ['native', 'ldcache'])
+def test_threads_match_sequential(indir, engine):
+    # a second file whose most significant SNP is on chromosome 2, so the worker
+    # finishing order and the sequential merge order differ between files
+    df = pd.read_table(f'{indir}/in/a.fastGWA')
+    df.loc[df.CHR == 2, 'P'] /= 1e5
+    df.sample(frac = 1, random_state = 0).to_csv(f'{indir}/in/b.fastGWA', sep = '\t', index = False)
+    opts = ['--ld', 'ldcache'] if engine == 'ldcache' else []
+    outs = {}
+    for t in ['1', '3']:
+        out = f'{indir}/t{t}'; os.makedirs(out)
+        res = subprocess.run([sys.executable, f'{root}/gwa_clump.py', '-i', f'{indir}/in', '--file', 'a.fastGWA', 'b.fastGWA',
+                              '-b', f'{indir}/blist.txt', '--engine', 'native', '-o', out, '-p', '5e-08', '1e-08',
+                              '-t', t, *opts], check = True, capture_output = True, text = True, cwd = indir)
+        # one timing line per chromosome and file
+        assert res.stdout.count('Finished clumping chromosome') == 4 and res.stdout.count('/2 chromosome time') == 4
+        outs[t] = out
+    assert sorted(os.listdir(outs['1'])) == sorted(os.listdir(outs['3'])) == \
+        sorted(f'{f}_{p}.{ext}' for f in 'ab' for p in ['5e-08', '1e-08'] for ext in ['clumped', 'siglist'])
+    for f in os.listdir(outs['1']):
+        assert open(f'{outs["1"]}/{f}').read() == open(f'{outs["3"]}/{f}').read()
+    b = pd.read_table(f'{outs["3"]}/b_5e-08.clumped')
+    assert b.CHR.tolist() == [2, 2, 1, 1, 1, 1, 1]
@@ -0,0 +1,107 @@
+'''
+gwa_clump_parse.py: loci by union-find and crosstab overlap tables, against the
+sequential fnmatch grouping and nested loops they replace
+'''
+
+import os
+import argparse
+import numpy as np
+import pandas as pd
+import pytest
+import gwa_clump_parse
+from _utils import clump, path
+
+def _old_identify_clumps(df):
+    # previous implementation: a SNP joins the current clump if it is listed in
+    # the SP2 of any SNP already in it, matched as a substring
+    from fnmatch import fnmatch
+    clumps = []
+    snps = df['SNP'].unique()
+    if len(snps) == 0: return []
+    current_clump = [snps[0]]
+    for i in snps[1:]:
+        in_clump = False
+        for j in current_clump:
+            if any(fnmatch(p2, f'*{i}*') for p2 in df.loc[df.SNP==j,'SP2']):
+                in_clump = True; break
+        if in_clump: current_clump.append(i)
+        else: clumps.append(current_clump); current_clump = [i]
+    clumps.append(current_clump)
+    return clumps
+
+def _old_overlaps(df, clumps, prefix_list):
+    overlaps = pd.DataFrame(data = 0, index = prefix_list, columns = [clump[0] for clump in clumps])
+    for phen in prefix_list:
+        for snp in df.loc[df.phenotype==phen,'SNP']:
+            for c in clumps:
+                if snp in c: overlaps.loc[phen, c[0]] = 1
+    return overlaps
+
+def _random_clumps(seed):
+    # loci of nearby index SNPs, each listing the later index SNPs of its locus in SP2,
+    # so that the sequential grouping is exact; IDs are padded to avoid substring matches
+    rng = np.random.default_rng(seed)
+    rows = []
+    for locus in range(30):
+        members = [f'rs{locus:03d}{k}' for k in range(rng.integers(1, 5))]
+        for k, snp in enumerate(members):
+            sp2 = [f'{m}(1)' for m in members[k+1:]] + [f'rs9{locus:03d}{m}(1)' for m in range(rng.integers(0, 3))]
+            rows.append(dict(phenotype = f'p{rng.integers(4)}', SNP = snp, SP2 = ','.join(sp2) if sp2 else 'NONE'))
+    return pd.DataFrame(rows)
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_identify_clumps(seed):
+    df = _random_clumps(seed)
+    clumps = gwa_clump_parse.identify_clumps(df)
+    assert clumps == _old_identify_clumps(df)
+    prefix_list = sorted(df.phenotype.unique())
+    overlaps = gwa_clump_parse.overlap_matrix(df, clumps, 'phenotype').reindex(prefix_list, fill_value = 0)
+    pd.testing.assert_frame_equal(overlaps, _old_overlaps(df, clumps, prefix_list), check_names = False)
+
+def test_edges_and_union_find():
+    df = pd.DataFrame(dict(SNP = ['rs1', 'rs5', 'rs12', 'rs3'],
+                           SP2 = ['rs2(1),rs3(1)', 'NONE', 'rs1(1)', np.nan]))
+    edges = gwa_clump_parse.clump_edges(df)
+    assert list(map(tuple, edges.values)) == [('rs1','rs2'), ('rs1','rs3'), ('rs12','rs1')]
+    # rs3 is linked to rs1 although not consecutive, rs12 only through its own SP2;
+    # rs1 is not matched inside rs12
+    assert gwa_clump_parse.identify_clumps(df) == [['rs1', 'rs12', 'rs3'], ['rs5']]
+    assert gwa_clump_parse.locus_map([['rs1', 'rs12', 'rs3'], ['rs5']]).to_dict() == \
+        dict(rs1 = 'rs1', rs12 = 'rs1', rs3 = 'rs1', rs5 = 'rs5')
+    assert gwa_clump_parse.identify_clumps(df.iloc[:0]) == []
+
+def _write(dirname, prefix, rows):
+    # rows: SNP, CHR, POS, P, SP2
+    os.makedirs(dirname, exist_ok = True)
+    df = pd.DataFrame(rows, columns = ['SNP','CHR','POS','P','SP2'])
+    sig = df.assign(A1 = 'A', A2 = 'G', N = 1000, AF1 = .3, BETA = .1, SE = .01)
+    sig[['CHR','SNP','POS','A1','A2','N','AF1','BETA','SE','P']].to_csv(
+        f'{dirname}/{prefix}_0.01_5e-08.siglist', sep = '\t', index = False)
+    clumped = df.rename(columns = dict(POS = 'BP')).assign(F = 1, TOTAL = 0, NSIG = 0, S05 = 0, S01 = 0, S001 = 0, S0001 = 0)
+    clump.write(clumped[['CHR','F','SNP','BP','P','TOTAL','NSIG','S05','S01','S001','S0001','SP2']],
+                f'{dirname}/{prefix}_0.01_5e-08.clumped')
+
+def test_main(tmp_path, monkeypatch):
+    # the directory name contains 'clumped', which must be kept in the .siglist path
+    _in = f'{tmp_path}/clumped'
+    _write(f'{_in}/g1', 'a', [['rs1', 1, 1000, 1e-10, 'rs2(1),rs3(1)'], ['rs10', 1, 5000000, 1e-9, 'NONE']])
+    _write(f'{_in}/g1', 'b', [['rs2', 1, 2000, 1e-9, 'rs1(1)'], ['rs20', 2, 1000, 2e-8, 'NONE']])
+    _write(f'{_in}/g1', 'a_X', [['rs30', 23, 1000, 1e-9, 'NONE']]) # not parsed
+    _write(f'{_in}/g2', 'c', [['rs11', 1, 5001000, 3e-8, 'rs10(1)']])
+    normaliser = path.normaliser
+    monkeypatch.setattr(path, 'normaliser', lambda: normaliser(_dir = f'{tmp_path}/path'))
+    gwa_clump_parse.main(argparse.Namespace(pheno = ['g1', 'g2'], _in = _in, p = 5e-8))
+
+    clumps = pd.read_table(f'{_in}/g1_5e-08_clumps.txt')
+    assert clumps.SNP.tolist() == ['rs1', 'rs2', 'rs10', 'rs20']
+    assert clumps.phenotype.tolist() == ['a', 'b', 'a', 'b'] and (clumps.A1 == 'A').all()
+    overlaps = pd.read_table(f'{_in}/g1_5e-08_overlaps.txt', index_col = 'label').sort_index()
+    old = _old_overlaps(clumps, _old_identify_clumps(clumps), ['a', 'b'])
+    pd.testing.assert_frame_equal(overlaps, old, check_names = False)
+
+    # across groups rs11 joins the locus of rs10 although the rows are not adjacent
+    overlaps = pd.read_table(f'{_in}/all_overlaps_g1_g2_5e-08.txt', index_col = [0, 1])
+    assert overlaps.columns.tolist() == ['rs1', 'rs10', 'rs20']
+    assert overlaps.index.tolist() == [('g1', 'a'), ('g1', 'b'), ('g2', 'c')]
+    assert overlaps.values.tolist() == [[1, 1, 0], [1, 0, 1], [0, 1, 0]]
+    assert pd.read_table(f'{_in}/all_clumps_g1_g2_5e-08.txt').shape[0] == 5
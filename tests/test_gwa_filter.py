@@ -0,0 +1,46 @@
+'''
+Streaming MAF filter against a filter of the whole table
+'''
+
+import os
+import sys
+import subprocess
+import pandas as pd
+from conftest import root, make_sumstats
+from _utils import bgzf
+import gwa_filter
+
+def _maf(df, freq):
+    return df.loc[(df.AF1 >= freq) & (df.AF1 <= 1 - freq)].reset_index(drop = True)
+
+def test_filter_matches_whole_table(fastgwa, tmp_path):
+    file, df = fastgwa
+    outs = gwa_filter.out_files(file, f'{tmp_path}/maf%maf', [0.01, 0.1, 0.3], todir = True)
+    for o in outs.values(): os.mkdir(os.path.dirname(o))
+    gwa_filter.filter_file(file, outs, chunksize = 37)
+    for freq, o in outs.items():
+        pd.testing.assert_frame_equal(pd.read_table(o), _maf(df, freq))
+
+def test_compressed_output(fastgwa, tmp_path):
+    file, df = fastgwa
+    out = f'{tmp_path}/out.fastGWA.gz'
+    gwa_filter.filter_file(file, {0.1: out}, chunksize = 100)
+    assert bgzf.is_bgzf(out)
+    pd.testing.assert_frame_equal(pd.read_table(out), _maf(df, 0.1))
+
+def test_cli_directory(tmp_path):
+    src = f'{tmp_path}/in'; os.mkdir(src)
+    df = [make_sumstats(300, seed = s) for s in range(2)]
+    df[0].to_csv(f'{src}/a_raw.fastGWA', sep = '\t', index = False)
+    df[1].to_csv(f'{src}/b_raw.fastGWA', sep = '\t', index = False)
+    bgzf.compress_file(f'{src}/b_raw.fastGWA')
+    cmd = [sys.executable, f'{root}/gwa_filter.py', '-i', src, '-o', f'{tmp_path}/out',
+           '--freq', '0.05', '-t', '2', '--chunksize', '50']
+    subprocess.run(cmd, check = True, capture_output = True)
+    assert sorted(os.listdir(f'{tmp_path}/out')) == ['.cache.json', '.cache.json.lock', 'a.fastGWA', 'b.fastGWA.gz']
+    pd.testing.assert_frame_equal(pd.read_table(f'{tmp_path}/out/a.fastGWA'), _maf(df[0], .05))
+    pd.testing.assert_frame_equal(pd.read_table(f'{tmp_path}/out/b.fastGWA.gz'), _maf(df[1], .05))
+    # up-to-date outputs are not redone
+    mtime = os.stat(f'{tmp_path}/out/a.fastGWA').st_mtime_ns
+    subprocess.run(cmd, check = True, capture_output = True)
+    assert os.stat(f'{tmp_path}/out/a.fastGWA').st_mtime_ns == mtime
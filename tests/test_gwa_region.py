@@ -0,0 +1,21 @@
+'''
+gwa_region.py as called by finemap_hyprcoloc.r: by script path, from another directory
+'''
+
+import sys
+import subprocess
+from io import StringIO
+import pandas as pd
+from conftest import root
+
+def test_region_cli(fastgwa, tmp_path):
+    file, df = fastgwa
+    row = df.loc[df.CHR == 2].iloc[10]
+    start, stop = int(row.POS), int(row.POS) + 2*10**6
+    out = subprocess.run([sys.executable, f'{root}/gwa_region.py', file, '--chr', '2',
+                          '--start', str(start), '--stop', str(stop)],
+                         cwd = tmp_path, capture_output = True, text = True, check = True).stdout
+    out = pd.read_table(StringIO(out))
+    ref = df.loc[(df.CHR == 2) & (df.POS >= start) & (df.POS <= stop)]
+    assert out.SNP.iloc[0] == row.SNP # bounds are inclusive
+    pd.testing.assert_frame_equal(out, ref.reset_index(drop = True), check_dtype = False)
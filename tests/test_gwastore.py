@@ -0,0 +1,60 @@
+'''
+Columnar sumstats store: round trip against the text reader, region queries and SNP lookup
+'''
+
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from _utils import gwastore, sumstats
+
+def _plain(df):
+    # categorical alleles as strings, rows in store order
+    df = df.astype({c: str for c in ['SNP','A1','A2'] if c in df.columns})
+    return df.sort_values(['CHR','POS'], kind = 'stable').reset_index(drop = True)
+
+def test_roundtrip(fastgwa):
+    file, df = fastgwa
+    assert not gwastore.is_current(file)
+    gwastore.convert(file)
+    assert gwastore.is_current(file)
+    pd.testing.assert_frame_equal(_plain(gwastore.read_store(file)), _plain(df), check_dtype = False)
+    pd.testing.assert_frame_equal(_plain(gwastore.read_store(file)),
+                                  _plain(sumstats.read(file, float32 = False)), check_dtype = False)
+
+def test_read_sumstats_store_equals_text(fastgwa):
+    file, _ = fastgwa
+    text = gwastore.read_sumstats(file, columns = ['SNP','POS','P'], chrom = 2)
+    gwastore.convert(file)
+    store = gwastore.read_sumstats(file, columns = ['SNP','POS','P'], chrom = 2)
+    key = lambda df: df.astype({'SNP': str}).sort_values('POS').reset_index(drop = True)
+    pd.testing.assert_frame_equal(key(store), key(text), check_dtype = False)
+
+def test_compressed_source(fastgwa, tmp_path):
+    file, df = fastgwa
+    gz = f'{tmp_path}/gz.fastGWA.gz'
+    sumstats.write(df, gz)
+    gwastore.convert(gz)
+    pd.testing.assert_frame_equal(_plain(gwastore.read_store(gz)), _plain(df), check_dtype = False)
+
+def test_stale_after_rewrite(fastgwa):
+    file, df = fastgwa
+    gwastore.convert(file)
+    df.iloc[:-1].to_csv(file, sep = '\t', index = False)
+    assert not gwastore.is_current(file)
+    assert gwastore.read_sumstats(file).shape[0] == df.shape[0] - 1
+
+@pytest.mark.parametrize('chrom,start,end', [(1, 0, 10**8), (2, 2*10**6, 5*10**6), (3, 5, 5), (9, 0, 10**8)])
+def test_query_region(fastgwa, chrom, start, end):
+    file, df = fastgwa
+    out = gwastore.query_region(file, chrom, start, end, columns = ['SNP','POS','BETA'])
+    ref = df.loc[(df.CHR == chrom) & (df.POS >= start) & (df.POS <= end), ['SNP','POS','BETA']]
+    pd.testing.assert_frame_equal(out.reset_index(drop = True).astype({'SNP': str}),
+        ref.sort_values('POS').reset_index(drop = True), check_dtype = False)
+
+def test_locate_snp(fastgwa):
+    file, df = fastgwa
+    row = df.iloc[123]
+    assert gwastore.locate_snp(file, row.SNP) == (row.CHR, row.POS)
+    with pytest.raises(ValueError, match = 'rs_absent'):
+        gwastore.locate_snp(file, 'rs_absent')
@@ -0,0 +1,70 @@
+'''
+Allele alignment against the two-merge logic it replaced in gwa_harmonise.py
+'''
+
+import numpy as np
+import pandas as pd
+from _utils import harmonise
+
+def _old_merge(df, ref):
+    # previous gwa_harmonise.harmonise_file: direct and swapped merges on SNP, A1, A2;
+    # the OR inversion was an integer XOR there, the intended 1/OR is used here
+    df = df.copy()
+    for col in ['A1','A2']: df[col] = df[col].str.upper()
+    df_rev = df.copy()
+    df_rev['A2'] = df['A1'].copy(); df_rev['A1'] = df['A2'].copy()
+    df_rev['OR'] = 1 / df_rev['OR']
+    df_rev['BETA'] *= -1
+    tmpref = ref.drop('AF1', axis = 1)
+    df_rev['AF1'] = 1 - df_rev['AF1']
+    merge = pd.merge(tmpref, df, on = ['SNP','A1','A2'])
+    merge_rev = pd.merge(tmpref, df_rev, on = ['SNP','A1','A2'])
+    return pd.concat([merge, merge_rev], axis = 0).sort_values(by = ['CHR','POS'])
+
+def _data(n = 4000, seed = 4):
+    rng = np.random.default_rng(seed)
+    alleles = np.array([rng.choice(list('ACGT'), 2, replace = False) for _ in range(n)])
+    ref = pd.DataFrame(dict(SNP = [f'rs{i}' for i in range(n)], CHR = rng.integers(1, 23, n),
+                            POS = rng.integers(1, 10**8, n), A1 = alleles[:,0], A2 = alleles[:,1],
+                            AF1 = rng.uniform(0, 1, n)))
+    # variants matching, swapped, mismatching or absent from the reference, some in lower case
+    kind = rng.choice(['match','swap','mismatch','no_ref'], n)
+    a1 = np.where(kind == 'swap', alleles[:,1], alleles[:,0])
+    a2 = np.where(kind == 'swap', alleles[:,0], alleles[:,1])
+    third = np.array([next(b for b in 'ACGT' if not b in row and b != harmonise._complement[row[0]])
+                      for row in alleles])
+    a2 = np.where(kind == 'mismatch', third, a2)
+    a1 = np.where(rng.uniform(size = n) < .1, np.char.lower(a1.astype(str)), a1)
+    df = pd.DataFrame(dict(SNP = np.where(kind == 'no_ref', [f'rs_x{i}' for i in range(n)], ref.SNP),
+                           A1 = a1, A2 = a2, N = 30000, AF1 = rng.uniform(0, 1, n), BETA = rng.normal(size = n),
+                           OR = rng.uniform(.5, 2, n), SE = rng.uniform(size = n), P = rng.uniform(size = n)))
+    return df, ref, kind
+
+def _key(df):
+    return df.sort_values('SNP')[sorted(df.columns)].reset_index(drop = True)
+
+def test_align_matches_old_merge():
+    df, ref, kind = _data()
+    new, report = harmonise.align(df, ref)
+    pd.testing.assert_frame_equal(_key(new), _key(_old_merge(df, ref)), check_dtype = False)
+    pal = (df.A1.str.upper().map(harmonise._complement) == df.A2).values
+    assert report['input'] == df.shape[0]
+    assert report['no_ref'] == (kind == 'no_ref').sum()
+    assert report['match'] + report['swap'] + report['palindromic'] == ((kind == 'match') | (kind == 'swap')).sum()
+    assert report['palindromic'] == (pal & ((kind == 'match') | (kind == 'swap'))).sum()
+    assert report['mismatch'] == (kind == 'mismatch').sum()
+
+def test_strand_flips_and_multiallelic():
+    ref = pd.DataFrame(dict(SNP = ['rs1','rs2','rs3','rs3','rs4'], A1 = ['A','A','C','C','A'],
+                            A2 = ['G','G','T','A','T'], POS = [1, 2, 3, 3, 4]))
+    df = pd.DataFrame(dict(SNP = ['rs1','rs2','rs3','rs4'], A1 = ['T','C','A','T'], A2 = ['C','T','C','A'],
+                           BETA = [1., 1., 1., 1.], AF1 = [.2, .2, .2, .2]))
+    out, report = harmonise.align(df, ref)
+    assert out.SNP.tolist() == ['rs1','rs2','rs3','rs4']
+    assert out.BETA.tolist() == [1, -1, -1, -1]
+    assert np.allclose(out.AF1, [.2, .8, .8, .8])
+    assert (out.A1 + out.A2).tolist() == ['AG','AG','CA','AT']
+    assert {k: report[k] for k in ['flip','flip_swap','swap','palindromic','mismatch']} == \
+        dict(flip = 1, flip_swap = 1, swap = 1, palindromic = 1, mismatch = 0)
+    out, report = harmonise.align(df, ref, palindromic = 'drop')
+    assert out.SNP.tolist() == ['rs1','rs2','rs3'] and report['palindromic_dropped'] == 1
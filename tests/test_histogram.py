@@ -0,0 +1,33 @@
+'''
+Vectorised bin counts against np.histogram, and rendering when matplotlib is installed
+'''
+
+import numpy as np
+import pandas as pd
+import pytest
+from _plots import histogram
+
+def test_bin_counts_match_numpy():
+    rng = np.random.default_rng(12)
+    x = np.column_stack([rng.normal(size = 1000), rng.integers(0, 7, 1000), rng.exponential(size = 1000),
+                         np.full(1000, 3.), np.full(1000, np.nan), np.linspace(0, 1, 1000)])
+    x[rng.uniform(size = x.shape) < .1] = np.nan
+    edges, counts = histogram.bin_counts(x, bins = 20)
+    assert edges.shape == (6, 21) and counts.shape == (6, 20)
+    for j in range(x.shape[1]):
+        v = x[~np.isnan(x[:, j]), j]
+        if v.size == 0:
+            assert counts[j].sum() == 0; continue
+        rng_j = (v.min() - .5, v.max() + .5) if v.min() == v.max() else None
+        exp_counts, exp_edges = np.histogram(v, bins = 20, range = rng_j)
+        np.testing.assert_allclose(edges[j], exp_edges)
+        np.testing.assert_array_equal(counts[j], exp_counts)
+
+def test_render(tmp_path):
+    pytest.importorskip('matplotlib')
+    pytest.importorskip('seaborn')
+    df = pd.DataFrame(np.random.default_rng(13).normal(size = (100, 3)), columns = ['a','b','c'])
+    df.insert(0, 'FID', range(100)); df.insert(1, 'IID', range(100))
+    df.to_csv(f'{tmp_path}/p.txt', sep = '\t', index = False)
+    jobs = [dict(file = f'{tmp_path}/p.txt', out = f'{tmp_path}/{s}.png', style = s) for s in ['facet', 'overlay']]
+    assert sorted(histogram.render_all(jobs, n_cpu = 2)) == sorted(j['out'] for j in jobs)
@@ -0,0 +1,100 @@
+'''
+Persistent LD cache: rows and region matrices against direct computation,
+reuse across processes, size accounting and eviction
+'''
+
+import os
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import write_bed
+from _utils import clump, ldcache
+
+@pytest.fixture
+def bfile(tmp_path):
+    # correlated genotypes along two chromosomes, blocks of 1 Mb hold several SNPs
+    rng = np.random.default_rng(16)
+    n = 300
+    hap = np.cumsum(rng.uniform(size = (n, 60)) < .2, axis = 0) % 2
+    g = (hap + np.roll(hap, 7, axis = 1) + (rng.uniform(size = (n, 60)) < .1)).clip(0, 2).T
+    bp = np.concatenate([np.sort(rng.choice(5 * 10**6, 40, replace = False)), np.sort(rng.choice(10**6, 20, replace = False))]) + 1
+    return write_bed(f'{tmp_path}/g', g, [1] * 40 + [2] * 20, bp)
+
+def _index(tmp_path):
+    return json.load(open(f'{tmp_path}/ld/{ldcache.index_name}'))
+
+def test_window(bfile, tmp_path):
+    geno = clump.bed(bfile)
+    ld = ldcache.ldcache(f'{tmp_path}/ld')
+    for row in [0, 17, 39, 45]:
+        cols, r = ld.window(bfile, row, kb = 500)
+        bp = geno.bim.BP.values
+        near = np.flatnonzero((geno.chrom == geno.chrom[row]) & (np.abs(bp - bp[row]) <= 500 * 1000))
+        assert np.isin(near, cols).all() and (geno.chrom[cols] == geno.chrom[row]).all()
+        assert r.dtype == np.float32
+        np.testing.assert_array_equal(r, geno.r(row, cols))
+    ld.flush()
+    # another process reads the rows from the cache
+    ld2 = ldcache.ldcache(f'{tmp_path}/ld')
+    cols, r = ld2.window(bfile, 17, kb = 500)
+    assert ld2._blocks[ld2._row_key(ld2.bed(bfile), 1, geno.bim.BP.values[17] // 10**6, 500)]['new'] == {}
+    np.testing.assert_array_equal(r, geno.r(17, cols))
+
+def test_cached_clump_equals_uncached(bfile, tmp_path):
+    geno = clump.bed(bfile)
+    rng = np.random.default_rng(17)
+    df = pd.DataFrame(dict(SNP = geno.bim.SNP, P = 10**-rng.uniform(0, 10, 60)))
+    for c in [1, 2]:
+        tmp = df.loc[geno.chrom == c]
+        exp = clump.clump(tmp, geno, p1 = 1e-3, r2 = .1, kb = 1000)
+        for _ in range(2): # computed, then read from the cache by a new instance
+            out = clump.clump(tmp, geno, p1 = 1e-3, r2 = .1, kb = 1000, ld = ldcache.ldcache(f'{tmp_path}/ld'))
+            pd.testing.assert_frame_equal(out, exp)
+    assert all(e['kind'] == 'rows' for e in _index(tmp_path).values())
+
+def test_region(bfile, tmp_path, monkeypatch):
+    geno = clump.bed(bfile)
+    ld = ldcache.ldcache(f'{tmp_path}/ld')
+    info, r = ld.get(bfile, 1, 10**6, 3 * 10**6)
+    rows = np.flatnonzero((geno.chrom == 1) & (geno.bim.BP.values >= 10**6) & (geno.bim.BP.values <= 3 * 10**6))
+    assert info.row.tolist() == rows.tolist() and info.SNP.tolist() == geno.bim.SNP.values[rows].tolist()
+    x = geno.standardised(rows)
+    np.testing.assert_allclose(r, np.clip(x @ x.T, -1, 1), atol = 1e-6)
+    def _fail(*args, **kwargs): raise AssertionError('recomputed')
+    monkeypatch.setattr(ldcache.ldcache, 'compute', _fail)
+    info2, r2 = ldcache.ldcache(f'{tmp_path}/ld').get(bfile, 1, 10**6, 3 * 10**6)
+    np.testing.assert_array_equal(r2, r); assert info2.SNP.tolist() == info.SNP.tolist()
+    monkeypatch.undo()
+    sub, rs = ld.get(bfile, 1, 10**6, 3 * 10**6, snps = info.SNP.iloc[::2])
+    np.testing.assert_array_equal(rs, r[::2, ::2])
+
+def test_polyfun(bfile, tmp_path):
+    from scipy import sparse
+    ld = ldcache.ldcache(f'{tmp_path}/ld')
+    prefix = ld.polyfun(bfile, 1, 0, 2 * 10**6)
+    info, r = ld.get(bfile, 1, 0, 2 * 10**6)
+    m = sparse.load_npz(f'{prefix}.npz').toarray()
+    np.testing.assert_allclose(m + m.T, r, atol = 1e-5) # unit diagonal
+    snps = pd.read_table(f'{prefix}.gz')
+    assert snps.rsid.tolist() == info.SNP.tolist() and (snps.chromosome == 1).all()
+    # the export counts towards the size of the entry, and is touched on reuse
+    key = ld.key(bfile, 1, 0, 2 * 10**6)
+    entry = _index(tmp_path)[key]
+    assert entry['size'] == sum(os.path.getsize(f) for f in [f'{tmp_path}/ld/{key}.npz', f'{prefix}.npz', f'{prefix}.gz'])
+    assert ld.polyfun(bfile, 1, 0, 2 * 10**6) == prefix
+    assert _index(tmp_path)[key]['atime'] > entry['atime']
+
+def test_evict(bfile, tmp_path):
+    ld = ldcache.ldcache(f'{tmp_path}/ld')
+    keys = []
+    for start in [0, 10**6, 2 * 10**6]:
+        ld.get(bfile, 1, start, start + 10**6); keys.append(ld.key(bfile, 1, start, start + 10**6))
+    ld.get(bfile, 1, 0, 10**6) # most recently used
+    ld.max_size = sum(e['size'] for e in _index(tmp_path).values()) - 1
+    ld.evict()
+    assert sorted(_index(tmp_path)) == sorted([keys[0], keys[2]])
+    assert not os.path.isfile(f'{tmp_path}/ld/{keys[1]}.npz') and os.path.isfile(f'{tmp_path}/ld/{keys[0]}.npz')
+    ld.max_size = 0
+    ld.evict()
+    assert _index(tmp_path) == {} and not any(f.endswith('.npz') for f in os.listdir(f'{tmp_path}/ld'))
@@ -0,0 +1,42 @@
+'''
+Per-subject output manifest: planning queries and verification against the file system
+'''
+
+import os
+import numpy as np
+from _utils.manifest import manifest
+
+shapes = {'global': (17,), 'local': (5, 7)}
+
+def _output(tmp_path, subj, kind, shape):
+    file = f'{tmp_path}/{kind}_{subj}.txt'
+    np.savetxt(file, np.zeros(shape))
+    return file
+
+def test_complete(tmp_path):
+    man = manifest(f'{tmp_path}/m.db')
+    for subj in ['1', '2', '3']:
+        man.record(subj, 'global', _output(tmp_path, subj, 'global', (17,)), (17,), commit = False)
+    man.record('1', 'local', _output(tmp_path, '1', 'local', (5, 7)), (5, 7))
+    man.record('2', 'local', _output(tmp_path, '2', 'local', (4, 7)), (4, 7)) # wrong shape
+    man.commit(); man.close()
+    man = manifest(f'{tmp_path}/m.db') # persisted
+    assert man.complete(shapes) == {'1'}
+    assert man.complete({'global': (17,)}) == {'1', '2', '3'}
+    assert man.complete({}) == set()
+    man.record('2', 'local', _output(tmp_path, '2', 'local', (5, 7)), (5, 7)) # replaced
+    assert man.complete(shapes) == {'1', '2'}
+    man.remove('2', 'local')
+    assert man.complete(shapes) == {'1'}
+    man.remove('1')
+    assert man.complete({'global': (17,)}) == {'2', '3'}
+
+def test_verify(tmp_path):
+    man = manifest(f'{tmp_path}/m.db')
+    files = {s: _output(tmp_path, s, 'global', (17,)) for s in ['1', '2', '3']}
+    for s, f in files.items(): man.record(s, 'global', f, (17,))
+    assert man.verify() == 0
+    os.remove(files['1'])
+    open(files['2'], 'a').write('1\n')
+    assert man.verify(threads = 2) == 2
+    assert man.complete({'global': (17,)}) == {'3'}
@@ -0,0 +1,69 @@
+'''
+Phenotype concatenation against the former pandas pivot, and the incremental subject cache
+'''
+
+import os
+import argparse
+import numpy as np
+import pandas as pd
+import pytest
+import pheno_concat
+
+def _old_concat(x):
+    # former pheno_concat.main: melt every subject file, pivot per phenotype group
+    dflist = []
+    for y in os.listdir(x):
+        if not y.endswith('.txt'): continue
+        df = pd.read_table(f'{x}/{y}', index_col = 0)
+        df['pheno'] = df.index
+        df = df.melt(id_vars = 'pheno', var_name = 'pheng')
+        df.insert(0, column = 'EID', value = y.replace('.txt',''))
+        dflist.append(df)
+    df = pd.concat(dflist)
+    out = {}
+    for pg in df['pheng'].unique():
+        tmp = df.loc[df.pheng == pg, :].pivot_table(columns = 'pheno', index = 'EID', values = 'value')
+        for c in tmp.columns: tmp[c] /= tmp[c].std()
+        tmp.insert(0, column = 'FID', value = tmp.index)
+        tmp.insert(1, column = 'IID', value = tmp.index)
+        out[pg] = tmp.reset_index(drop = True)
+    return out
+
+def _write_subject(file, rng, groups, phenos):
+    df = pd.DataFrame(rng.normal(size = (len(phenos), len(groups))), index = phenos, columns = groups)
+    df = df.mask(rng.uniform(size = df.shape) < .1)
+    df.to_csv(file, sep = '\t', na_rep = 'NA')
+
+def _check(tmp_path, capsys):
+    args = argparse.Namespace(_in = str(tmp_path), pheno = ['conn'], threads = 3, force = False)
+    pheno_concat.main(args)
+    exp = _old_concat(f'{tmp_path}/conn')
+    assert sorted(exp) == sorted(y[:-4] for y in os.listdir(tmp_path) if y.endswith('.txt'))
+    for pg, df in exp.items():
+        out = pd.read_table(f'{tmp_path}/{pg}.txt', dtype = {'FID': str, 'IID': str})
+        pd.testing.assert_frame_equal(out, df, check_dtype = False, check_names = False)
+    return capsys.readouterr().out
+
+def test_concat_matches_pivot(tmp_path, capsys, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(8)
+    os.mkdir(f'{tmp_path}/conn')
+    phenos = [f'roi{i}' for i in range(12)]
+    for s in range(40):
+        # subjects may lack groups or phenotypes
+        groups = ['fc','sc'] if s % 5 else ['fc']
+        _write_subject(f'{tmp_path}/conn/{1000000 + s}.txt', rng, groups, phenos[:12 - s % 3])
+    assert '0 subjects cached, reading 40' in _check(tmp_path, capsys)
+
+    # modified, added and deleted subjects
+    _write_subject(f'{tmp_path}/conn/1000003.txt', rng, ['fc','sc','dti'], phenos)
+    _write_subject(f'{tmp_path}/conn/2000000.txt', rng, ['fc'], phenos)
+    os.remove(f'{tmp_path}/conn/1000004.txt')
+    assert '38 subjects cached, reading 2' in _check(tmp_path, capsys)
+    assert '40 subjects cached, reading 0' in _check(tmp_path, capsys)
+
+def test_read_subject(tmp_path):
+    open(f'{tmp_path}/s.txt', 'w').write('\tfc\tsc\nroi1\t1.5\tNA\nroi2\t\t-2\n')
+    phenos, groups, values = pheno_concat.read_subject(f'{tmp_path}/s.txt')
+    assert phenos == ['roi1','roi2'] and groups == ['fc','sc']
+    np.testing.assert_array_equal(values, [[1.5, np.nan], [np.nan, -2]])
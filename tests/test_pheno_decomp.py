@@ -0,0 +1,39 @@
+'''
+Effective number of tests from blocks of one correlation matrix, against the former per-subset loop
+'''
+
+import argparse
+import numpy as np
+import pandas as pd
+import pheno_decomp
+
+def _old_neff(dflist):
+    # former loop: correlation matrix and eig of every subset of phenotype files
+    c = np.abs(pd.concat(dflist, axis = 1).corr())
+    l = np.real(np.linalg.eig(c)[0])
+    n = l.size
+    neff_abs = n * (1 - (n-1) * np.var(l) / n**2)
+    l[l < 0] = 0
+    neff_pos = n * (1 - (n-1) * np.var(l) / n**2)
+    return [neff_abs, 1-0.95**(1/neff_abs), neff_pos, 1-0.95**(1/neff_pos)]
+
+def test_neff_matches_old_loop(tmp_path):
+    rng = np.random.default_rng(10)
+    base = rng.normal(size = (200, 1))
+    dflist = []
+    for k, ncol in enumerate([3, 4, 2]):
+        ids = np.sort(rng.choice(300, 200, replace = False)).astype(str) # subjects differ between files
+        x = base * rng.uniform(.2, 1, ncol) + rng.normal(size = (200, ncol))
+        x[rng.uniform(size = x.shape) < .05] = np.nan
+        df = pd.DataFrame(x, columns = [f'f{k}_{j}' for j in range(ncol)])
+        df.insert(0, 'FID', ids); df.insert(1, 'IID', ids)
+        df.to_csv(f'{tmp_path}/g{k}.txt', sep = '\t', index = False, na_rep = 'NA')
+        dflist.append(df.set_index(['FID','IID']))
+    args = argparse.Namespace(pheno = ['g0', 'g1', 'g2'], _in = str(tmp_path), _all = True, n_cpu = 2)
+    pheno_decomp.main(args)
+    out = pd.read_table(f'{tmp_path}/neff_g0_g1_g2.txt')
+    assert out.shape[0] == 7
+    for _, row in out.iterrows():
+        subset = [df for df, use in zip(dflist, row[['g0','g1','g2']]) if use]
+        np.testing.assert_allclose(row[['n_old','p_old','n_new','p_new']].values.astype(float),
+                                   _old_neff(subset), rtol = 1e-8)
@@ -0,0 +1,77 @@
+'''
+Shared-design residualisation against separate least squares fits per column
+'''
+
+import os
+import argparse
+import numpy as np
+import pandas as pd
+import pytest
+from _utils import resid
+
+def _data(n = 300, p = 20, seed = 9):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([np.ones(n), rng.normal(size = (n, 3)), rng.integers(0, 2, n)])
+    Y = X @ rng.normal(size = (X.shape[1], p)) + rng.normal(size = (n, p))
+    return X, Y, rng
+
+def _lstsq(Y, X):
+    # one fit per column on its observed rows
+    out = np.full(Y.shape, np.nan)
+    for j in range(Y.shape[1]):
+        rows = ~np.isnan(Y[:, j])
+        beta = np.linalg.lstsq(X[rows], Y[rows, j], rcond = None)[0]
+        out[rows, j] = Y[rows, j] - X[rows] @ beta
+    return out
+
+def test_complete():
+    X, Y, _ = _data()
+    np.testing.assert_allclose(resid.residualise(Y, X), _lstsq(Y, X), atol = 1e-10)
+
+def test_missing_patterns():
+    X, Y, rng = _data()
+    Y[rng.uniform(size = Y.shape) < .1] = np.nan
+    Y[:, 3] = np.nan
+    Y[:, 4] = Y[:, 5] # shared missingness pattern
+    out = resid.residualise(Y, X)
+    np.testing.assert_array_equal(np.isnan(out), np.isnan(Y))
+    np.testing.assert_allclose(out, _lstsq(Y, X), atol = 1e-10)
+
+def test_rank_deficient():
+    X, Y, _ = _data()
+    X = np.column_stack([X, X[:, 1] + X[:, 2], np.zeros(X.shape[0])]) # collinear and empty dummies
+    assert resid.basis(X).shape[1] == X.shape[1] - 2
+    np.testing.assert_allclose(resid.residualise(Y, X), _lstsq(Y, X), atol = 1e-10)
+
+def test_sklearn():
+    # the former per-column LinearRegression fits of pheno_resid.py
+    linear_model = pytest.importorskip('sklearn.linear_model')
+    X, Y, _ = _data()
+    exp = np.column_stack([Y[:, j] - linear_model.LinearRegression().fit(X, Y[:, j]).predict(X)
+                           for j in range(Y.shape[1])])
+    np.testing.assert_allclose(resid.residualise(Y, X), exp, atol = 1e-8)
+
+def test_pheno_resid(tmp_path, monkeypatch):
+    import pheno_resid
+    X, Y, rng = _data(p = 4)
+    ids = [str(1000000 + i) for i in range(X.shape[0])]
+    pd.DataFrame(dict(FID = ids, IID = ids, site = rng.choice(['a','b','c'], len(ids)))).to_csv(
+        f'{tmp_path}/cov.txt', sep = ' ', index = False)
+    pd.DataFrame(dict(FID = ids, IID = ids, age = X[:, 1], sex = X[:, 4])).to_csv(
+        f'{tmp_path}/qcov.txt', sep = ' ', index = False)
+    os.mkdir(f'{tmp_path}/in')
+    Y[rng.uniform(size = Y.shape) < .1] = np.nan
+    df = pd.DataFrame(Y, columns = [f'p{j}' for j in range(4)])
+    df.insert(0, 'FID', ids); df.insert(1, 'IID', ids)
+    df.to_csv(f'{tmp_path}/in/conn.txt', sep = ' ', index = False, na_rep = 'NA')
+    monkeypatch.chdir(tmp_path)
+    cov = pd.read_table(f'{tmp_path}/cov.txt', sep = ' ')
+    design = np.column_stack([(cov.site == 'a'), (cov.site == 'b'), X[:, 1], X[:, 4], np.ones(len(ids))]).astype(float)
+    for partial in [False, True]:
+        args = argparse.Namespace(_in = f'{tmp_path}/in', out = f'{tmp_path}/out', cov = f'{tmp_path}/cov.txt',
+                                  qcov = f'{tmp_path}/qcov.txt', partial = partial)
+        pheno_resid.main(args)
+        out = pd.read_csv(f'{tmp_path}/out/conn_resid.txt')
+        rows = ~np.isnan(Y).all(axis = 1) if partial else ~np.isnan(Y).any(axis = 1)
+        assert out.IID.astype(str).tolist() == np.array(ids)[rows].tolist()
+        np.testing.assert_allclose(out.iloc[:, 2:].values, _lstsq(Y[rows], design[rows]), atol = 1e-10)
@@ -0,0 +1,59 @@
+'''
+SNP lookup index against naive line matching, for plain and BGZF sumstats
+'''
+
+import os
+import pandas as pd
+import pytest
+from conftest import make_sumstats
+from _utils import snpindex, sumstats
+
+def _naive(file, snps):
+    # what fgrep -w on the SNP column returned
+    df = sumstats.read(file, float32 = False)
+    return df.loc[df.SNP.isin(snps)].astype({'A1': str, 'A2': str})
+
+def _key(df):
+    return df.sort_values(['CHR','POS','A1']).reset_index(drop = True)
+
+@pytest.fixture
+def group(tmp_path):
+    df = make_sumstats(2000, seed = 1)
+    dup = df.iloc[[5, 6]].assign(A1 = 'AT', POS = df.POS.iloc[[5, 6]] + 1) # multi-allelic IDs
+    pd.concat([df, dup]).to_csv(f'{tmp_path}/plain.fastGWA', sep = '\t', index = False)
+    sumstats.write(pd.concat([dup, df.iloc[::-1]]), f'{tmp_path}/comp.fastGWA.gz')
+    df.to_csv(f'{tmp_path}/excl_X.fastGWA', sep = '\t', index = False)
+    return str(tmp_path), df
+
+def test_lookup_matches_naive(group):
+    gdir, df = group
+    snps = df.SNP.iloc[[5, 6, 7, 100, 1999]].tolist() + ['rs_absent']
+    hits = snpindex.lookup(gdir, snps)
+    assert sorted(hits) == ['comp', 'plain']
+    for trait, file in [('plain', 'plain.fastGWA'), ('comp', 'comp.fastGWA.gz')]:
+        ref = _naive(f'{gdir}/{file}', snps)
+        assert hits[trait].shape[0] == 7
+        pd.testing.assert_frame_equal(_key(hits[trait]), _key(ref), check_dtype = False)
+
+def test_no_hits(group):
+    gdir, _ = group
+    assert snpindex.lookup(gdir, ['rs_absent']) == {}
+
+def test_lookup_does_not_rewrite_manifest(group):
+    gdir, df = group
+    snpindex.lookup(gdir, df.SNP.iloc[:3])
+    manifest = f'{snpindex.index_dir(gdir)}/manifest.json'
+    mtime = os.stat(manifest).st_mtime_ns
+    snpindex.lookup(gdir, df.SNP.iloc[:3])
+    assert os.stat(manifest).st_mtime_ns == mtime
+
+def test_update_tracks_changes(group):
+    gdir, df = group
+    snpindex.update(gdir)
+    new = make_sumstats(50, seed = 2)
+    new.to_csv(f'{gdir}/plain.fastGWA', sep = '\t', index = False)
+    os.remove(f'{gdir}/comp.fastGWA.gz')
+    hits = snpindex.lookup(gdir, new.SNP.iloc[:2])
+    assert list(hits) == ['plain']
+    assert hits['plain'].shape[0] == 2
+    assert not os.path.isfile(f'{snpindex.index_dir(gdir)}/comp.snp.npy')
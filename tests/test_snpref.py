@@ -0,0 +1,47 @@
+'''
+Memory-mapped SNP reference against the text reference it is converted from
+'''
+
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from _utils import snpref
+
+@pytest.fixture
+def ref(tmp_path):
+    rng = np.random.default_rng(3)
+    n = 1000
+    df = pd.DataFrame(dict(CHR = rng.choice(['1','2','X','MT'], n), SNP = [f'rs{i}' for i in rng.permutation(n)],
+                           POS = rng.integers(1, 10**8, n), A1 = rng.choice(list('ACGT'), n),
+                           A2 = rng.choice(list('ACGT'), n), AF1 = rng.uniform(0, 1, n).round(4)))
+    df.loc[10, 'SNP'] = df.loc[11, 'SNP'] # multi-allelic ID
+    file = f'{tmp_path}/snp_info.txt'
+    df.to_csv(file, sep = ' ', index = False)
+    return file, df
+
+def test_subset(ref):
+    file, df = ref
+    snps = df.SNP.iloc[[0, 11, 500]].tolist() + ['rs_absent', df.SNP.iloc[0]]
+    out = snpref.snpref(file).subset(snps)
+    exp = df.loc[df.SNP.isin(snps)].copy()
+    exp['CHR'] = exp.CHR.replace({'X': '23', 'MT': '26'}).astype(int)
+    key = lambda x: x.sort_values(['SNP','POS']).reset_index(drop = True)
+    assert out.shape[0] == 4
+    pd.testing.assert_frame_equal(key(out), key(exp), check_dtype = False)
+
+def test_columns_and_empty(ref):
+    file, df = ref
+    sr = snpref.snpref(file)
+    assert len(sr) == df.shape[0]
+    assert sr.subset(['rs_absent'], columns = ['SNP','A1']).shape == (0, 2)
+    assert sr.subset(df.SNP, columns = ['SNP']).SNP.sort_values().tolist() == df.SNP.sort_values().tolist()
+
+def test_reconverted_when_modified(ref):
+    file, df = ref
+    snpref.convert(file)
+    assert snpref.is_current(file)
+    df.iloc[:10].to_csv(file, sep = ' ', index = False)
+    os.utime(file, (0, 0))
+    assert not snpref.is_current(file)
+    assert len(snpref.snpref(file)) == 10
@@ -0,0 +1,49 @@
+'''
+Compact sumstats loader: dtypes, layout detection and values against a plain read
+'''
+
+import numpy as np
+import pandas as pd
+import pytest
+from _utils import sumstats
+
+def test_compact_dtypes(fastgwa):
+    file, df = fastgwa
+    out = sumstats.read(file)
+    assert out.attrs['layout'] == 'fastGWA'
+    assert out.CHR.dtype == np.int8 and out.POS.dtype == np.int32
+    assert isinstance(out.A1.dtype, pd.CategoricalDtype)
+    assert out.BETA.dtype == np.float32 and out.P.dtype == np.float64
+    assert out.N.dtype.itemsize >= 4
+    assert np.allclose(out.BETA, df.BETA, rtol = 1e-6)
+    assert np.allclose(out.P, df.P, rtol = 1e-12, atol = 0)
+
+def test_lossless_without_float32(fastgwa):
+    file, df = fastgwa
+    out = sumstats.read(file, float32 = False)
+    pd.testing.assert_frame_equal(out.astype({'A1': str, 'A2': str}), df, check_dtype = False)
+
+def test_small_p_and_counts(tmp_path):
+    file = f'{tmp_path}/t.fastGWA'
+    pd.DataFrame(dict(CHR = ['1','X'], SNP = ['rs1','rs2'], POS = [1, 2], A1 = ['A','C'], A2 = ['G','T'],
+        N = [30000, 120], BETA = [.1, -.1], SE = [.01, .01], P = [1e-300, .5])).to_csv(file, sep = '\t', index = False)
+    out = sumstats.read(file)
+    assert out.P.iloc[0] == 1e-300 # underflows in float32
+    assert out.CHR.tolist() == [1, 23]
+    assert (out.N * out.N).iloc[0] == 9 * 10**8 # no overflow of small integer types
+
+def test_string_dtypes():
+    df = pd.DataFrame(dict(CHR = pd.array(['chr1','MT'], dtype = 'string'), A1 = pd.array(['A','C'], dtype = 'string'),
+                           NSIG = [1, 2], AF1 = [.1, .2]))
+    out = sumstats.compact(df)
+    assert out.CHR.tolist() == [1, 26]
+    assert isinstance(out.A1.dtype, pd.CategoricalDtype)
+    assert out.NSIG.dtype == np.int32 and out.AF1.dtype == np.float32
+
+def test_usecols_and_detect(fastgwa):
+    file, _ = fastgwa
+    assert sumstats.read(file, usecols = ['SNP','P']).columns.tolist() == ['SNP','P']
+    with pytest.raises(KeyError): sumstats.read(file, usecols = ['SNP','Z'])
+    assert sumstats.detect(sumstats.layouts['clumped'] + ['S05']) == 'clumped'
+    assert sumstats.detect(['SNP','A1','A2','Z','N']) == 'ldsc'
+    assert sumstats.detect(['foo']) is None
@@ -0,0 +1,54 @@
+'''
+Vectorised subject QC in ukb_extract.py against the former line-by-line loop
+'''
+
+import re
+import argparse
+import pytest
+from conftest import make_fetch
+from _utils import ukbstore
+import ukb_extract
+
+def _old_extract(file, subj, pheno_cols):
+    # former ukb_extract.main: QC rules applied per line, first failure counted
+    lines = open(file).read().splitlines()
+    hdr = lines[0].split('\t')
+    col = {c: hdr.index(c) for c in hdr}
+    out = []; counts = dict(sex = 0, het = 0, pc = 0, eth = 0)
+    subj = list(subj)
+    for line in lines[1:]:
+        line = line.split('\t')
+        if len(line) != len(hdr): continue
+        if not line[0] in subj: continue
+        subj.remove(line[0])
+        v = lambda c: line[col[c]]
+        if v('f.31.0.0') != v('f.22001.0.0'): counts['sex'] += 1; continue
+        if v('f.22027.0.0').upper() != 'NA': counts['het'] += 1; continue
+        if v('f.22009.0.1') == 'NA': continue
+        if not -39.574 <= float(v('f.22009.0.1')) <= 16.714: counts['pc'] += 1; continue
+        if v('f.22009.0.2') == 'NA': continue
+        if not -17.145 <= float(v('f.22009.0.2')) <= 23.645: counts['pc'] += 1; continue
+        if not v('f.21000.0.0') in ['1','1001','1002','1003','1004']: counts['eth'] += 1; continue
+        out.append('\t'.join([line[0], line[0]] + [v(c) for c in pheno_cols]))
+    return out, counts
+
+@pytest.mark.parametrize('store', [False, True])
+def test_extract_matches_old_loop(tmp_path, capsys, store):
+    fetch = f'{tmp_path}/ukb.tab'
+    df = make_fetch(fetch, n = 2000, seed = 6)
+    if store: ukbstore.convert(fetch, blocksize = 300)
+    subj = df['f.eid'].iloc[::2].tolist()
+    open(f'{tmp_path}/subj.txt', 'w').write('\n'.join(['UKB' + s for s in subj[:10]] + subj[10:] + ['123']) + '\n')
+    args = argparse.Namespace(subj = f'{tmp_path}/subj.txt', pheno = ['25000', '31.0'], _in = fetch,
+                              out = f'{tmp_path}/out', qc = None)
+    ukb_extract.main(args)
+    stdout = capsys.readouterr().out
+
+    exp, counts = _old_extract(fetch, subj, ['f.31.0.0', 'f.25000.2.0'])
+    out = open(f'{tmp_path}/out.txt').read().splitlines()
+    assert out[0] == 'FID\tIID\tf.31.0.0\tf.25000.2.0'
+    assert sorted(out[1:]) == sorted(exp)
+    assert min(counts.values()) > 0 and len(exp) > 0
+    for key, text in [('sex','sex'), ('eth','ethnicity'), ('pc','genetic PCs'), ('het','heterozygosity')]:
+        assert re.search(f'(\\d+) subjects excluded .*{text}', stdout).group(1) == str(counts[key])
+    assert '123' in open(f'{tmp_path}/out.log').read().split('not found in this UKB fetch:')[1]
@@ -0,0 +1,66 @@
+'''
+QC rule engine and cached per-subject masks
+'''
+
+import os
+import json
+import numpy as np
+import pytest
+from conftest import make_fetch
+from _utils import ukbqc
+
+@pytest.fixture
+def fetch(tmp_path):
+    file = f'{tmp_path}/ukb.tab'
+    return file, make_fetch(file, n = 500, seed = 7)
+
+def test_evaluate():
+    v = np.array(['1', 'NA', 'na', '-3', 'x'])
+    assert ukbqc.evaluate(dict(rule = 'equal'), [v, np.array(['1', 'NA', 'NA', '-3', 'y'])]).tolist() == \
+        [True, True, False, True, False]
+    assert ukbqc.evaluate(dict(rule = 'na'), [v]).tolist() == [False, True, True, False, False]
+    assert ukbqc.evaluate(dict(rule = 'notna'), [v]).tolist() == [True, False, False, True, True]
+    assert ukbqc.evaluate(dict(rule = 'range', min = -3, max = 0), [v]).tolist() == [False] * 3 + [True, False]
+    assert ukbqc.evaluate(dict(rule = 'isin', values = ['1', 'x']), [v]).tolist() == [True] + [False] * 3 + [True]
+    with pytest.raises(ValueError): ukbqc.evaluate(dict(rule = 'between'), [v])
+
+def test_apply_counts_first_failure(fetch):
+    file, df = fetch
+    qc = ukbqc.qcmask.compute(file)
+    eids = df['f.eid'].astype(np.int64).values
+    counts = {}
+    keep = qc.apply(np.append(eids, 1), counts = counts)
+    assert not keep[-1] # not in the fetch
+    # sequential application of the default rules
+    exp = np.ones(eids.size, dtype = bool); exp_counts = {}
+    for rule in ukbqc.default_rules:
+        mask = ukbqc.evaluate(rule, [df[c].to_numpy().astype(str) for c in rule['cols']])
+        if rule.get('count') is not None:
+            exp_counts[rule['count']] = exp_counts.get(rule['count'], 0) + int((exp & ~mask).sum())
+        exp &= mask
+    assert keep[:-1].tolist() == exp.tolist() and counts == exp_counts
+    requested = np.arange(eids.size) % 3 == 0
+    assert qc.apply(eids, keep = requested).tolist() == (exp & requested).tolist()
+
+def test_save_load(fetch, tmp_path):
+    file, _ = fetch
+    qc = ukbqc.qcmask.compute(file)
+    qc.save(f'{tmp_path}/m.npz', dict(size = 1))
+    qc2 = ukbqc.qcmask.load(f'{tmp_path}/m.npz')
+    assert (qc2.eids == qc.eids).all() and (qc2.masks == qc.masks).all() and qc2.rules == qc.rules
+
+def test_get_cached(fetch, tmp_path):
+    file, df = fetch
+    qc = ukbqc.get(file)
+    mask = ukbqc.mask_path(file)
+    mtime = os.stat(mask).st_mtime_ns
+    ukbqc.get(file)
+    assert os.stat(mask).st_mtime_ns == mtime
+    # other rules get their own masks, a modified fetch is evaluated again
+    rules = [dict(name = 'eur', rule = 'isin', cols = ['f.21000.0.0'], values = ['1001'], count = 'eth')]
+    json.dump(rules, open(f'{tmp_path}/rules.json', 'w'))
+    assert ukbqc.mask_path(file, ukbqc.load_rules(f'{tmp_path}/rules.json')) != mask
+    assert ukbqc.get(file, ukbqc.load_rules(f'{tmp_path}/rules.json')).masks.shape == (1, df.shape[0])
+    df.iloc[:10].to_csv(file, sep = '\t', index = False)
+    os.utime(file, (0, 0))
+    assert ukbqc.get(file).eids.size == 10
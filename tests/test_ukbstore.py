@@ -0,0 +1,38 @@
+'''
+Column store of the UKB fetch against a direct parse of the tab file
+'''
+
+import os
+import pytest
+from conftest import make_fetch
+from _utils import ukbstore
+
+@pytest.fixture
+def fetch(tmp_path):
+    file = f'{tmp_path}/ukb.tab'
+    return file, make_fetch(file)
+
+@pytest.mark.parametrize('blocksize', [1, 7, 1000])
+def test_read_columns(fetch, blocksize):
+    file, df = fetch
+    ukbstore.convert(file, blocksize = blocksize)
+    st = ukbstore.ukbstore(file)
+    assert st.nrow == df.shape[0] and st.header == df.columns.tolist()
+    assert st.eids() == df['f.eid'].tolist()
+    assert st.malformed == [['9999999', 3]]
+    cols = [7, 2, 3, 0, 2] # unsorted, adjacent and repeated
+    assert st.read_columns(cols) == [df.iloc[:, c].tolist() for c in cols]
+    assert st.read([1, 6]) == df.iloc[:, [1, 6]].values.tolist()
+
+def test_reconverted_when_modified(fetch):
+    file, df = fetch
+    ukbstore.convert(file)
+    assert ukbstore.is_current(file)
+    df.iloc[:5].to_csv(file, sep = '\t', index = False)
+    os.utime(file, (0, 0))
+    assert not ukbstore.is_current(file)
+    ukbstore.convert(file)
+    assert ukbstore.ukbstore(file).nrow == 5
+
+def test_missing_store(fetch):
+    with pytest.raises(FileNotFoundError): ukbstore.ukbstore(fetch[0])
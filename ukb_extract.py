@@ -1,10 +1,36 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+def text_blocks(fin, cols, n_cols, flog, blocksize = 5000):
+  # yields blocks of the selected columns as arrays, lines that do not match the header are reported
+  import numpy as np
+  from itertools import islice
+  while True:
+    lines = list(islice(fin, blocksize))
+    if len(lines) == 0: return
+    block = []
+    for line in lines:
+      line = line.replace('\n','').split('\t')
+      if len(line) != n_cols:
+        print(f'{line[0]}: length does not match header, {len(line)} columns')
+        print(f'{line[0]}: length does not match header, {len(line)} columns', file = flog)
+        continue
+      block.append([line[c] for c in cols])
+    if len(block) == 0: continue
+    yield [np.array(col, dtype = str) for col in zip(*block)]
+
+def store_blocks(store, cols, blocksize = 5000):
+  # same as text_blocks, from the column store
+  import numpy as np
+  columns = [np.array(col, dtype = str) for col in store.read_columns(cols)]
+  for i in range(0, store.nrow, blocksize):
+    yield [col[i:i+blocksize] for col in columns]
+
 def main(args):
   from time import perf_counter as t
   from fnmatch import fnmatch
   import os
+  import numpy as np
   tic = t()
   idx = 0
   if args.subj != 'all': 
@@ -32,14 +58,6 @@ def main(args):
   valid_col_ids = [0,0] # eid is the first column in the UKB file header
   valid_col_match = [-1,-1] # this is for the log output
   
-  # qc columns
-  qc_cols = ['f.31.0.0', # sex, self-reported
-      'f.21000.0.0', # ethnicity, self-reported
-      'f.22001.0.0', # sex, genetic
-      'f.22009.0.1','f.22009.0.2', # first two genetic PCs
-      'f.22027.0.0'] # excessive heterozygosity
-  qc_col_ids = []
-  
   # filter header
   for i in range(len(hdr)):
     tmp = hdr[i]
@@ -48,9 +66,6 @@ def main(args):
         valid_cols.append(tmp)
         valid_col_ids.append(i)
         valid_col_match.append(j)
-    for j in qc_cols:
-      if fnmatch(tmp, j):
-        qc_col_ids.append(i)
   
   # columns given in args.pheno not found in the UKB extract
   error_list = []
@@ -73,55 +88,68 @@ def main(args):
   print(f'header contains {n_cols} columns')
   print(f'header contains {n_cols} columns', file = flog)
   
-  sex = 0
-  eth = 0
-  pc = 0
-  het = 0
-  while True:
-    line = fin.readline()
-    if len(line) == 0: break
-    idx += 1
-    if idx % 5000 == 0:
-      toc = t() - tic
-      print(f'read {idx} subjects. time = {toc:.2f} seconds')
-      print(f'read {idx} subjects. time = {toc:.2f} seconds', file = flog)
-      
-    # split columns
-    line = line.replace('\n','').split('\t')
-    
-    if len(line) != n_cols:
-        print(f'{line[0]}: length does not match header, {len(line)} columns')
-        print(f'{line[0]}: length does not match header, {len(line)} columns', file = flog)
-        continue
-    if subj != 'all' and not line[0] in subj: continue # skip unwanted subjects
-    if subj != 'all': subj.remove(line[0])
-    
-    # first QC subjects
-    if not line[qc_col_ids[0]] == line[qc_col_ids[2]]: sex += 1; continue # genetic sex ~ self-reported
-    if not fnmatch(line[qc_col_ids[5]],'[Nn][Aa]'): het += 1; continue # heterozygosity, must be NA
-    
-    if line[qc_col_ids[3]] == 'NA': continue
-    pc1 = float(line[qc_col_ids[3]])
-    if pc1 < -39.574 or pc1 > 16.714: pc += 1; continue # first genetic PC, 5SD is manually calculated
-    
-    if line[qc_col_ids[4]] == 'NA': continue
-    pc2 = float(line[qc_col_ids[4]])
-    if pc2 < -17.145 or pc2 > 23.645: pc += 1; continue # second genetic PC, 5SD manually calculated
-    if not line[qc_col_ids[1]] in ['1','1001','1002','1003','1004']: eth += 1; continue # European ancestry
-    # if QC is passed, then write out to output file
-    line_out = [line[i] for i in valid_col_ids]
-    print('\t'.join(line_out), file = fout)
+  # QC masks are evaluated once per fetch and rule set, see _utils/ukbqc.py
+  from _utils import ukbqc
+  qc = ukbqc.get(args._in, ukbqc.load_rules(args.qc))
+  toc = t() - tic
+  print(f'loaded QC masks for {qc.eids.size} subjects. time = {toc:.2f} seconds')
+  print(f'loaded QC masks for {qc.eids.size} subjects. time = {toc:.2f} seconds', file = flog)
+  
+  # only the requested columns are read, from the column store
+  # written by ukb_store.py if it is up to date, otherwise parsed from text
+  from _utils import ukbstore
+  cols = sorted(set(valid_col_ids))
+  out_ids = [cols.index(c) for c in valid_col_ids]
+  if ukbstore.is_current(args._in):
+    store = ukbstore.ukbstore(args._in)
+    for eid, length in store.malformed: # rows excluded from the store
+        print(f'{eid}: length does not match header, {length} columns')
+        print(f'{eid}: length does not match header, {length} columns', file = flog)
+    blocks = store_blocks(store, cols, blocksize = 5000)
+    toc = t() - tic
+    print(f'read {len(cols)} columns from the column store. time = {toc:.2f} seconds')
+    print(f'read {len(cols)} columns from the column store. time = {toc:.2f} seconds', file = flog)
+  else:
+    blocks = text_blocks(fin, cols, n_cols, flog, blocksize = 5000)
+  
+  # sorted subject list searched a block at a time, subjects are extracted on first occurrence only
+  subj_list = subj; select = subj != 'all'
+  if select:
+    subj = np.unique(np.array(subj, dtype = str))
+    found = np.zeros(subj.size, dtype = bool)
+  counts = dict(sex = 0, het = 0, pc = 0, eth = 0)
+  for block in blocks:
+    if not select: keep = np.ones(block[0].size, dtype = bool)
+    elif subj.size == 0: keep = np.zeros(block[0].size, dtype = bool)
+    else:
+      pos = np.minimum(np.searchsorted(subj, block[0]), subj.size - 1)
+      keep = (subj[pos] == block[0]) & ~found[pos]
+      first = np.zeros(block[0].size, dtype = bool)
+      first[np.unique(block[0], return_index = True)[1]] = True # duplicated eids within the block
+      keep &= first
+      found[pos[keep]] = True
+    keep = qc.apply(block[0], keep, counts)
+    lines = zip(*[block[i][keep] for i in out_ids])
+    fout.write(''.join(['\t'.join(line) + '\n' for line in lines]))
+    idx += block[0].size
+    toc = t() - tic
+    print(f'read {idx} subjects. time = {toc:.2f} seconds')
+    print(f'read {idx} subjects. time = {toc:.2f} seconds', file = flog)
+  sex = counts['sex']; het = counts['het']; pc = counts['pc']; eth = counts['eth']
   
-  if subj != 'all' and len(subj) > 0:
+  if select and not found.all():
     print('following subjects are not found in this UKB fetch:', file = flog)
-    for j in subj:
-      print(j, file = flog)
+    found = set(subj[found].tolist())
+    for j in subj_list:
+      if not j in found: print(j, file = flog)
     print('\n', file = flog)
   
   print(f'{sex} subjects excluded due to reported sex != genetic sex')
   print(f'{eth} subjects excluded based on ethnicity')
   print(f'{pc} subjects excluded based on genetic PCs')
   print(f'{het} subjects excluded due to excessive heterozygosity')
+  for k, v in counts.items(): # counters of user-defined rules
+    if not k in ['sex','het','pc','eth']: print(f'{v} subjects excluded by QC rule {k}')
   return
 
 if __name__ == '__main__':
@@ -135,6 +163,7 @@ if __name__ == '__main__':
   parser.add_argument('-i','--in', dest = '_in', help = 'input ukb fetch file, TAB format, NOT csv',
     default = '/rds/project/rb643/rds-rb643-ukbiobank2/Data_Phenotype/DataFetch_20022024/ukb677594.tab')
   parser.add_argument('-o','--out', dest = 'out', help = 'output prefix', required = True)
+  parser.add_argument('--qc', help = 'QC rules in JSON format, defaults to _utils/ukbqc.py default_rules')
   args = parser.parse_args()
   import os
   for arg in ['_in','out']:
@@ -73,28 +73,49 @@ def main(args):
   print(f'header contains {n_cols} columns')
   print(f'header contains {n_cols} columns', file = flog)
   
+  # a column store written by ukb_store.py is used if it is up to date,
+  # then only the requested and QC columns are read
+  from _utils import ukbstore
+  if ukbstore.is_current(args._in):
+    store = ukbstore.ukbstore(args._in)
+    cols = sorted(set(valid_col_ids + qc_col_ids))
+    pos = {c: k for k, c in enumerate(cols)}
+    valid_col_ids = [pos[c] for c in valid_col_ids]
+    qc_col_ids = [pos[c] for c in qc_col_ids]
+    n_cols = len(cols)
+    for eid, length in store.malformed: # rows excluded from the store
+        print(f'{eid}: length does not match header, {length} columns')
+        print(f'{eid}: length does not match header, {length} columns', file = flog)
+    lines = store.read(cols)
+    toc = t() - tic
+    print(f'read {len(cols)} columns from the column store. time = {toc:.2f} seconds')
+    print(f'read {len(cols)} columns from the column store. time = {toc:.2f} seconds', file = flog)
+  else:
+    lines = (line.replace('\n','').split('\t') for line in fin)
+  
+  # subject list as a hash set, subjects are extracted on first occurrence only
+  # (no numpy here, see ukb_extract.py for the vectorised QC)
+  subj_list = subj
+  if subj != 'all': subj = set(subj)
+  found = set()
+  
   sex = 0
   eth = 0
   pc = 0
   het = 0
-  while True:
-    line = fin.readline()
-    if len(line) == 0: break
+  for line in lines:
     idx += 1
     if idx % 5000 == 0:
       toc = t() - tic
       print(f'read {idx} subjects. time = {toc:.2f} seconds')
       print(f'read {idx} subjects. time = {toc:.2f} seconds', file = flog)
       
-    # split columns
-    line = line.replace('\n','').split('\t')
-    
     if len(line) != n_cols:
         print(f'{line[0]}: length does not match header, {len(line)} columns')
         print(f'{line[0]}: length does not match header, {len(line)} columns', file = flog)
         continue
-    if subj != 'all' and not line[0] in subj: continue # skip unwanted subjects
-    if subj != 'all': subj.remove(line[0])
+    if subj != 'all' and (not line[0] in subj or line[0] in found): continue # skip unwanted subjects
+    if subj != 'all': found.add(line[0])
     
     # first QC subjects
     if not line[qc_col_ids[0]] == line[qc_col_ids[2]]: sex += 1; continue # genetic sex ~ self-reported
@@ -112,10 +133,10 @@ def main(args):
     line_out = [line[i] for i in valid_col_ids]
     print('\t'.join(line_out), file = fout)
   
-  if subj != 'all' and len(subj) > 0:
+  if subj != 'all' and len(found) < len(subj):
     print('following subjects are not found in this UKB fetch:', file = flog)
-    for j in subj:
-      print(j, file = flog)
+    for j in subj_list:
+      if not j in found: print(j, file = flog)
     print('\n', file = flog)
   
   print(f'{sex} subjects excluded due to reported sex != genetic sex')
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+'''
+Author: Yuankai He
+Correspondence: yh464@cam.ac.uk
+Version 1: 2026-10-16
+
+Converts the UKB tab fetch once into a column-selectable binary store keyed by eid,
+so that ukb_extract.py reads only the requested fields and the QC columns
+
+Requires following inputs:
+    UKB fetch in TAB format
+'''
+
+def main(args):
+    from time import perf_counter as t
+    from _utils.ukbstore import convert, is_current
+    from _utils import ukbqc
+    tic = t()
+    if is_current(args._in) and not args.force:
+        print(f'Column store for {args._in} is up to date')
+    else:
+        out = convert(args._in, blocksize = args.blocksize, force = args.force, log = sys.stdout)
+        toc = t() - tic
+        print(f'Converted {args._in} to {out}, time = {toc:.3f}')
+    
+    # per-subject QC masks, reused by ukb_extract.py and subj_list.py
+    qc = ukbqc.get(args._in, ukbqc.load_rules(args.qc), force = args.force)
+    toc = t() - tic
+    print(f'Evaluated QC masks for {qc.eids.size} subjects, time = {toc:.3f}')
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description =
+      'This script converts the UKB fetch into a column-selectable binary store')
+    parser.add_argument('-i','--in', dest = '_in', help = 'input ukb fetch file, TAB format, NOT csv',
+      default = '/rds/project/rb643/rds-rb643-ukbiobank2/Data_Phenotype/DataFetch_20022024/ukb677594.tab')
+    parser.add_argument('--blocksize', help = 'number of subjects per row block',
+      type = int, default = 1000)
+    parser.add_argument('--qc', help = 'QC rules in JSON format, defaults to _utils/ukbqc.py default_rules')
+    parser.add_argument('-f','--force', dest = 'force', help = 'force overwrite',
+      default = False, action = 'store_true')
+    args = parser.parse_args()
+    import os, sys
+    args._in = os.path.realpath(args._in)
+
+    from _utils import cmdhistory, path
+    cmdhistory.log()
+    proj = path.project()
+    proj.add_input(args._in, __file__)
+    proj.add_output(args._in+'.colstore', __file__)
+    try: main(args)
+    except: cmdhistory.errlog()